@@ -0,0 +1,120 @@
+import numpy as np
+import Squares
+from Move import Move
+
+
+# value of each piece type (see Squares.BLACK_MAN...) in the encoded boards: the sign is the color, 2 means king
+PIECE_CODES = (-1, -2, 1, 2)
+
+# NEIGHBOR_INDEX[direction][square] is the neighbor square, or NUM_SQUARES (a padding column that is always occupied) off the board
+NEIGHBOR_INDEX = np.array([[Squares.NUM_SQUARES if neighbors[direction] is None else neighbors[direction] for neighbors in Squares.NEIGHBORS]
+                           for direction in range(len(Squares.DIRECTIONS))], dtype=np.intp)
+PIECE_SQUARE_TABLES = np.array(Squares.PIECE_SQUARE_TABLES, dtype=np.float64)
+
+
+class BatchEvaluator:
+    """
+    The BatchEvaluator class scores many board states at once with NumPy instead of one Python call per board state.
+
+    Board states are encoded as an int8 array with one row per board state and one column per square (see the Squares module),
+    holding PIECE_CODES: 0 for an empty square, 1 for a white man, 2 for a white king, -1 for a black man and -2 for a black king.
+
+    The evaluation is a weighted sum of:
+    - material: white men minus black men
+    - kings: white kings minus black kings
+    - mobility: number of simple moves available to white minus black
+    - piece-square: the piece-square tables of Squares, white minus black
+    A side without pieces has lost (-1000 or 1000). White is maximizing.
+    The default weights give the same scores as IntelligentAgent.ia_game_evaluation (men worth 1, kings worth 2).
+    """
+
+    def __init__(self, man_weight=1, king_weight=2, mobility_weight=0, psq_weight=0, win_score=1000):
+        self.man_weight = man_weight
+        self.king_weight = king_weight
+        self.mobility_weight = mobility_weight
+        self.psq_weight = psq_weight
+        self.win_score = win_score
+
+    ############################## Encoding ########################################
+
+    @staticmethod
+    def encode_board(board_state):
+        """Returns the row of codes of one board state dictionary as a list"""
+        row = [0] * Squares.NUM_SQUARES
+        for piece_name, location in board_state.items():
+            row[Squares.square_of(location.x, location.y)] = PIECE_CODES[Move.piece_type(piece_name)]
+        return row
+
+    @staticmethod
+    def encode_boards(board_states):
+        """Returns the encoded array of a list of board state dictionaries"""
+        return np.array([BatchEvaluator.encode_board(board_state) for board_state in board_states], dtype=np.int8).reshape(-1, Squares.NUM_SQUARES)
+
+    @staticmethod
+    def encode_children(position, moves):
+        """
+        Returns the encoded array of the board states reached by each MoveRecord from a Move object's board,
+        without making the moves: each row is a copy of the parent row with the moving and captured pieces changed.
+        """
+        parent_row = [0] * Squares.NUM_SQUARES
+        for square, piece_name in position.square_index.items():
+            parent_row[square] = PIECE_CODES[Move.piece_type(piece_name)]
+        rows = []
+        for move in moves:
+            row = parent_row[:]
+            code = row[move.from_square]
+            row[move.from_square] = 0
+            for square in move.captured:
+                row[square] = 0
+            row[move.to_square] = 2 * code if move.promotion else code
+            rows.append(row)
+        return np.array(rows, dtype=np.int8).reshape(-1, Squares.NUM_SQUARES)
+
+    ############################## Evaluation ########################################
+
+    @staticmethod
+    def mobility(encoded):
+        """Returns the number of simple moves of white minus black for each encoded board state"""
+        occupied = np.ones((encoded.shape[0], Squares.NUM_SQUARES + 1), dtype=bool)
+        occupied[:, :Squares.NUM_SQUARES] = encoded != 0
+        white_kings = encoded == 2
+        black_kings = encoded == -2
+        white_movers = {direction: (encoded == 1) | white_kings for direction in Squares.WHITE_MAN_DIRECTIONS}
+        black_movers = {direction: (encoded == -1) | black_kings for direction in Squares.BLACK_MAN_DIRECTIONS}
+        mobility = np.zeros(encoded.shape[0], dtype=np.int64)
+        for direction in Squares.KING_DIRECTIONS:
+            target_empty = ~occupied[:, NEIGHBOR_INDEX[direction]]
+            mobility += (white_movers.get(direction, white_kings) & target_empty).sum(axis=1)
+            mobility -= (black_movers.get(direction, black_kings) & target_empty).sum(axis=1)
+        return mobility
+
+    @staticmethod
+    def piece_square(encoded):
+        """Returns the piece-square score (white minus black) of each encoded board state"""
+        score = np.zeros(encoded.shape[0], dtype=np.float64)
+        for piece_type, code in enumerate(PIECE_CODES):
+            score += Squares.PIECE_SIGNS[piece_type] * ((encoded == code) @ PIECE_SQUARE_TABLES[piece_type])
+        return score
+
+    def evaluate(self, encoded):
+        """
+        Returns the scores of an encoded array of board states, as an integer array if all the weights are whole numbers
+        (like evaluate_position with its default weights) and as a float array otherwise.
+        """
+        white_men = (encoded == 1).sum(axis=1)
+        white_kings = (encoded == 2).sum(axis=1)
+        black_men = (encoded == -1).sum(axis=1)
+        black_kings = (encoded == -2).sum(axis=1)
+        scores = self.man_weight * (white_men - black_men) + self.king_weight * (white_kings - black_kings)
+        if self.mobility_weight:
+            scores = scores + self.mobility_weight * self.mobility(encoded)
+        if self.psq_weight:
+            scores = scores + self.psq_weight * self.piece_square(encoded)
+        scores = np.where(white_men + white_kings == 0, -self.win_score, scores)
+        scores = np.where(black_men + black_kings == 0, self.win_score, scores)
+        weights = (self.man_weight, self.king_weight, self.mobility_weight, self.psq_weight, self.win_score)
+        return scores.astype(np.int64 if all(float(weight).is_integer() for weight in weights) else np.float64)
+
+    def evaluate_boards(self, board_states):
+        """Returns the scores of a list of board state dictionaries"""
+        return self.evaluate(self.encode_boards(board_states))
@@ -0,0 +1,243 @@
+from Game import Game
+from Move import Move
+from Position import Position
+from IntelligentAgent import IntelligentAgent
+from Bitboard import Bitboard
+from BatchEvaluator import BatchEvaluator
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+
+
+# Fixed test positions, one character per playable square from row 0 to row 7 ('.' empty, 'b'/'w' men, 'B'/'W' kings)
+STANDARD_POSITIONS = {
+    'initial': ('bbbbbbbbbbbb........wwwwwwwwwwww', 'black'),
+    'opening': ('bbbbbb.bbbbb...bw...wwww.wwwwwww', 'black'),
+    'middlegame': ('bb.b.bb.b.....wbw.....www...w..w', 'white'),
+    'crowded': ('bbWbbb...b.......wb.....wwwwwwww', 'white'),
+    'endgame': ('.WW.......ww....w.....B.w.......', 'white'),
+}
+
+# Number of leaves of the move tree from the initial position, black to move (the standard checkers perft numbers)
+INITIAL_PERFT = [1, 7, 49, 302, 1469, 7361, 36768, 179740, 845931]
+
+
+def board_from_string(squares):
+    """Builds a board state dictionary from one character per playable square (see STANDARD_POSITIONS)"""
+    return Position.from_string(squares).to_dict()
+
+
+def perft(board_state, color, depth):
+    """Counts the leaves of the tree of legal moves (Move.get_legal_moves) depth plies from a position"""
+    if depth == 0:
+        return 1
+    legal_moves = Move(board_state, color).get_legal_moves()
+    if depth == 1:
+        return len(legal_moves)
+    opponent_color = 'white' if color == 'black' else 'black'
+    return sum(perft(new_board_state, opponent_color, depth - 1) for new_board_state in legal_moves)
+
+
+def perft_make_unmake(position, color, depth):
+    """Same count as perft, with the move records the search uses, made and unmade on a single Move object"""
+    if depth == 0:
+        return 1
+    moves = position.generate_moves(color)
+    if depth == 1:
+        return len(moves)
+    opponent_color = 'white' if color == 'black' else 'black'
+    leaves = 0
+    for move in moves:
+        undo = position.make_move(move)
+        leaves += perft_make_unmake(position, opponent_color, depth - 1)
+        position.unmake_move(move, undo)
+    return leaves
+
+
+def _best_time(function, repeats):
+    """Runs function repeats times and returns (its result, the shortest duration in seconds)"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return result, best
+
+
+class Benchmark:
+    """
+    The Benchmark class times move generation (perft), evaluation, fixed-depth searches and whole games
+    on the fixed positions of STANDARD_POSITIONS, and returns the results as a dictionary that can be saved as JSON.
+
+    Each timing is the best of repeats runs. Leaf and node counts are also recorded: perft counts must not change
+    when the move generator is optimized, and a change in search nodes or values shows that the search behaves differently.
+    compare() checks a result against a saved baseline and lists the regressions.
+    quick=True uses smaller depths and fewer games, for a fast check.
+    """
+
+    def __init__(self, quick=False, repeats=3, seed=0):
+        self.quick = quick
+        self.repeats = repeats
+        self.seed = seed
+        self.positions = {name: (board_from_string(squares), color) for name, (squares, color) in STANDARD_POSITIONS.items()}
+
+    def run(self, show_progress=True):
+        """Runs all the benchmarks and returns the results"""
+        results = {'python': platform.python_version(), 'quick': self.quick}
+        for section in ('perft', 'evaluation', 'search', 'games'):
+            if show_progress:
+                print(f'Running {section} benchmarks...')
+            results[section] = getattr(self, f'bench_{section}')()
+        return results
+
+    def bench_perft(self):
+        depth = 4 if self.quick else 6
+        results = {}
+        for name, (board_state, color) in self.positions.items():
+            leaves, seconds = _best_time(lambda: perft(board_state, color, depth), self.repeats)
+            _, make_unmake_seconds = _best_time(lambda: perft_make_unmake(Move(dict(board_state), color), color, depth), self.repeats)
+            results[name] = {'depth': depth, 'leaves': leaves, 'seconds': seconds, 'make_unmake_seconds': make_unmake_seconds,
+                             'leaves_per_second': leaves / seconds if seconds else 0.0}
+        return results
+
+    def _evaluation_positions(self):
+        """The positions of a few random games, as Move objects, to evaluate"""
+        rng = random.Random(self.seed)
+        positions = []
+        for board_state, color in self.positions.values():
+            for _ in range(40):
+                position = Move(dict(board_state), color)
+                positions.append(position)
+                moves = position.generate_moves()
+                if not moves:
+                    break
+                board_state = position.board_after(rng.choice(moves))
+                color = 'white' if color == 'black' else 'black'
+        return positions
+
+    def bench_evaluation(self):
+        positions = self._evaluation_positions()
+        board_states = [position.dict_piece_locations for position in positions]
+        agent = IntelligentAgent('white', board_states[0])
+        mobility_agent = IntelligentAgent('white', board_states[0], psq_weight=0.5, mobility_weight=1)
+        batch_evaluator = BatchEvaluator(psq_weight=0.5, mobility_weight=1)
+        encoded = BatchEvaluator.encode_boards(board_states)
+        loops = 20 if self.quick else 100
+        benchmarks = {
+            'evaluate_position': lambda: [agent.evaluate_position(position) for position in positions],
+            'evaluate_position_mobility': lambda: [mobility_agent.evaluate_position(position) for position in positions],
+            'bitboard': lambda: [Bitboard.from_dict(board_state).evaluate() for board_state in board_states],
+            'batch_mobility': lambda: batch_evaluator.evaluate(encoded),
+        }
+        results = {}
+        for name, function in benchmarks.items():
+            _, seconds = _best_time(lambda: [function() for _ in range(loops)], self.repeats)
+            evaluations = loops * len(positions)
+            results[name] = {'evaluations': evaluations, 'seconds': seconds, 'evaluations_per_second': evaluations / seconds if seconds else 0.0}
+        return results
+
+    def bench_search(self):
+        depths = {'minimax': 3 if self.quick else 4, 'alphabeta': 4 if self.quick else 6, 'pvs': 4 if self.quick else 6}
+        results = {}
+        for name, (board_state, color) in self.positions.items():
+            for search_algorithm, depth in depths.items():
+                def search():
+                    agent = IntelligentAgent(color, board_state)
+                    return agent.search(board_state, depth, color == 'white', search_algorithm=search_algorithm, return_stats=True)
+                (value, _, stats), seconds = _best_time(search, self.repeats)
+                results[f'{name}_{search_algorithm}_{depth}'] = {
+                    'depth': depth, 'value': float(value), 'nodes': stats.nodes, 'cutoffs': stats.cutoffs,
+                    'seconds': seconds, 'nodes_per_second': stats.nodes / seconds if seconds else 0.0}
+        return results
+
+    def bench_games(self):
+        num_games = 10 if self.quick else 50
+        game_specs = {
+            'naive_vs_naive': {'black': 'naive', 'white': 'naive'},
+            'alphabeta_2_vs_naive': {'black': 'intelligent', 'white': 'naive', 'board_depth': 2, 'search_algorithm': 'alphabeta'},
+        }
+        results = {}
+        for name, game_spec in game_specs.items():
+            def play():
+                random.seed(self.seed)
+                turns = 0
+                with contextlib.redirect_stdout(io.StringIO()):  # the games print their winner
+                    for _ in range(num_games):
+                        turns += Game().run_with_ia(show_board=False, **game_spec)[1]
+                return turns
+            turns, seconds = _best_time(play, self.repeats)
+            results[name] = {'games': num_games, 'turns': turns, 'seconds': seconds,
+                             'games_per_second': num_games / seconds if seconds else 0.0}
+        return results
+
+    @staticmethod
+    def compare(results, baseline, tolerance=0.15):
+        """
+        Compares results with a baseline (both returned by run) and returns a list of messages:
+        a timing more than tolerance (a fraction) slower than the baseline is a regression,
+        a perft count that differs is an error, and search nodes or values that differ, as well as benchmarks
+        missing from the baseline, are reported as changes.
+        Returns (regressions, changes).
+        """
+        regressions = []
+        changes = []
+        for section in ('perft', 'evaluation', 'search', 'games'):
+            for name, result in results.get(section, {}).items():
+                base = baseline.get(section, {}).get(name)
+                if base is None:
+                    changes.append(f'{section} {name}: not in the baseline')
+                    continue
+                for key, value in result.items():
+                    if key not in base:
+                        continue
+                    if key.endswith('seconds'):
+                        if base[key] and value > base[key] * (1 + tolerance):
+                            regressions.append(f'{section} {name} {key}: {value:.4f}s instead of {base[key]:.4f}s (+{100 * (value / base[key] - 1):.0f}%)')
+                    elif key == 'leaves' and value != base[key]:
+                        regressions.append(f'{section} {name}: {value} leaves instead of {base[key]}, the move generator is wrong')
+                    elif key in ('nodes', 'value', 'turns') and value != base[key]:
+                        changes.append(f'{section} {name} {key}: {value} instead of {base[key]}')
+        return regressions, changes
+
+    @staticmethod
+    def pvs_savings(results):
+        """
+        Returns the fraction of the alphabeta search nodes that pvs saves on each position, from the search results of run
+        (negative where pvs visits more nodes: these fixed-depth searches have no transposition table, see IntelligentAgent.pvs).
+        """
+        search = results.get('search', {})
+        savings = {}
+        for name, result in search.items():
+            if '_pvs_' in name:
+                alphabeta = search.get(name.replace('_pvs_', '_alphabeta_'))
+                if alphabeta and alphabeta['nodes']:
+                    savings[name] = 1 - result['nodes'] / alphabeta['nodes']
+        return savings
+
+
+if __name__ == '__main__':
+    # python Benchmark.py [output file] [baseline file] [--quick]
+    args = [arg for arg in sys.argv[1:] if arg != '--quick']
+    benchmark = Benchmark(quick='--quick' in sys.argv)
+    results = benchmark.run()
+    output_path = args[0] if args else 'benchmark.json'
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output_path}')
+    for name, saving in Benchmark.pvs_savings(results).items():
+        print(f"{name}: {100 * abs(saving):.1f}% {'fewer' if saving >= 0 else 'more'} nodes than alphabeta")
+    if len(args) > 1:
+        with open(args[1]) as f:
+            regressions, changes = Benchmark.compare(results, json.load(f))
+        for message in changes:
+            print('Changed:', message)
+        for message in regressions:
+            print('Regression:', message)
+        if not regressions:
+            print('No regressions')
+        sys.exit(1 if regressions else 0)
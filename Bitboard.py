@@ -0,0 +1,203 @@
+import Squares
+from Squares import SQUARE_MASKS, NEIGHBORS, JUMPS, OPPOSITE_DIRECTION, FULL_MASK, shift_mask, iter_bits
+
+
+class Bitboard:
+    """
+    The Bitboard class is a compact representation of a board state.
+    Instead of a dictionary of piece names and Location objects, the board is stored as three 32-bit masks
+    (one bit per playable square, see the Squares module): black pieces, white pieces and kings.
+
+    Move generation, capture detection and material counting are done with mask operations, and it follows the same rules
+    as the Move class: captures are mandatory, men only move and capture forward, kings move and capture in all directions,
+    and a capturing piece keeps capturing until it can't anymore. Promotion is done separately with promote()
+    after apply(), which gives the same board as a promoting Move record.
+
+    Moves are represented as (from_square, to_square, captured_mask) tuples.
+    Use from_dict and to_dict to convert to and from the dictionary format used by the rest of the game.
+    Game.winner, Game.game_evaluation and IntelligentAgent.ia_winner_check convert the board with from_dict
+    and check for the end of the game (winner) and count the material with it.
+    """
+
+    __slots__ = ('black', 'white', 'kings')
+
+    def __init__(self, black=0, white=0, kings=0):
+        self.black = black
+        self.white = white
+        self.kings = kings
+
+    def __eq__(self, other):
+        return self.black == other.black and self.white == other.white and self.kings == other.kings
+
+    def __hash__(self):
+        return hash((self.black, self.white, self.kings))
+
+    def __repr__(self):
+        return f"Bitboard(black={self.black:#010x}, white={self.white:#010x}, kings={self.kings:#010x})"
+
+    ############################## Conversions ########################################
+
+    @staticmethod
+    def from_dict(dict_piece_locations):
+        """
+        Builds a Bitboard from a board state dictionary of piece names and Location objects.
+        """
+        black = white = kings = 0
+        for piece_name, location in dict_piece_locations.items():
+            mask = SQUARE_MASKS[Squares.square_of(location.x, location.y)]
+            if piece_name.startswith('king_'):
+                kings |= mask
+            if 'black' in piece_name:
+                black |= mask
+            else:
+                white |= mask
+        return Bitboard(black, white, kings)
+
+    def to_dict(self):
+        """
+        Returns the board state as a dictionary of piece names and Location objects.
+        Pieces are numbered from 1 in square order for each color, since the bitboard does not keep piece names.
+        """
+        dict_piece_locations = {}
+        for color, pieces in (('black', self.black), ('white', self.white)):
+            for number, square in enumerate(iter_bits(pieces), start=1):
+                prefix = 'king_' if self.kings & SQUARE_MASKS[square] else ''
+                dict_piece_locations[f'{prefix}{color}_piece_{number}'] = Squares.LOCATIONS[square]
+        return dict_piece_locations
+
+    ############################## Move Generation ########################################
+
+    def _pieces(self, color):
+        """Returns (own pieces, opponent pieces, directions for men) for a color"""
+        if color == 'black':
+            return self.black, self.white, Squares.BLACK_MAN_DIRECTIONS
+        return self.white, self.black, Squares.WHITE_MAN_DIRECTIONS
+
+    def _movers(self, own, man_directions, direction):
+        """Returns the pieces of a color that are allowed to move in a direction"""
+        if direction in man_directions:
+            return own
+        return own & self.kings
+
+    def has_captures(self, color):
+        """Checks with mask operations only whether a color has at least one capture available"""
+        own, opponent, man_directions = self._pieces(color)
+        empty = ~(self.black | self.white) & FULL_MASK
+        for direction in Squares.KING_DIRECTIONS:
+            jumped = shift_mask(self._movers(own, man_directions, direction), direction) & opponent
+            if shift_mask(jumped, direction) & empty:
+                return True
+        return False
+
+    def has_moves(self, color):
+        """Checks whether a color has at least one legal move"""
+        own, _, man_directions = self._pieces(color)
+        empty = ~(self.black | self.white) & FULL_MASK
+        for direction in Squares.KING_DIRECTIONS:
+            if shift_mask(self._movers(own, man_directions, direction), direction) & empty:
+                return True
+        return self.has_captures(color)
+
+    def simple_moves(self, color):
+        """Returns all non-capturing moves for a color"""
+        own, _, man_directions = self._pieces(color)
+        empty = ~(self.black | self.white) & FULL_MASK
+        moves = []
+        for direction in Squares.KING_DIRECTIONS:
+            targets = shift_mask(self._movers(own, man_directions, direction), direction) & empty
+            back = OPPOSITE_DIRECTION[direction]
+            for to_square in iter_bits(targets):
+                moves.append((NEIGHBORS[to_square][back], to_square, 0))
+        return moves
+
+    def _capture_sequences(self, origin, square, directions, occupied, opponent, captured, moves):
+        """Follows every capture sequence of the piece standing on square and adds the finished ones to moves"""
+        found = False
+        for direction in directions:
+            jump = JUMPS[square][direction]
+            if jump is None:
+                continue
+            jumped, landing = jump
+            if opponent & SQUARE_MASKS[jumped] and not occupied & SQUARE_MASKS[landing]:
+                found = True
+                jumped_mask = SQUARE_MASKS[jumped]
+                self._capture_sequences(origin, landing, directions,
+                                        (occupied & ~jumped_mask & ~SQUARE_MASKS[square]) | SQUARE_MASKS[landing],
+                                        opponent & ~jumped_mask, captured | jumped_mask, moves)
+        if not found and captured:
+            moves.append((origin, square, captured))
+
+    def captures(self, color):
+        """Returns all complete capture sequences for a color"""
+        if not self.has_captures(color):
+            return []
+        own, opponent, man_directions = self._pieces(color)
+        occupied = self.black | self.white
+        moves = []
+        for square in iter_bits(own):
+            directions = Squares.KING_DIRECTIONS if self.kings & SQUARE_MASKS[square] else man_directions
+            self._capture_sequences(square, square, directions, occupied, opponent, 0, moves)
+        return moves
+
+    def legal_moves(self, color):
+        """
+        Returns the legal moves for a color. If captures are possible, only captures are returned.
+        """
+        return self.captures(color) or self.simple_moves(color)
+
+    def apply(self, move, color):
+        """
+        Returns the new Bitboard after a move has been made. Captured pieces are removed, kings stay kings.
+        A king whose captures bring it back to its own square (from_square == to_square) only removes the captured pieces.
+        """
+        from_square, to_square, captured = move
+        moved = SQUARE_MASKS[from_square] ^ SQUARE_MASKS[to_square]
+        black, white, kings = self.black, self.white, self.kings
+        if color == 'black':
+            black ^= moved
+            white &= ~captured
+        else:
+            white ^= moved
+            black &= ~captured
+        if kings & SQUARE_MASKS[from_square]:
+            kings ^= moved
+        kings &= ~captured
+        return Bitboard(black, white, kings)
+
+    def get_legal_boards(self, color):
+        """Returns the Bitboards reached by every legal move for a color"""
+        return [self.apply(move, color) for move in self.legal_moves(color)]
+
+    def promote(self):
+        """Returns the Bitboard with every man that reached the opposite end of the board promoted to a king"""
+        return Bitboard(self.black, self.white,
+                        self.kings | (self.black & Squares.BLACK_PROMOTION_MASK) | (self.white & Squares.WHITE_PROMOTION_MASK))
+
+    ############################## Material and Game Over ########################################
+
+    def count(self):
+        """Returns (black men, black kings, white men, white kings)"""
+        black_kings = (self.black & self.kings).bit_count()
+        white_kings = (self.white & self.kings).bit_count()
+        return self.black.bit_count() - black_kings, black_kings, self.white.bit_count() - white_kings, white_kings
+
+    def evaluate(self):
+        """
+        Returns the material evaluation of the board, with the same heuristic as Game.game_evaluation:
+        white pieces minus black pieces, kings are worth 2. White is maximizing.
+        """
+        black_men, black_kings, white_men, white_kings = self.count()
+        return white_men + 2 * white_kings - black_men - 2 * black_kings
+
+    def winner(self, color):
+        """
+        Check if the game is over with color to move and return the winner: a side without pieces has lost,
+        and so has the side to move if it has no legal move, like in GameLoop
+        """
+        if not self.white:
+            return 'Black'
+        if not self.black:
+            return 'White'
+        if not self.has_moves(color):
+            return 'White' if color == 'black' else 'Black'
+        return None
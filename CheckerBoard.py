@@ -1,13 +1,19 @@
+from Bitboard import Bitboard
+
+
 class CheckerBoard:
 
     """
     The CheckerBoard class is used to represent the board state of the checkers game. It is used to visualize the board state of the checkers game.
     The method visualize_checkers_board is a simple, compact visualization of the board.
     The method visualize_piece_numbers is a more detailed visualization of the board, showing the piece numbers of each piece on the board.
+    Both methods accept either a board state dictionary or a Bitboard.
     """
 
     @staticmethod
     def visualize_checkers_board(dict_piece_locations):
+        if isinstance(dict_piece_locations, Bitboard):
+            dict_piece_locations = dict_piece_locations.to_dict()
         # Initialize an 8x8 board with empty squares
         board = [['|  ' for _ in range(8)] for _ in range(8)]
 
@@ -40,6 +46,8 @@ class CheckerBoard:
 
     @staticmethod
     def visualize_piece_numbers(dict_piece_locations):
+        if isinstance(dict_piece_locations, Bitboard):
+            dict_piece_locations = dict_piece_locations.to_dict()
         board = [['|    ' for _ in range(8)] for _ in range(8)]
 
         for piece, location in dict_piece_locations.items():
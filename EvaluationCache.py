@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+
+DEFAULT_MAX_SCORES = 1 << 18
+DEFAULT_MAX_MOVE_LISTS = 1 << 16
+
+
+class LRUCache:
+    """
+    A dictionary of at most max_entries entries that forgets the least recently used one when it is full,
+    and counts its hits and misses.
+    """
+
+    def __init__(self, max_entries):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Returns the value of key (which becomes the most recently used) or None"""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        entries[key] = value
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """Empties the cache and resets the counters"""
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+class EvaluationCache:
+    """
+    The EvaluationCache class remembers leaf scores and generated move lists, keyed by (Zobrist hash, side to move),
+    outside of the IntelligentAgent objects, so that the agents of the following moves and games reuse them
+    (Game.run_with_ia creates a new agent for every move).
+    Both tables are LRUCaches, of max_scores and max_move_lists entries.
+
+    Move lists are the same for every evaluation, but leaf scores are not: a cache must only be shared by agents
+    that evaluate positions in the same way. shared_cache(evaluation_key) returns the process-wide cache of an evaluation,
+    which is what IntelligentAgent(cache=True) uses.
+
+    The material heuristic is read from counters that make_move keeps up to date, which costs less than a cache lookup,
+    so agents only cache scores with a mobility_weight or a FeatureEvaluator; move lists are always worth caching.
+    """
+
+    def __init__(self, max_scores=DEFAULT_MAX_SCORES, max_move_lists=DEFAULT_MAX_MOVE_LISTS):
+        self.scores = LRUCache(max_scores)
+        self.moves = LRUCache(max_move_lists)
+
+    def __repr__(self):
+        return (f'EvaluationCache(scores: {len(self.scores)} entries, {100 * self.scores.hit_rate:.1f}% hits, '
+                f'moves: {len(self.moves)} entries, {100 * self.moves.hit_rate:.1f}% hits)')
+
+    def get_score(self, zobrist_hash, color):
+        return self.scores.get((zobrist_hash, color))
+
+    def put_score(self, zobrist_hash, color, score):
+        self.scores.put((zobrist_hash, color), score)
+
+    def get_moves(self, zobrist_hash, color):
+        """Returns the cached move records of a position as a tuple, or None"""
+        return self.moves.get((zobrist_hash, color))
+
+    def put_moves(self, zobrist_hash, color, moves):
+        self.moves.put((zobrist_hash, color), tuple(moves))
+
+    def clear(self):
+        """Empties both tables and resets their counters"""
+        self.scores.clear()
+        self.moves.clear()
+
+    def stats(self):
+        """Returns the size, hits, misses, evictions and hit rate of both tables as a dictionary"""
+        return {name: {'entries': len(table), 'hits': table.hits, 'misses': table.misses, 'evictions': table.evictions, 'hit_rate': table.hit_rate}
+                for name, table in (('scores', self.scores), ('moves', self.moves))}
+
+
+_shared_caches = {}  # evaluation key -> EvaluationCache of the process
+
+
+def shared_cache(evaluation_key=None):
+    """Returns the process-wide EvaluationCache of an evaluation (any hashable description of it), created on first use"""
+    cache = _shared_caches.get(evaluation_key)
+    if cache is None:
+        cache = _shared_caches[evaluation_key] = EvaluationCache()
+    return cache
+
+
+def clear_shared_caches():
+    """Empties the process-wide caches of all the evaluations"""
+    for cache in _shared_caches.values():
+        cache.clear()
@@ -0,0 +1,218 @@
+from BatchEvaluator import BatchEvaluator, PIECE_CODES
+from Move import Move
+import Squares
+import numpy as np
+import json
+
+
+FEATURES = ('material', 'kings', 'back_rank', 'center', 'mobility', 'runaway', 'tempo')
+# material plus kings worth 2, the heuristic of IntelligentAgent.ia_game_evaluation and Game.game_evaluation
+DEFAULT_WEIGHTS = {'material': 1, 'kings': 2, 'back_rank': 0, 'center': 0, 'mobility': 0, 'runaway': 0, 'tempo': 0}
+
+SQUARE_ROWS = tuple(x for x, _ in Squares.SQUARE_TO_XY)
+BLACK_BACK_RANK = tuple(sq for sq in range(Squares.NUM_SQUARES) if SQUARE_ROWS[sq] == Squares.WHITE_PROMOTION_ROW)
+WHITE_BACK_RANK = tuple(sq for sq in range(Squares.NUM_SQUARES) if SQUARE_ROWS[sq] == Squares.BLACK_PROMOTION_ROW)
+CENTER_SQUARES = tuple(sq for sq, (x, y) in enumerate(Squares.SQUARE_TO_XY) if 2 <= x <= 5 and 2 <= y <= 5)
+
+# MOVE_TARGETS[code][square] are the squares a piece of that code (see BatchEvaluator) can make a simple move to from square
+MOVE_TARGETS = {PIECE_CODES[piece_type]: tuple(tuple(Squares.NEIGHBORS[sq][direction] for direction in directions if Squares.NEIGHBORS[sq][direction] is not None)
+                                               for sq in range(Squares.NUM_SQUARES))
+                for piece_type, directions in ((Squares.BLACK_MAN, Squares.BLACK_MAN_DIRECTIONS), (Squares.BLACK_KING, Squares.KING_DIRECTIONS),
+                                               (Squares.WHITE_MAN, Squares.WHITE_MAN_DIRECTIONS), (Squares.WHITE_KING, Squares.KING_DIRECTIONS))}
+
+_ROWS = np.array(SQUARE_ROWS, dtype=np.int64)
+
+
+class FeatureEvaluator:
+    """
+    The FeatureEvaluator class scores a board as a weighted sum of features, each one white's count minus black's
+    (white is maximizing):
+    - material: men
+    - kings: kings
+    - back_rank: men still on their own back row, guarding it against promotions
+    - center: pieces on the 8 central squares (rows and columns 2 to 5)
+    - mobility: simple moves available
+    - runaway: men with no opposing piece on the rows between them and their promotion row
+    - tempo: how far the men have advanced, in rows
+    A side without pieces has lost (-win_score or win_score).
+
+    weights maps feature names to weights, the missing ones taking DEFAULT_WEIGHTS, so FeatureEvaluator() scores
+    like the hard-coded heuristic of the agents. Weights can be learned from self-play positions with WeightFitter.
+    An evaluator is plugged into IntelligentAgent(evaluator=...) and Game(evaluator=...). It scores single boards
+    in plain Python (evaluate_board, evaluate_move) for the search, and arrays of boards encoded like BatchEvaluator
+    with NumPy (features, evaluate), for fitting and batch evaluation.
+    """
+
+    def __init__(self, weights=None, win_score=1000):
+        unknown = set(weights or {}) - set(FEATURES)
+        if unknown:
+            raise ValueError(f'Unknown features {sorted(unknown)}, expected some of {FEATURES}')
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.win_score = win_score
+        self._weight_vector = np.array([self.weights[feature] for feature in FEATURES], dtype=np.float64)
+
+    def __repr__(self):
+        return f'FeatureEvaluator({self.weights})'
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.weights, f, indent=2)
+
+    @staticmethod
+    def load(path, win_score=1000):
+        with open(path) as f:
+            return FeatureEvaluator(json.load(f), win_score)
+
+    ############################## One Board ########################################
+
+    @staticmethod
+    def feature_row(row):
+        """Returns the features (in FEATURES order) of one board encoded as a list of codes (see BatchEvaluator.encode_board)"""
+        black_min_row, white_max_row = 8, -1
+        for square, code in enumerate(row):
+            if code < 0:
+                black_min_row = min(black_min_row, SQUARE_ROWS[square])
+            elif code > 0:
+                white_max_row = max(white_max_row, SQUARE_ROWS[square])
+        material = kings = center = mobility = runaway = tempo = 0
+        for square, code in enumerate(row):
+            if not code:
+                continue
+            sign = 1 if code > 0 else -1
+            if code == 1:
+                material += 1
+                tempo += 7 - SQUARE_ROWS[square]
+                runaway += SQUARE_ROWS[square] <= black_min_row
+            elif code == -1:
+                material -= 1
+                tempo -= SQUARE_ROWS[square]
+                runaway -= SQUARE_ROWS[square] >= white_max_row
+            else:
+                kings += sign
+            if square in CENTER_SQUARES:
+                center += sign
+            for target in MOVE_TARGETS[code][square]:
+                if not row[target]:
+                    mobility += sign
+        back_rank = sum(row[sq] == 1 for sq in WHITE_BACK_RANK) - sum(row[sq] == -1 for sq in BLACK_BACK_RANK)
+        return [material, kings, back_rank, center, mobility, runaway, tempo]
+
+    def evaluate_row(self, row):
+        """Returns the score of one board encoded as a list of codes"""
+        if not any(code > 0 for code in row):
+            return -self.win_score
+        if not any(code < 0 for code in row):
+            return self.win_score
+        weights = self.weights
+        return sum(weights[feature] * value for feature, value in zip(FEATURES, self.feature_row(row)) if weights[feature])
+
+    def evaluate_board(self, board_state):
+        """Returns the score of a board state dictionary or Position"""
+        return self.evaluate_row(BatchEvaluator.encode_board(board_state))
+
+    def evaluate_move(self, position):
+        """Returns the score of a Move object's board, read from its square index (see IntelligentAgent.evaluate_position)"""
+        row = [0] * Squares.NUM_SQUARES
+        for square, piece_name in position.square_index.items():
+            row[square] = PIECE_CODES[Move.piece_type(piece_name)]
+        return self.evaluate_row(row)
+
+    ############################## Arrays of Boards ########################################
+
+    @staticmethod
+    def features(encoded):
+        """Returns the features of an encoded array of boards, as an array with one row per board and one column per feature"""
+        encoded = np.asarray(encoded)
+        white_men, black_men = encoded == 1, encoded == -1
+        white, black = encoded > 0, encoded < 0
+        black_min_row = np.where(black, _ROWS, 8).min(axis=1)
+        white_max_row = np.where(white, _ROWS, -1).max(axis=1)
+        columns = [
+            white_men.sum(axis=1) - black_men.sum(axis=1),
+            (encoded == 2).sum(axis=1) - (encoded == -2).sum(axis=1),
+            white_men[:, list(WHITE_BACK_RANK)].sum(axis=1) - black_men[:, list(BLACK_BACK_RANK)].sum(axis=1),
+            white[:, list(CENTER_SQUARES)].sum(axis=1) - black[:, list(CENTER_SQUARES)].sum(axis=1),
+            BatchEvaluator.mobility(encoded),
+            (white_men & (_ROWS <= black_min_row[:, None])).sum(axis=1) - (black_men & (_ROWS >= white_max_row[:, None])).sum(axis=1),
+            (white_men * (7 - _ROWS)).sum(axis=1) - (black_men * _ROWS).sum(axis=1),
+        ]
+        return np.stack(columns, axis=1).astype(np.float64)
+
+    def evaluate(self, encoded):
+        """Returns the scores of an encoded array of boards (the same as evaluate_row on each), like BatchEvaluator.evaluate"""
+        encoded = np.asarray(encoded)
+        scores = self.features(encoded) @ self._weight_vector
+        scores = np.where((encoded > 0).sum(axis=1) == 0, -self.win_score, scores)
+        scores = np.where((encoded < 0).sum(axis=1) == 0, self.win_score, scores)
+        return scores
+
+    def evaluate_boards(self, board_states):
+        """Returns the scores of a list of board state dictionaries"""
+        return self.evaluate(BatchEvaluator.encode_boards(board_states))
+
+
+class WeightFitter:
+    """
+    The WeightFitter class learns the weights of a FeatureEvaluator from labeled positions: encoded boards
+    and game results (1 white won, -1 black won, 0 draw), such as the shards of TrainingData.
+    - method='logistic' fits the probability of a white win, sigmoid(weights . features), to the results
+      (a draw counts as half a win) with Newton's method
+    - method='least_squares' fits weights . features to the results directly
+    Both add l2 times the squared weights to the loss, which keeps features that never vary in the data at 0.
+    The weights are then scaled so that the material weight is 1, keeping scores in men like the search expects.
+
+    The data is read in batches and only sums of features products are kept, so a ShardLoader of any size can be used;
+    the logistic fit reads it once per iteration.
+    """
+
+    def __init__(self, method='logistic', features=FEATURES, l2=1e-3, iterations=8):
+        if method not in ('logistic', 'least_squares'):
+            raise ValueError(f"Unknown method {method!r}, expected 'logistic' or 'least_squares'")
+        self.method = method
+        self.features = tuple(features)
+        self.l2 = l2
+        self.iterations = iterations
+        self._columns = [FEATURES.index(feature) for feature in self.features]
+
+    def _batches(self, data):
+        """Yields (features, results) from a tuple (encoded boards, results) or from the batches of a ShardLoader"""
+        batches = [data] if isinstance(data, tuple) else ((batch['board'], batch['result']) for batch in data)
+        for boards, results in batches:
+            yield FeatureEvaluator.features(boards)[:, self._columns], np.asarray(results, dtype=np.float64)
+
+    def fit(self, data, win_score=1000):
+        """Returns a FeatureEvaluator with the weights fitted on data, see _batches"""
+        size = len(self.features)
+        regularization = self.l2 * np.eye(size)
+        weights = np.zeros(size)
+        if self.method == 'least_squares':
+            xtx, xty = regularization.copy(), np.zeros(size)
+            for x, results in self._batches(data):
+                xtx += x.T @ x
+                xty += x.T @ results
+            weights = np.linalg.solve(xtx, xty)
+        else:
+            for _ in range(self.iterations):
+                hessian, gradient = regularization.copy(), self.l2 * weights
+                for x, results in self._batches(data):
+                    probabilities = 1 / (1 + np.exp(-(x @ weights)))
+                    gradient += x.T @ (probabilities - (results + 1) / 2)
+                    hessian += (x * (probabilities * (1 - probabilities))[:, None]).T @ x
+                weights = weights - np.linalg.solve(hessian, gradient)
+        if 'material' in self.features and weights[self.features.index('material')] > 0:
+            weights = weights / weights[self.features.index('material')]
+        fitted = dict.fromkeys(FEATURES, 0.0)
+        fitted.update((feature, float(weight)) for feature, weight in zip(self.features, weights))
+        return FeatureEvaluator(fitted, win_score)
+
+
+if __name__ == '__main__':
+    # python FeatureEvaluator.py <shard directory (see TrainingData)> [output weights file] [logistic|least_squares]
+    from TrainingData import ShardLoader
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'training_data'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else 'weights.json'
+    fitter = WeightFitter(sys.argv[3] if len(sys.argv) > 3 else 'logistic')
+    evaluator = fitter.fit(ShardLoader(directory, batch_size=65536))
+    evaluator.save(output_path)
+    print(f'{evaluator.weights} written to {output_path}')
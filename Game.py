@@ -1,8 +1,11 @@
 from Location import Location
-from Move import Move
-from CheckerBoard import CheckerBoard
-from NaiveAgent import NaiveAgent
-from IntelligentAgent import IntelligentAgent
+from Bitboard import Bitboard
+from TranspositionTable import TranspositionTable
+from PositionHistory import PositionHistory, DEFAULT_NO_PROGRESS_LIMIT
+from SearchStats import SearchStats
+from GameLoop import GameLoop, NaivePlayer, IntelligentPlayer, BoardPrinter, Pacer, StatsCollector
+from GameRecord import GameRecordWriter
+from Position import Position, board_dict
 import time
 
 
@@ -10,10 +13,33 @@ class Game:
     """
     The Game class is used to run one or multiple games of checkers. 
     It also maintains the rules of the game including initializing the board, checking for promotions (kings), and checking for the winner.
+    A game is a draw when a position occurs for the third time or after draw_ply_limit plies without a capture or a man moving
+    (see PositionHistory).
+    The games are played by a GameLoop, which only prints or waits through its observers: play() runs a game between any two players
+    from any position, run() and run_with_ia() build the players and the observers from their arguments.
+    With an evaluator (a FeatureEvaluator), game_evaluation and the intelligent agents of run_with_ia score boards with it
+    instead of the material heuristic.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, evaluator=None) -> None:
+        self.evaluator = evaluator
         self.board_state = {}
+        self.history = None  # PositionHistory of the game being played
+        self.next_player = 'black'  # side to move in self.board_state
+        self.search_stats = {}  # color -> SearchStats of the intelligent agent's searches in the last game
+
+    def start_history(self, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT):
+        """Starts a new position history from the current board state, black to move"""
+        self.next_player = 'black'
+        self.history = PositionHistory(draw_ply_limit)
+        self.history.push_board(self.board_state, 'black')
+        return self.history
+
+    def record_move(self, board_state, next_player):
+        """Adds the position after a move (from board_state to the current board state) to the history, next_player to move"""
+        self.next_player = next_player
+        if self.history is not None:
+            self.history.push_board(self.board_state, next_player, PositionHistory.is_progress(board_state, self.board_state))
 
     def initialize_board(self):
         self.board_state = {'black_piece_1': Location(0, 1), 
@@ -50,6 +76,8 @@ class Game:
         :param position: The position of the piece to check for promotion, in (row, column) format.
 
         Returns the board state with the piece promoted to king
+        Moves generated by Move already promote the men that reach the other end of the board,
+        so this only changes board states that were set up or moved by hand.
         """
         black_dict_piece_locations = {key: value for key, value in self.board_state.items() if key.startswith('black_')}
         white_dict_piece_locations = {key: value for key, value in self.board_state.items() if key.startswith('white_')}
@@ -68,26 +96,17 @@ class Game:
         
         return self.board_state
 
-    def winner(self):
-        """Check if the game is over and return the winner"""
-        black_pieces = [location for key, location in self.board_state.items() if key.startswith('black_')]
-        white_pieces = [location for key, location in self.board_state.items() if key.startswith('white_')]
-        king_black_pieces = [location for key, location in self.board_state.items() if key.startswith('king_black_')]
-        king_white_pieces = [location for key, location in self.board_state.items() if key.startswith('king_white_')]
-        
-        if len(white_pieces) == 0 and len(king_white_pieces) == 0:
-            return 'Black'
-        elif len(black_pieces) == 0 and len(king_black_pieces) == 0:
-            return 'White'
-        # check if there are no possible moves for the current player
-        nextMoveblack = Move(self.board_state, 'black')
-        nextMovewhite = Move(self.board_state, 'white')
-        if len(nextMoveblack.get_legal_moves()) == 0:
-            print('No possible moves for black, white wins')
-            return 'White'
-        if len(nextMovewhite.get_legal_moves()) == 0:
-            print('No possible moves for white, black wins')
-            return 'Black'
+    def winner(self, color=None):
+        """
+        Check if the game is over and return the winner, 'Draw' if the game is drawn.
+        The side to move (color, self.next_player if None) loses if it has no legal move, like in GameLoop.
+        """
+        # the pieces and the moves are checked with mask operations on a Bitboard, without generating the moves
+        winning_player = Bitboard.from_dict(self.board_state).winner(color or self.next_player)
+        if winning_player is not None:
+            return winning_player
+        if self.history is not None and self.history.is_draw():
+            return 'Draw'
     
         return None # game is not over yet
 
@@ -102,160 +121,172 @@ class Game:
             return -1000
         elif winning_player == 'White':
             return 1000
+        elif winning_player == 'Draw':
+            return 0
 
-        black_pieces = [location for key, location in self.board_state.items() if key.startswith('black_')]
-        white_pieces = [location for key, location in self.board_state.items() if key.startswith('white_')]
-        king_black_pieces = [location for key, location in self.board_state.items() if key.startswith('king_black_')]
-        king_white_pieces = [location for key, location in self.board_state.items() if key.startswith('king_white_')]
-
-        return len(white_pieces) + (len(king_white_pieces)*2) - len(black_pieces) - (len(king_black_pieces)*2)
+        if self.evaluator is not None:
+            return self.evaluator.evaluate_board(self.board_state)
+        return Bitboard.from_dict(self.board_state).evaluate()
 
 
 
 
 
-    def run(self, show_board=True):
+    def play(self, black, white, board_state=None, first_player='black', observers=(), draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT, max_turns=None):
         """
-        The run() method runs a game of checkers. It initializes the board, and then runs the game turn by turn until there is a winner.
+        Plays a game between two players (see GameLoop.Player) without printing or waiting, unless observers do,
+        from board_state (the initial board if None) with first_player to move. Returns (winner, number of turns).
+        board_state can be a Position, the game is then played on Positions.
+        Afterwards the board state, the side to move and the position history of the game are in self.board_state,
+        self.next_player and self.history.
+        """
+        if board_state is None:
+            board_state = self.initialize_board()
+        else:
+            self.board_state = board_dict(board_state)
+            promoted_board_state = self.check_for_promotion()  # a position set up by hand may have men on the last row
+            board_state = Position.from_dict(promoted_board_state) if isinstance(board_state, Position) else promoted_board_state
+        loop = GameLoop(black, white, observers, draw_ply_limit, max_turns)
+        result = loop.play(board_state, first_player)
+        self.board_state = loop.board_state
+        self.next_player = loop.color
+        self.history = loop.history
+        return result
+
+    def run(self, show_board=True, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT):
+        """
+        The run() method runs a game of checkers. It initializes the board, and then runs the game turn by turn until there is a winner or a draw.
         In this version of the game, both black and white players are naive agents that make random moves.
+        draw_ply_limit: int, the number of plies without a capture or a man moving after which the game is a draw, None for no limit
+        Returns (winner, number of turns), the winner being 'Black', 'White' or 'Draw'.
         """
-        self.board_state = self.initialize_board()
-        if show_board:
-            print('Initialize Board:')
-            CheckerBoard.visualize_piece_numbers(self.board_state)
-        i = 0
-        current_player = 'black'  # Start with black
-        while self.winner() is None:
-            i += 1
-            if show_board:
-                print(f"\n\n{current_player.capitalize()}'s turn (turn {i}):")
-            naiveagent = NaiveAgent(current_player, self.board_state)
-            self.board_state = naiveagent.make_next_random_move(show_board) 
-            self.check_for_promotion()  # did any of the moves make any pieces a king?
-            if show_board:
-                print()
-                CheckerBoard.visualize_piece_numbers(self.board_state)
-                print(self.board_state)
-            
-            winning_player = self.winner()
-            if winning_player != None:
-                print(f"{winning_player} wins!")
-                break
-            if show_board:
-                print(f'Board score: {self.game_evaluation(current_player)}')
-            # Switch player
-            current_player = 'white' if current_player == 'black' else 'black'
-        if show_board:
-            print(f'Final board score: {self.game_evaluation(current_player)}')
-
-
-
+        observers = [BoardPrinter()] if show_board else []
+        return self.play(NaivePlayer(), NaivePlayer(), observers=observers, draw_ply_limit=draw_ply_limit)
 
-    def run_with_ia(self, black='intelligent', white='naive', board_depth = 3, show_board=True):
+    def run_with_ia(self, black='intelligent', white='naive', board_depth = 3, show_board=True, search_algorithm='minimax', transposition_table_mb=None, time_budget_ms=None, tablebase=None, opening_book=None, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT,
+                    board_state=None, first_player='black', observers=(), quiescence=False, cache=False):
         """
-        The run_with_ia() method runs a game of checkers. It initializes the board, and then runs the game turn by turn until there is a winner.
+        The run_with_ia() method runs a game of checkers. It initializes the board, and then runs the game turn by turn until there is a winner or a draw.
         In this version of the game, the black player is an intelligent agent that uses the minimax algorithm and the white player is a naive agent that makes random moves.
+        search_algorithm: str, the search used by the intelligent agents, 'minimax', 'alphabeta' or 'pvs' (principal variation search,
+        alpha-beta with null windows, see IntelligentAgent.pvs)
+        transposition_table_mb: int, if set, the intelligent agents share a transposition table of this size (in MB) for the whole game (alphabeta and pvs only)
+        time_budget_ms: float, if set, the intelligent agents search each move with iterative deepening alpha-beta for this many milliseconds instead of to board_depth.
+        With 'pvs', every iteration is a principal variation search that first tries a window of IntelligentAgent.ASPIRATION_WINDOW around
+        the value of the previous iteration, and searches again with the full window if the value falls outside of it
+        tablebase: Tablebase, if set, the intelligent agents look up the exact result of endgame positions (alphabeta and pvs only)
+        opening_book: OpeningBook, if set, the intelligent agents play book moves while the position is in the book
+        draw_ply_limit: int, the number of plies without a capture or a man moving after which the game is a draw, None for no limit
+        board_state, first_player: the position to start from (the initial board if None) and the side to move
+        observers: list of GameObserver, called as the game is played, in addition to the board printing and pacing of show_board
+        quiescence: bool, if True, the intelligent agents search the pending captures of the leaves of their search (see IntelligentAgent)
+        cache: bool, if True, the intelligent agents reuse the leaf scores and move lists of the process-wide EvaluationCache,
+        across the moves and the games played by the process
+        The intelligent agents score positions that repeat an earlier position of the game or of the line they search as draws.
+        The statistics of their searches are added up in self.search_stats for each color.
+        Returns (winner, number of turns), the winner being 'Black', 'White' or 'Draw'.
         """
-        
-        self.board_state = self.initialize_board()
-        if show_board:
-            print('Black is the Intelligent Agent, White is the Naive Agent')
-            print('Initialize Board:')
-            CheckerBoard.visualize_piece_numbers(self.board_state)
-        i = 0
-        current_player = 'black'  # Start with black
-        while self.winner() is None:
-            i += 1
-            if show_board:
-                print(f"\n\n{current_player.capitalize()}'s turn (turn {i}):")
-            if current_player == 'black':
-                if black == 'naive':
-                    naiveagent = NaiveAgent(current_player, self.board_state)
-                    self.board_state = naiveagent.make_next_random_move(show_board=False) 
-                elif black == 'intelligent':
-                    intelligentagent = IntelligentAgent(current_player, self.board_state)
-                    self.board_state = intelligentagent.make_intelligent_move(self.board_state, board_depth, False, show_minimax_boards=False)
-            else: # white's turn
-                if white == 'naive':
-                    naiveagent = NaiveAgent(current_player, self.board_state)
-                    self.board_state = naiveagent.make_next_random_move(show_board=False) 
-                elif white == 'intelligent':
-                    intelligentagent = IntelligentAgent(current_player, self.board_state)
-                    self.board_state = intelligentagent.make_intelligent_move(self.board_state, board_depth, True, show_minimax_boards=False)
-
-            self.check_for_promotion()  # did any of the moves make any pieces a king?
-            if show_board:
-                print()
-                CheckerBoard.visualize_piece_numbers(self.board_state)
-                print(self.board_state)
-            
-            winning_player = self.winner()
-            if winning_player != None:
-                print(f"{winning_player} wins!")
-                if show_board:
-                    print(f'Board score: {self.game_evaluation(current_player)}')
-                return winning_player, i
-            # Switch player
-            time.sleep(0.5)
-            current_player = 'white' if current_player == 'black' else 'black'
+        transposition_table = TranspositionTable(transposition_table_mb) if transposition_table_mb else None
+        players = {}
+        for color, agent in (('black', black), ('white', white)):
+            if agent == 'naive':
+                players[color] = NaivePlayer()
+            elif agent == 'intelligent':
+                players[color] = IntelligentPlayer(board_depth, search_algorithm, transposition_table, time_budget_ms, tablebase, opening_book, quiescence=quiescence,
+                                                   evaluator=self.evaluator, cache=cache or None)
+            else:
+                raise ValueError(f"Unknown agent {agent!r}, expected 'naive' or 'intelligent'")
+        stats_collector = StatsCollector()
+        observers = [stats_collector, *observers]
         if show_board:
-            print(f'Final board score: {self.game_evaluation(current_player)}')
+            print(f'Black is the {black.capitalize()} Agent, White is the {white.capitalize()} Agent')
+            observers += [BoardPrinter(), Pacer(0.5)]  # give time to follow the game, only needed when it is displayed
+        result = self.play(players['black'], players['white'], board_state, first_player, observers, draw_ply_limit)
+        self.search_stats = {color: stats_collector.stats[color] for color, player in players.items() if isinstance(player, IntelligentPlayer)}
+        return result
 
     
-    def run_naive_multiple_games(self, num_games=1000):
+    def run_naive_multiple_games(self, num_games=1000, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT):
         """
         Run multiple games of checkers with two naive agents and print the results.
         """
         black_wins = 0
         white_wins = 0
+        draws = 0
         game_durations = []
 
         for _ in range(num_games):
             print(f"\n\nPlaying Game {_ + 1}:")
             start_time = time.time()
-            self.run(show_board=False)
+            winning_player, _ = self.run(show_board=False, draw_ply_limit=draw_ply_limit)
             end_time = time.time()
             duration = end_time - start_time
             game_durations.append(duration)
 
-            winning_player = self.winner()  # Check the winner after the game ends
             if winning_player == 'Black':
                 black_wins += 1
             elif winning_player == 'White':
                 white_wins += 1
+            elif winning_player == 'Draw':
+                draws += 1
         
         print(f"Black wins: {black_wins}")
         print(f"White wins: {white_wins}")
+        print(f"Draws: {draws}")
         print(f"Average game duration: {sum(game_durations) / len(game_durations):.2f} seconds")
 
 
-    def run_ia_multiple_games(self, board_depth, num_games=1000):
+    def run_ia_multiple_games(self, board_depth=3, num_games=1000, search_algorithm='minimax', transposition_table_mb=None, time_budget_ms=None, tablebase=None, opening_book=None, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT,
+                              record_path=None, quiescence=False, cache=False):
         """
         Runs multiple games of checkers with an intelligent agent and a naive agent and prints the results.
+        If time_budget_ms is set, the intelligent agent searches each move for that many milliseconds instead of to board_depth.
+        quiescence and cache are passed to run_with_ia: with cache=True, the leaf scores and move lists of the process-wide
+        EvaluationCache are reused from one game to the next.
+        The search statistics of all the games are added up and printed, and returned as a SearchStats.
+        If record_path is set, the games are appended to that game record file (see GameRecord) as they are played.
         """
         black_wins = 0
         white_wins = 0
+        draws = 0
         game_durations = []
         turns_to_win = []
+        total_stats = SearchStats()
+        observers = [GameRecordWriter(record_path)] if record_path is not None else []
 
         for _ in range(num_games):
             print(f"\n\nPlaying Game {_ + 1}:")
             start_time = time.time()
-            winning_player, nb_turns = self.run_with_ia(board_depth=board_depth, show_board=False)
+            winning_player, nb_turns = self.run_with_ia(board_depth=board_depth, show_board=False, search_algorithm=search_algorithm, transposition_table_mb=transposition_table_mb, time_budget_ms=time_budget_ms, tablebase=tablebase, opening_book=opening_book, draw_ply_limit=draw_ply_limit,
+                                                        observers=observers, quiescence=quiescence, cache=cache)
             end_time = time.time()
             duration = end_time - start_time
             game_durations.append(duration)
+            for stats in self.search_stats.values():
+                total_stats.merge(stats)
 
             # Check the winner after the game ends
             if winning_player == 'Black':
                 black_wins += 1
             elif winning_player == 'White':
                 white_wins += 1
+            elif winning_player == 'Draw':
+                draws += 1
 
             # Check the number of turns it took to win
-            turns_to_win.append(nb_turns)
+            if winning_player != 'Draw':
+                turns_to_win.append(nb_turns)
 
         print(f"Black wins: {black_wins}")
         print(f"White wins: {white_wins}")
+        print(f"Draws: {draws}")
         print(f"Average game duration: {sum(game_durations) / len(game_durations):.2f} seconds")
-        print(f"Average number of turns to win: {sum(turns_to_win) / len(turns_to_win):.2f}")
+        if turns_to_win:
+            print(f"Average number of turns to win: {sum(turns_to_win) / len(turns_to_win):.2f}")
+        for observer in observers:
+            observer.close()
+        if total_stats.searches:
+            print(f"Searches: {total_stats.searches}, average nodes per search: {total_stats.nodes / total_stats.searches:.0f}, "
+                  f"effective branching factor: {total_stats.effective_branching_factor:.2f}, cutoffs: {total_stats.cutoffs}, "
+                  f"transposition table hits: {total_stats.tt_hits}/{total_stats.tt_probes}, nodes per second: {total_stats.to_dict()['nodes_per_second']:.0f}")
+        return total_stats
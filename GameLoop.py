@@ -0,0 +1,178 @@
+from Move import Move
+from Bitboard import Bitboard
+from CheckerBoard import CheckerBoard
+from IntelligentAgent import IntelligentAgent
+from PositionHistory import PositionHistory, DEFAULT_NO_PROGRESS_LIMIT
+from SearchStats import SearchStats
+import random
+import time
+
+
+class Player:
+    """
+    A Player chooses the moves of one side of a GameLoop.
+    choose_move receives the legal moves (new board states) the loop already generated for the turn and returns one of them.
+    stats is the SearchStats of the last move, None for players that don't search,
+    and value the score the search gave to that move (white is maximizing), None when the move was not searched.
+    """
+    stats = None
+    value = None
+
+    def start_game(self, color):
+        """Called before each game with the color the player plays"""
+
+    def choose_move(self, board_state, color, legal_moves, history):
+        raise NotImplementedError
+
+
+class NaivePlayer(Player):
+    """Plays a random legal move, like NaiveAgent (captures are mandatory, so they are the only legal moves when available)"""
+
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def choose_move(self, board_state, color, legal_moves, history):
+        return self.rng.choice(legal_moves)
+
+
+class IntelligentPlayer(Player):
+    """
+    Plays the move of an IntelligentAgent searching to depth with search_algorithm, or for time_budget_ms with iterative deepening.
+    The transposition table, tablebase and opening book are shared by all the moves (and the games) the player plays,
+    and the other keyword arguments are passed to IntelligentAgent (psq_weight, mobility_weight...).
+    When there is a single legal move it is played without searching.
+    """
+
+    def __init__(self, depth=3, search_algorithm='minimax', transposition_table=None, time_budget_ms=None, tablebase=None, opening_book=None, **agent_options):
+        self.depth = depth
+        self.search_algorithm = search_algorithm
+        self.transposition_table = transposition_table
+        self.time_budget_ms = time_budget_ms
+        self.tablebase = tablebase
+        self.opening_book = opening_book
+        self.agent_options = agent_options
+
+    def choose_move(self, board_state, color, legal_moves, history):
+        if len(legal_moves) == 1:
+            self.stats = SearchStats()
+            self.value = None
+            return legal_moves[0]
+        agent = IntelligentAgent(color, board_state, self.transposition_table, tablebase=self.tablebase, opening_book=self.opening_book,
+                                 position_history=history, **self.agent_options)
+        new_board_state = agent.make_intelligent_move(board_state, self.depth, color == 'white', show_minimax_boards=False,
+                                                      search_algorithm=self.search_algorithm, time_budget_ms=self.time_budget_ms)
+        self.stats = agent.stats
+        self.value = agent.value
+        return new_board_state
+
+
+class GameObserver:
+    """
+    Base class of the observers of a GameLoop: rendering, pacing, recording... are observers, so that the loop itself
+    does nothing but play. Override the methods you need.
+    """
+
+    def on_game_start(self, loop, board_state, color):
+        """Called before the first move, color being the side to move"""
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        """Called after each move of color, from previous_board_state to board_state, stats being the SearchStats of the move or None"""
+
+    def on_game_end(self, loop, winner, turns):
+        """Called when the game is over, winner being 'Black', 'White', 'Draw', or None if the game was stopped after max_turns"""
+
+
+class BoardPrinter(GameObserver):
+    """Prints the board after each move and the result of the game"""
+
+    def on_game_start(self, loop, board_state, color):
+        print('Initialize Board:')
+        CheckerBoard.visualize_piece_numbers(board_state)
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        print(f"\n\n{color.capitalize()}'s turn (turn {turn}):")
+        CheckerBoard.visualize_piece_numbers(board_state)
+        print(f'Board score: {Bitboard.from_dict(board_state).evaluate()}')
+
+    def on_game_end(self, loop, winner, turns):
+        if winner is not None:
+            print('Draw!' if winner == 'Draw' else f'{winner} wins!')
+
+
+class Pacer(GameObserver):
+    """Waits delay seconds after each move so that a game can be followed on screen"""
+
+    def __init__(self, delay=0.5):
+        self.delay = delay
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        time.sleep(self.delay)
+
+
+class StatsCollector(GameObserver):
+    """Adds up the SearchStats of the moves of each color, over all the games it observes"""
+
+    def __init__(self):
+        self.stats = {'black': SearchStats(), 'white': SearchStats()}
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        if stats is not None:
+            self.stats[color].merge(stats)
+
+
+class GameLoop:
+    """
+    The GameLoop class plays games of checkers as fast as possible between two players, one per side (see Player),
+    from any position. It doesn't print or wait: rendering and pacing are observers (see GameObserver), added when needed.
+
+    The legal moves of the side to move are generated once per turn; they are both the game-over check
+    (a side with no legal move, blocked or without pieces, has lost) and the choices given to the player.
+    The game is a draw when a position occurs for the third time or after draw_ply_limit plies without progress (see PositionHistory).
+    max_turns stops the game after that many moves, with no winner.
+    """
+
+    def __init__(self, black, white, observers=(), draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT, max_turns=None):
+        self.players = {'black': black, 'white': white}
+        self.observers = list(observers)
+        self.draw_ply_limit = draw_ply_limit
+        self.max_turns = max_turns
+        self.board_state = None
+        self.color = None  # side to move in board_state
+        self.history = None
+
+    def play(self, board_state, color='black'):
+        """Plays a game from board_state with color to move and returns (winner, number of turns), see GameObserver.on_game_end"""
+        self.board_state = board_state
+        self.color = color
+        self.history = history = PositionHistory(self.draw_ply_limit)
+        history.push_board(board_state, color)
+        for player_color, player in self.players.items():
+            player.start_game(player_color)
+        for observer in self.observers:
+            observer.on_game_start(self, board_state, color)
+
+        turns = 0
+        while True:
+            legal_moves = Move(board_state, color).get_legal_moves()
+            opponent_color = 'white' if color == 'black' else 'black'
+            if not legal_moves:
+                winner = opponent_color.capitalize()
+                break
+            if history.is_draw():
+                winner = 'Draw'
+                break
+            if self.max_turns is not None and turns >= self.max_turns:
+                winner = None
+                break
+            turns += 1
+            player = self.players[color]
+            new_board_state = player.choose_move(board_state, color, legal_moves, history)
+            history.push_board(new_board_state, opponent_color, PositionHistory.is_progress(board_state, new_board_state))
+            for observer in self.observers:
+                observer.on_move(self, turns, color, board_state, new_board_state, player.stats)
+            self.board_state = board_state = new_board_state
+            self.color = color = opponent_color
+
+        for observer in self.observers:
+            observer.on_game_end(self, winner, turns)
+        return winner, turns
@@ -0,0 +1,198 @@
+from Bitboard import Bitboard
+from GameLoop import GameObserver
+import Squares
+import os
+import struct
+
+
+MAGIC = b'CKGR'
+VERSION = 1
+HEADER = struct.Struct('<4sH')  # magic, version
+
+# a record file is a header followed by chunks, each starting with a tag byte
+GAME_START = b'S'
+MOVE = b'M'
+GAME_END = b'E'
+GAME_START_CHUNK = struct.Struct('<BIII')  # side to move (0 black, 1 white), black, white and kings bitboards
+MOVE_CHUNK = struct.Struct('<BBIIIIHf')  # from square, to square, captured mask, nodes, leaf evaluations, cutoffs, depth, search time
+GAME_END_CHUNK = struct.Struct('<BH')  # result, number of turns
+CHUNK_SIZES = {GAME_START: GAME_START_CHUNK.size, MOVE: MOVE_CHUNK.size, GAME_END: GAME_END_CHUNK.size}
+
+RESULTS = (None, 'Black', 'White', 'Draw')
+PDN_RESULTS = {None: '*', 'Black': '1-0', 'White': '0-1', 'Draw': '1/2-1/2'}
+INITIAL_BITBOARD = Bitboard(black=(1 << 12) - 1, white=((1 << 12) - 1) << 20, kings=0)
+
+
+def find_move(bitboard, new_bitboard, color):
+    """
+    Returns the move (from square, to square, captured mask) played from bitboard to new_bitboard by color.
+    The move is read from the squares that changed, except for a king capturing all the way back to its square,
+    which is looked up in the legal moves.
+    """
+    own, new_own = (bitboard.black, new_bitboard.black) if color == 'black' else (bitboard.white, new_bitboard.white)
+    opponent, new_opponent = (bitboard.white, new_bitboard.white) if color == 'black' else (bitboard.black, new_bitboard.black)
+    captured = opponent & ~new_opponent
+    left, arrived = own & ~new_own, new_own & ~own
+    if left:
+        return left.bit_length() - 1, arrived.bit_length() - 1, captured
+    for move in bitboard.legal_moves(color):
+        if move[0] == move[1] and move[2] == captured:
+            return move
+    raise ValueError('the new board is not reached by a legal move')
+
+
+class GameRecord:
+    """
+    A game read from a record file: the start position (a Bitboard and the side to move), the moves as
+    (from square, to square, captured mask) tuples, the search statistics of each move as
+    (nodes, leaf evaluations, cutoffs, depth, time) tuples (zeros for moves that were not searched),
+    the result ('Black', 'White', 'Draw' or None if the game was stopped or the file was cut) and the number of turns.
+    """
+
+    def __init__(self, bitboard, color):
+        self.bitboard = bitboard
+        self.color = color
+        self.moves = []
+        self.stats = []
+        self.winner = None
+        self.turns = 0
+
+    def replay(self):
+        """Yields (Bitboard, side to move) for the start position and after each move"""
+        bitboard, color = self.bitboard, self.color
+        yield bitboard, color
+        for move in self.moves:
+            bitboard = bitboard.apply(move, color).promote()
+            color = 'white' if color == 'black' else 'black'
+            yield bitboard, color
+
+    def board_states(self):
+        """Yields the board state dictionaries of the game, see replay"""
+        for bitboard, color in self.replay():
+            yield bitboard.to_dict(), color
+
+    def to_pdn(self, event='Checkers game'):
+        """
+        Returns the game in Portable Draughts Notation: squares are numbered 1 to 32 from black's back row,
+        black (which moves first) is listed first in the result, and the start position is given as a FEN tag if it is not the initial one.
+        """
+        tags = [f'[Event "{event}"]', f'[Result "{PDN_RESULTS[self.winner]}"]']
+        if self.bitboard != INITIAL_BITBOARD or self.color != 'black':
+            tags.append(f'[FEN "{self._fen()}"]')
+        text = []
+        color = self.color
+        for ply, (from_square, to_square, captured) in enumerate(self.moves):
+            if ply == 0 or color == 'black':
+                text.append(f'{ply // 2 + 1}.' if color == 'black' else f'{ply // 2 + 1}...')
+            text.append(f"{from_square + 1}{'x' if captured else '-'}{to_square + 1}")
+            color = 'white' if color == 'black' else 'black'
+        text.append(PDN_RESULTS[self.winner])
+        return '\n'.join(tags) + '\n\n' + ' '.join(text) + '\n'
+
+    def _fen(self):
+        def pieces(own):
+            return ','.join(f"{'K' if self.bitboard.kings & Squares.SQUARE_MASKS[sq] else ''}{sq + 1}" for sq in Squares.iter_bits(own))
+        return f"{'B' if self.color == 'black' else 'W'}:W{pieces(self.bitboard.white)}:B{pieces(self.bitboard.black)}"
+
+
+class GameRecordWriter(GameObserver):
+    """
+    The GameRecordWriter class streams games to an append-only binary record file as they are played.
+    It is a GameObserver: add it to the observers of a GameLoop (or of Game.run_with_ia) and every game is written,
+    move by move, with the search statistics of each move and the result.
+
+    Each event is a small fixed-size chunk written as soon as it happens (a game start, a move, a game end), so nothing
+    but the file buffer is kept in memory however many games are written, and the file is flushed at the end of each game.
+    Opening an existing file appends to it; a game cut short by a crash is read back without a result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if is_new:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+        self._bitboard = None
+        self.games_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def on_game_start(self, loop, board_state, color):
+        self._bitboard = bitboard = Bitboard.from_dict(board_state)
+        self.file.write(GAME_START + GAME_START_CHUNK.pack(color == 'white', bitboard.black, bitboard.white, bitboard.kings))
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        new_bitboard = Bitboard.from_dict(board_state)
+        from_square, to_square, captured = find_move(self._bitboard, new_bitboard, color)
+        if stats is None:
+            nodes = leaf_evaluations = cutoffs = depth = 0
+            search_time = 0.0
+        else:
+            nodes, leaf_evaluations, cutoffs, depth, search_time = stats.nodes, stats.leaf_evaluations, stats.cutoffs, stats.depth, stats.time
+        self.file.write(MOVE + MOVE_CHUNK.pack(from_square, to_square, captured, nodes, leaf_evaluations, cutoffs, min(depth, 0xFFFF), search_time))
+        self._bitboard = new_bitboard
+
+    def on_game_end(self, loop, winner, turns):
+        self.file.write(GAME_END + GAME_END_CHUNK.pack(RESULTS.index(winner), min(turns, 0xFFFF)))
+        self.file.flush()
+        self.games_written += 1
+
+
+class GameRecordReader:
+    """
+    The GameRecordReader class reads a record file written by GameRecordWriter lazily: iterating over it
+    yields one GameRecord at a time, reading the file in order through a buffer, so files of millions of games
+    can be scanned without loading them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+            raise ValueError(f'{path} is not a checkers game record file')
+        if HEADER.unpack(header)[1] != VERSION:
+            raise ValueError(f'{path} has version {HEADER.unpack(header)[1]}, expected {VERSION}')
+
+    def __iter__(self):
+        record = None
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER.size)
+            while True:
+                tag = f.read(1)
+                if tag not in CHUNK_SIZES:
+                    break  # end of the file (or a chunk cut short by a crash)
+                chunk = f.read(CHUNK_SIZES[tag])
+                if len(chunk) < CHUNK_SIZES[tag]:
+                    break
+                if tag == GAME_START:
+                    if record is not None:
+                        yield record  # the previous game never ended
+                    is_white, black, white, kings = GAME_START_CHUNK.unpack(chunk)
+                    record = GameRecord(Bitboard(black, white, kings), 'white' if is_white else 'black')
+                elif tag == MOVE:
+                    from_square, to_square, captured, *stats = MOVE_CHUNK.unpack(chunk)
+                    record.moves.append((from_square, to_square, captured))
+                    record.stats.append(tuple(stats))
+                    record.turns = len(record.moves)
+                else:
+                    result, record.turns = GAME_END_CHUNK.unpack(chunk)
+                    record.winner = RESULTS[result]
+                    yield record
+                    record = None
+        if record is not None:
+            yield record
+
+    def results(self):
+        """Counts the results of the games of the file as a dictionary winner -> number of games"""
+        counts = {}
+        for record in self:
+            counts[record.winner] = counts.get(record.winner, 0) + 1
+        return counts
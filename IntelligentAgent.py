@@ -1,77 +1,309 @@
 import numpy as np
+import time
 from Move import Move
+from Bitboard import Bitboard
 from Location import Location
 from CheckerBoard import CheckerBoard
+from TranspositionTable import ZOBRIST, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE
+from BatchEvaluator import BatchEvaluator
+from Tablebase import DRAW, WIN
+from SearchStats import SearchStats, MAX_PLIES
+from Position import Position, board_dict
+from EvaluationCache import shared_cache
+
+
+SEARCH_ALGORITHMS = ('minimax', 'alphabeta', 'pvs')
+MAX_SEARCH_DEPTH = 64
+NULL_WINDOW = 1e-6  # width of the windows principal variation search tests moves with, smaller than any difference between two scores
+ASPIRATION_WINDOW = 1.5  # half-width of the window iterative deepening searches first around the previous score: a man and a half
+WIN_SCORE = 1000
+WIN_THRESHOLD = WIN_SCORE // 2  # scores beyond this are won or lost games, material alone never gets this far
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget of an iterative deepening search runs out"""
 
 
 class IntelligentAgent():
     """
     The IntelligentAgent class is used to represent an intelligent agent that makes moves on the board using the minimax algorithm.
+    The search can either be the full minimax tree (minimax_try2) or alpha-beta pruning with move ordering (alphabeta),
+    which returns the same best-move value while visiting fewer nodes.
+    nodes_searched counts the nodes visited by the last search so the two can be compared.
+
+    Alpha-beta can use a TranspositionTable to reuse the results of positions reached through different move orders.
+    The table can be passed in and kept by the caller so that consecutive moves of a game reuse earlier work.
+
+    With a time budget, iterative_deepening runs alpha-beta at depth 1, 2, 3... until the budget runs out
+    and returns the best move of the deepest search that finished.
+
+    Inside the search, positions are evaluated from the piece counts and piece-square score that Move keeps up to date
+    as moves are made and unmade (evaluate_position), and a node is lost for the side to move when its move list is empty.
+    psq_weight sets how much the piece-square score counts compared to the material, 0 keeps the material-only heuristic,
+    and mobility_weight how much the number of simple moves of white minus black counts.
+    With batch_evaluation, minimax scores all the children of a node one ply above the leaves together with a BatchEvaluator.
+    This only pays off with a mobility_weight: material and piece-square scores are already read from the incremental counters.
+    Alpha-beta doesn't, since it would score children that pruning skips; evaluate_children scores all the moves of a position at once.
+    Won and lost games are scored WIN_SCORE minus the number of plies from the root to the end of the game,
+    so that faster wins (and slower losses) are preferred.
+    With a Tablebase, alpha-beta looks up the exact result of positions with few enough pieces instead of searching them,
+    scored in the same way with the distance to the end of the game stored in the tablebase.
+    With an OpeningBook, make_intelligent_move plays a book move, chosen at random in proportion to its weight, instead of searching.
+    With a PositionHistory (the positions of the game so far), the search scores a position that repeats a position
+    of the game or of the line being searched as a draw (0), and so are positions past the no-progress limit.
+    With quiescence, a leaf where the side to move has a capture (which is mandatory) is not evaluated: the search goes on
+    through the capture sequences until a position without captures is reached (see _quiescence). quiescence_node_limit
+    caps the number of such extra nodes per search, after which the leaves are evaluated as they are.
+    With an evaluator (a FeatureEvaluator), positions are scored with its weighted features instead of the material heuristic,
+    psq_weight and mobility_weight being ignored, and batch_evaluation scores the children with the evaluator too.
+    With a cache (an EvaluationCache, or True for the process-wide one of the agent's evaluation, see shared_cache),
+    the move lists of the positions searched, and their leaf scores when the evaluation is not the material heuristic,
+    are looked up by Zobrist hash before being computed, and kept for the agents of the following moves and games.
+    The board states can be dictionaries or Positions; the boards returned are then of the same kind.
+    Every search leaves a SearchStats in stats (search(..., return_stats=True) also returns it). With collect_timings,
+    the time spent generating moves and evaluating is measured too, and hooks (a SearchHooks) are called as the search runs.
     """
 
-    def __init__(self, color, board_state):
+    def __init__(self, color, board_state, transposition_table=None, psq_weight=0, batch_evaluation=False, tablebase=None, opening_book=None, mobility_weight=0,
+                 position_history=None, hooks=None, collect_timings=False, quiescence=False, quiescence_node_limit=None,
+                 evaluator=None, cache=None):
         self.color = color
         self.board_state = board_state
         self.nextMove = Move(self.board_state, self.color)
+        self.transposition_table = transposition_table
+        self.psq_weight = psq_weight
+        self.mobility_weight = mobility_weight
+        self.evaluator = evaluator
+        self.cache = shared_cache(self.evaluation_key()) if cache is True else cache
+        self._cache_scores = self.cache is not None and (evaluator is not None or bool(mobility_weight))  # see EvaluationCache
+        if batch_evaluation:
+            self.batch_evaluator = evaluator or BatchEvaluator(psq_weight=psq_weight, mobility_weight=mobility_weight)
+        else:
+            self.batch_evaluator = None
+        self.tablebase = tablebase
+        self.opening_book = opening_book
+        self.position_history = position_history
+        self.quiescence = quiescence
+        self.quiescence_node_limit = quiescence_node_limit
+
+        # iterative deepening state, the search also stops when stop_event (a multiprocessing.Event) is set
+        self._deadline = None
+        self.stop_event = None
+        self._search_depth = 0
+        self._follow_pv = False
+        self._null_windows = False  # principal variation search, see pvs
+        self.principal_variation = []  # move keys of the best line found by the last completed iteration
+        self.pv_table = {}  # ply -> best line (move keys) found from that ply
+        self.depth_reached = 0
 
+        # search statistics and move ordering tables
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.stats = SearchStats(collect_timings)  # statistics of the last search
+        self.value = None  # score of the move chosen by the last make_intelligent_move, None for a book move
+        self.collect_timings = collect_timings
+        self.hooks = hooks
+        self.killer_moves = {}  # depth -> list of up to 2 move keys that caused a cutoff at that depth
+        self.history = {}  # (color, move key) -> history heuristic score
 
-    def ia_winner_check(self):
+
+    def ia_winner_check(self, board_state=None, color=None):
         """
-        Check if the game is over and return the winner
+        Check if the game is over and return the winner, with the rule of GameLoop (see Bitboard.winner)
+
+        board_state: dict, the board state to check, the board state of the agent if None
+        color: str, the side to move in board_state, the agent's color if None
         """
-        black_pieces = [location for key, location in self.board_state.items() if key.startswith('black_')]
-        white_pieces = [location for key, location in self.board_state.items() if key.startswith('white_')]
-        king_black_pieces = [location for key, location in self.board_state.items() if key.startswith('king_black_')]
-        king_white_pieces = [location for key, location in self.board_state.items() if key.startswith('king_white_')]
-        
-        if len(white_pieces) == 0 and len(king_white_pieces) == 0:
-            return 'Black'
-        elif len(black_pieces) == 0 and len(king_black_pieces) == 0:
-            return 'White'
-        # check if there are no possible moves for the current player
-        nextMoveblack = Move(self.board_state, 'black')
-        nextMovewhite = Move(self.board_state, 'white')
-        if len(nextMoveblack.get_legal_moves()) == 0:
-            print('No possible moves for black, white wins')
-            return 'White'
-        if len(nextMovewhite.get_legal_moves()) == 0:
-            print('No possible moves for white, black wins')
-            return 'Black'
-            
-        return None # game is not over yet
+        if board_state is None:
+            board_state = self.board_state
+        return Bitboard.from_dict(board_state).winner(color or self.color)
     
     def ia_game_evaluation(self, color, board_state):
         """
-        Returns the evaluation of the game state.
+        Returns the evaluation of the game state, color to move.
         White is the maximizing player and Black is the minimizing player.
         """
-        winning_player = self.ia_winner_check()
+        winning_player = self.ia_winner_check(board_state, color)
         if winning_player == 'Black': 
-            return -1000
+            return -WIN_SCORE
         elif winning_player == 'White':
-            return 1000
+            return WIN_SCORE
 
-        black_pieces = [location for key, location in board_state.items() if key.startswith('black_')]
-        white_pieces = [location for key, location in board_state.items() if key.startswith('white_')]
-        king_black_pieces = [location for key, location in board_state.items() if key.startswith('king_black_')]
-        king_white_pieces = [location for key, location in board_state.items() if key.startswith('king_white_')]
+        if self.evaluator is not None:
+            return self.evaluator.evaluate_board(board_state)
+        return Bitboard.from_dict(board_state).evaluate()
 
-        return len(white_pieces) + (len(king_white_pieces)*2) - len(black_pieces) - (len(king_black_pieces)*2)
+    def evaluate_position(self, position):
+        """
+        Returns the evaluation of a Move object's board from its incrementally updated piece counts, without looking at the pieces.
+        Same heuristic as ia_game_evaluation (kings are worth 2), plus psq_weight times the piece-square score
+        and mobility_weight times the number of simple moves of white minus black (which needs to generate them).
+        A side without pieces has lost. A side without legal moves has lost too, but that is detected by the search
+        from the move list it generates, not here. With an evaluator, the score is the evaluator's instead.
+        """
+        if self.evaluator is not None:
+            return self.evaluator.evaluate_move(position)
+        black_men, black_kings, white_men, white_kings = position.piece_counts
+        if white_men + white_kings == 0:
+            return -WIN_SCORE
+        if black_men + black_kings == 0:
+            return WIN_SCORE
+        score = white_men + 2 * white_kings - black_men - 2 * black_kings
+        if self.psq_weight:
+            score += self.psq_weight * position.psq_score
+        if self.mobility_weight:
+            score += self.mobility_weight * (len(position.generate_simple_moves('white')) - len(position.generate_simple_moves('black')))
+        return score
+
+    def evaluate_children(self, board_state, color):
+        """
+        Returns (new board state, evaluation) for every legal move of color, all scored at once with a BatchEvaluator,
+        with the same weights as evaluate_position. Useful to look at all the moves of a position without searching.
+        """
+        position = Move(board_state, color)
+        moves = position.generate_moves()
+        evaluator = self.batch_evaluator or self.evaluator or BatchEvaluator(psq_weight=self.psq_weight, mobility_weight=self.mobility_weight)
+        scores = evaluator.evaluate(BatchEvaluator.encode_children(position, moves)).tolist()
+        return [(position.board_after(move), score) for move, score in zip(moves, scores)]
 
 
-  
-        
+    @staticmethod
+    def _ply_adjusted(eval, ply):
+        """Turns an evaluation of WIN_SCORE or -WIN_SCORE (a side without pieces) at ply into a score that prefers faster wins"""
+        if eval >= WIN_SCORE:
+            return WIN_SCORE - ply
+        if eval <= -WIN_SCORE:
+            return ply - WIN_SCORE
+        return eval
+
+    @staticmethod
+    def _score_to_table(eval, ply):
+        """Won and lost scores count plies from the root, the transposition table stores them counted from the position instead"""
+        if eval > WIN_THRESHOLD:
+            return eval + ply
+        if eval < -WIN_THRESHOLD:
+            return eval - ply
+        return eval
+
+    @staticmethod
+    def _score_from_table(eval, ply):
+        if eval > WIN_THRESHOLD:
+            return eval - ply
+        if eval < -WIN_THRESHOLD:
+            return eval + ply
+        return eval
+
+    def _is_draw(self, zobrist_hash):
+        """Checks whether a position reached by the search is drawn by repetition or by the no-progress rule"""
+        history = self.position_history
+        return history.occurrences(zobrist_hash) > 1 or history.is_no_progress()
+
+    def _push_history(self, zobrist_hash, move, undo):
+        """Adds a position reached by the search to the position history, a move of a man or a capture is progress"""
+        self.position_history.push(zobrist_hash, bool(move.captured) or not undo[0].startswith('king_'))
+
+    def evaluation_key(self):
+        """Describes how the agent evaluates positions, agents with the same key can share cached scores"""
+        evaluator_weights = tuple(sorted(self.evaluator.weights.items())) if self.evaluator is not None else None
+        return self.psq_weight, self.mobility_weight, evaluator_weights
+
+    def _root_hash(self, board_state, color):
+        """The hash of the root of a search, if the transposition table, the position history or the cache needs it"""
+        if self.transposition_table is None and self.position_history is None and self.cache is None:
+            return None
+        return ZOBRIST.hash_board(board_state, color)
+
+    def _count_node(self, position, ply, depth):
+        """Counts a node of the search in the statistics"""
+        self.nodes_searched += 1
+        if ply < MAX_PLIES:
+            self.stats.nodes_per_ply[ply] += 1
+        if self.hooks is not None:
+            self.hooks.on_node(self, ply, depth, position)
+
+    def _generate_moves(self, position, color, zobrist_hash=None):
+        """
+        position.generate_moves(color), counted (and timed with collect_timings) in the statistics,
+        or the cached moves of the position if there is a cache (then a tuple, which must not be changed)
+        """
+        cache = self.cache
+        if cache is not None and zobrist_hash is not None:
+            moves = cache.get_moves(zobrist_hash, color)
+            if moves is not None:
+                return moves
+        stats = self.stats
+        stats.move_generations += 1
+        if not stats.timing:
+            moves = position.generate_moves(color)
+        else:
+            start = time.perf_counter()
+            moves = position.generate_moves(color)
+            stats.move_generation_time += time.perf_counter() - start
+        if cache is not None and zobrist_hash is not None:
+            cache.put_moves(zobrist_hash, color, moves)
+        return moves
+
+    def _evaluate_leaf(self, position, ply, zobrist_hash=None, color=None):
+        """
+        The ply-adjusted evaluation of a leaf of the search, counted (and timed with collect_timings) in the statistics.
+        With a cache and the hash of the position, the evaluation is looked up first and only cache misses are counted.
+        """
+        stats = self.stats
+        cache = self.cache if self._cache_scores and zobrist_hash is not None else None
+        score = cache.get_score(zobrist_hash, color) if cache is not None else None
+        if score is None:
+            stats.leaf_evaluations += 1
+            if not stats.timing:
+                score = self.evaluate_position(position)
+            else:
+                start = time.perf_counter()
+                score = self.evaluate_position(position)
+                stats.evaluation_time += time.perf_counter() - start
+            if cache is not None:
+                cache.put_score(zobrist_hash, color, score)
+        eval = self._ply_adjusted(score, ply)
+        if self.hooks is not None:
+            self.hooks.on_leaf(self, ply, eval)
+        return eval
 
     def minimax_try2(self, board_state, is_maximizing, depth=3, show_minimax_boards=True):
         """
         The minimax algorithm is used to determine the best move for the current player.
+        The tree is searched by making and unmaking moves on a single copy of the board instead of copying the board for every child.
 
         board_state: dict, the current board state
         is_maximizing: bool, True if the current player is maximizing (white), False if the current player is minimizing (black)
         depth: int, the depth of the minimax tree
         show_minimax_boards: bool, if True, print the board state and some testing print statements at each depth of the minimax tree
         """
+        color = 'white' if is_maximizing else 'black'
+        position = Move(board_dict(board_state), color)
+        self._search_depth = depth
+        eval, best_record = self._minimax(position, is_maximizing, depth, show_minimax_boards, self._root_hash(board_state, color))
+        return eval, Move(board_state, color).board_after(best_record) if best_record is not None else None
+
+    def _show_move(self, board_state):
+        """Prints a board state of the minimax tree and how it differs from the board state of the agent, for error checking"""
+        CheckerBoard.visualize_piece_numbers(board_state)
+        for key in board_state:
+            if key in self.board_state and board_state[key] != self.board_state[key]:
+                print(f'{key} can move from {self.board_state[key]} to {board_state[key]}')
+        for key in self.board_state:
+            if f'king_{key}' in board_state:
+                print(f"{key} can move from {self.board_state[key]} to {board_state[f'king_{key}']} and become a king")
+            elif key not in board_state:
+                print(f'and can capture {key}')
 
+    def _minimax(self, position, is_maximizing, depth, show_minimax_boards, zobrist_hash=None):
+        """
+        Recursive part of minimax_try2. position is a Move object whose board is changed in place with make_move and
+        restored with unmake_move. zobrist_hash is the hash of the position when there is a position history or a cache.
+        Returns (value, best MoveRecord).
+        """
+        ply = self._search_depth - depth
+        self._count_node(position, ply, depth)
+        self.pv_table[ply] = []
+        board_state = position.dict_piece_locations
         if show_minimax_boards:
             print('The board state is:', board_state)
             print('The depth is:', depth)
@@ -79,27 +311,51 @@ class IntelligentAgent():
             color = 'white'
         else:
             color = 'black'
-        nextMove = Move(board_state, color)
+        history = self.position_history
+        if history is not None and ply > 0 and self._is_draw(zobrist_hash):
+            self.stats.draws += 1
+            return 0, None
+
+        if depth == 0:
+            if self.quiescence:
+                return self._quiescence(position, is_maximizing, ply, -np.inf, np.inf), None
+            return self._evaluate_leaf(position, ply, zobrist_hash, color), None
+        moves = self._generate_moves(position, color, zobrist_hash)
+        if not moves:  # the side to move is blocked or has no pieces left and loses
+            return (ply - WIN_SCORE if is_maximizing else WIN_SCORE - ply), None
 
-        if depth == 0 or self.ia_winner_check() != None:
-            ia_results = self.ia_game_evaluation(color, board_state), None
-            return ia_results
+        # the children are leaves and minimax looks at all of them: score them all at once instead of one at a time
+        if depth == 1 and self.batch_evaluator is not None and history is None and not show_minimax_boards and not self.quiescence:
+            stats = self.stats
+            self.nodes_searched += len(moves)
+            stats.nodes_per_ply[ply + 1] += len(moves)
+            stats.leaf_evaluations += len(moves)
+            start = time.perf_counter() if stats.timing else 0
+            leaf_scores = [self._ply_adjusted(score, ply + 1)
+                           for score in self.batch_evaluator.evaluate(BatchEvaluator.encode_children(position, moves)).tolist()]
+            if stats.timing:
+                stats.evaluation_time += time.perf_counter() - start
+            best = max if is_maximizing else min
+            i = best(range(len(moves)), key=leaf_scores.__getitem__)
+            self.pv_table[ply] = [moves[i].key]
+            return leaf_scores[i], moves[i]
         
         if is_maximizing: #white's turn
             maxEval = -np.inf
             best_move = None
-            for move in nextMove.get_legal_moves():
+            for move in moves:
+                undo = position.make_move(move)
                 if show_minimax_boards: # print the possible moves for error checking
                     print("White's turn")
-                    CheckerBoard.visualize_piece_numbers(move)
-                    for key in move:
-                        if key in move and move[key] != self.board_state[key]:
-                            print(f'{key} can move from {self.board_state[key]} to {move[key]}')
-                    for key in self.board_state:
-                        if key not in move:
-                            print(f'and can capture {key}')
+                    self._show_move(board_state)
                 
-                minimax_results = self.minimax_try2(board_state=move, depth = depth - 1, is_maximizing = False, show_minimax_boards = show_minimax_boards)
+                child_hash = ZOBRIST.update_move(zobrist_hash, move, undo) if zobrist_hash is not None else None
+                if history is not None:
+                    self._push_history(child_hash, move, undo)
+                minimax_results = self._minimax(position, False, depth - 1, show_minimax_boards, child_hash)
+                if history is not None:
+                    history.pop()
+                position.unmake_move(move, undo)
                 eval, _ = minimax_results
 
                 if show_minimax_boards:
@@ -108,6 +364,7 @@ class IntelligentAgent():
                 if eval > maxEval:
                     maxEval = eval
                     best_move = move
+                    self._update_pv(ply, move)
                 if show_minimax_boards:
                     print('The maxEval is:', maxEval)
             return maxEval, best_move
@@ -115,19 +372,19 @@ class IntelligentAgent():
         else: #black's turn
             minEval = np.inf
             best_move = None
-            for move in nextMove.get_legal_moves():
+            for move in moves:
+                undo = position.make_move(move)
                 if show_minimax_boards: # print the possible moves for error checking
                     print("Black's turn")
-                    CheckerBoard.visualize_piece_numbers(move)
-                    for key in move:
-                        if key in move:
-                            if move[key] != self.board_state[key]:
-                                print(f'{key} can move from {self.board_state[key]} to {move[key]}')
-                    for key in self.board_state:
-                        if key not in move:
-                            print(f'and can capture {key}')
+                    self._show_move(board_state)
                 
-                minimax_results = self.minimax_try2(board_state=move, depth = depth - 1, is_maximizing = True, show_minimax_boards = show_minimax_boards)
+                child_hash = ZOBRIST.update_move(zobrist_hash, move, undo) if zobrist_hash is not None else None
+                if history is not None:
+                    self._push_history(child_hash, move, undo)
+                minimax_results = self._minimax(position, True, depth - 1, show_minimax_boards, child_hash)
+                if history is not None:
+                    history.pop()
+                position.unmake_move(move, undo)
                 eval, _ = minimax_results
                 if show_minimax_boards:
                     print('The results of minimax are:', minimax_results)
@@ -135,12 +392,413 @@ class IntelligentAgent():
                 if eval < minEval:
                     minEval = eval
                     best_move = move
+                    self._update_pv(ply, move)
                 if show_minimax_boards:
                     print('The minEval is:', minEval)
             return minEval, best_move
         
 
-    def make_intelligent_move(self, board_state, depth, is_maximizing, show_minimax_boards=True):
+    ############################## Alpha-Beta Search ########################################
+
+    def order_moves(self, moves, color, depth, first_move=NO_MOVE):
+        """
+        Sorts the move records so that the most promising ones are searched first, which makes alpha-beta prune more:
+        the best move from the transposition table (first_move), then captures (the more pieces captured the better),
+        then killer moves for this depth, then by history score.
+        """
+        killers = self.killer_moves.get(depth, [])
+        history = self.history
+
+        def priority(move):
+            key = move.key
+            return (key != first_move, -len(move.captured), key not in killers, -history.get((color, key), 0))
+
+        return sorted(moves, key=priority)
+
+    def _record_cutoff(self, move, color, depth):
+        """
+        Remembers a move that caused a beta cutoff as a killer move for this depth and increases its history score.
+        """
+        self.cutoffs += 1
+        if self.hooks is not None:
+            self.hooks.on_cutoff(self, self._search_depth - depth, move)
+        if move.captured:
+            return  # captures are already ordered first
+        key = move.key
+        killers = self.killer_moves.setdefault(depth, [])
+        if key not in killers:
+            killers.insert(0, key)
+            del killers[2:]
+        self.history[(color, key)] = self.history.get((color, key), 0) + depth * depth
+
+    def _update_pv(self, ply, move):
+        """The best line from this ply is the new best move followed by the best line of its child"""
+        self.pv_table[ply] = [move.key] + self.pv_table.get(ply + 1, [])
+
+    def alphabeta(self, board_state, is_maximizing, depth=3, alpha=-np.inf, beta=np.inf, show_minimax_boards=False, root_ply=0):
+        """
+        The minimax algorithm with alpha-beta pruning. Returns the same value as minimax_try2 at the same depth,
+        but skips the branches that can't change the result. Moves are ordered captures first, then killer moves, then by history.
+
+        board_state: dict, the current board state
+        is_maximizing: bool, True if the current player is maximizing (white), False if the current player is minimizing (black)
+        depth: int, the depth of the minimax tree
+        alpha: float, the best value the maximizing player is already guaranteed
+        beta: float, the best value the minimizing player is already guaranteed
+        show_minimax_boards: bool, if True, print the board state and the depth at each node of the tree
+        root_ply: int, the number of plies already played from the root of a larger search, which won and lost scores count from
+        """
+        color = 'white' if is_maximizing else 'black'
+        position = Move(board_dict(board_state), color)
+        self._search_depth = depth + root_ply
+        zobrist_hash = self._root_hash(board_state, color)
+        eval, best_record = self._alphabeta(position, is_maximizing, depth, alpha, beta, show_minimax_boards, zobrist_hash)
+        return eval, Move(board_state, color).board_after(best_record) if best_record is not None else None
+
+    def pvs(self, board_state, is_maximizing, depth=3, alpha=-np.inf, beta=np.inf, show_minimax_boards=False, root_ply=0):
+        """
+        Principal variation search (NegaScout): alpha-beta where, at every node, the first move (the best one according
+        to the move ordering) is searched with the full window and the following moves with a null window, which only tells
+        whether the move is better than the best one so far and prunes much more. A move that turns out better is searched
+        again from its null window value. With good move ordering the re-searches are rare, and the search visits fewer nodes
+        than alphabeta for the same value. Same arguments and result as alphabeta.
+
+        PVS only pays when the first move is usually the best one: with iterative deepening (which searches the previous
+        principal variation first) it saves a few percent of the nodes of alphabeta, about 10% at depth 8 with a transposition
+        table. A single fixed-depth search without a transposition table orders moves with killers and history only,
+        and there PVS visits about as many nodes as alphabeta at depth 6, more on some positions (see Benchmark.pvs_savings).
+        """
+        self._null_windows = True
+        try:
+            return self.alphabeta(board_state, is_maximizing, depth, alpha, beta, show_minimax_boards, root_ply)
+        finally:
+            self._null_windows = False
+
+    def principal_variation_boards(self, board_state, color, move_keys=None):
+        """
+        Returns the board states along a line of moves given as move keys (the principal variation found by the last search
+        if move_keys is None), starting with the board after the first move. The line stops at a move that is not legal.
+        """
+        boards = []
+        for key in self.pv_table.get(0, []) if move_keys is None else move_keys:
+            position = Move(board_state, color)
+            record = next((record for record in position.generate_moves() if record.key == key), None)
+            if record is None:
+                break
+            board_state = position.board_after(record)
+            boards.append(board_state)
+            color = 'white' if color == 'black' else 'black'
+        return boards
+
+    def _alphabeta(self, position, is_maximizing, depth, alpha, beta, show_minimax_boards, zobrist_hash):
+        """
+        Recursive part of alphabeta. position is a Move object whose board is changed in place with make_move and
+        restored with unmake_move. zobrist_hash is the hash of the position, updated incrementally from parent to child
+        when a transposition table, a position history or a cache is used. Returns (value, best MoveRecord).
+        """
+        ply = self._search_depth - depth
+        self._count_node(position, ply, depth)
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        board_state = position.dict_piece_locations
+        if show_minimax_boards:
+            print('The board state is:', board_state)
+            print('The depth is:', depth)
+        color = 'white' if is_maximizing else 'black'
+        self.pv_table[ply] = []
+        history = self.position_history
+        if history is not None and ply > 0 and self._is_draw(zobrist_hash):
+            self.stats.draws += 1
+            return 0, None
+
+        if self.tablebase is not None and ply > 0:
+            tablebase_result = self.tablebase.probe_position(position, color)
+            if tablebase_result is not None:
+                self.stats.tablebase_hits += 1
+                result, distance = tablebase_result
+                if result == DRAW:
+                    return 0, None
+                eval = WIN_SCORE - ply - distance if result == WIN else ply + distance - WIN_SCORE  # for the side to move
+                return (eval if is_maximizing else -eval), None
+
+        table = self.transposition_table
+        table_move = NO_MOVE
+        if table is not None:
+            entry = table.probe(zobrist_hash)
+            self.stats.tt_probes += 1
+            if entry is not None:
+                self.stats.tt_hits += 1
+                entry_depth, entry_score, entry_flag, table_move = entry
+                entry_score = self._score_from_table(entry_score, ply)
+                # the root always needs to be searched to return a move
+                if entry_depth >= depth and ply > 0:
+                    if entry_flag == EXACT:
+                        return entry_score, None
+                    elif entry_flag == LOWER_BOUND:
+                        alpha = max(alpha, entry_score)
+                    elif entry_flag == UPPER_BOUND:
+                        beta = min(beta, entry_score)
+                    if alpha >= beta:
+                        return entry_score, None
+        alpha_original, beta_original = alpha, beta
+
+        if depth == 0:
+            if self.quiescence:
+                eval = self._quiescence(position, is_maximizing, ply, alpha, beta)
+                flag = UPPER_BOUND if eval <= alpha_original else LOWER_BOUND if eval >= beta_original else EXACT
+            else:
+                eval = self._evaluate_leaf(position, ply, zobrist_hash, color)
+                flag = EXACT
+            if table is not None:
+                table.store(zobrist_hash, depth, self._score_to_table(eval, ply), flag)
+            return eval, None
+        moves = self._generate_moves(position, color, zobrist_hash)
+        if not moves:  # the side to move is blocked or has no pieces left and loses
+            eval = ply - WIN_SCORE if is_maximizing else WIN_SCORE - ply
+            if table is not None:
+                table.store(zobrist_hash, depth, self._score_to_table(eval, ply), EXACT)
+            return eval, None
+
+        first_move = table_move
+        if self._follow_pv:
+            if ply < len(self.principal_variation):
+                first_move = self.principal_variation[ply]
+            else:
+                self._follow_pv = False
+        moves = self.order_moves(moves, color, depth, first_move)
+        # the children of depth 1 nodes are evaluated exactly whatever the window, a null window would only add re-searches
+        null_windows = self._null_windows and (depth > 1 or self.quiescence)
+
+        best_move = None
+        if is_maximizing: #white's turn
+            best_eval = -np.inf
+            for index, move in enumerate(moves):
+                undo = position.make_move(move)
+                child_hash = ZOBRIST.update_move(zobrist_hash, move, undo) if zobrist_hash is not None else None
+                if history is not None:
+                    self._push_history(child_hash, move, undo)
+                if index == 0 or not null_windows:
+                    eval, _ = self._alphabeta(position, False, depth - 1, alpha, beta, show_minimax_boards, child_hash)
+                else:  # only check that the move is not better than the best one so far
+                    eval, _ = self._alphabeta(position, False, depth - 1, alpha, alpha + NULL_WINDOW, show_minimax_boards, child_hash)
+                    if alpha + NULL_WINDOW <= eval < beta:  # it is: find out its value, which is at least eval
+                        self.stats.pvs_researches += 1
+                        eval, _ = self._alphabeta(position, False, depth - 1, eval, beta, show_minimax_boards, child_hash)
+                if history is not None:
+                    history.pop()
+                position.unmake_move(move, undo)
+                self._follow_pv = False  # only the first line searched follows the previous principal variation
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
+                    self._update_pv(ply, move)
+                alpha = max(alpha, best_eval)
+                if alpha >= beta:
+                    self._record_cutoff(move, color, depth)
+                    break
+
+        else: #black's turn
+            best_eval = np.inf
+            for index, move in enumerate(moves):
+                undo = position.make_move(move)
+                child_hash = ZOBRIST.update_move(zobrist_hash, move, undo) if zobrist_hash is not None else None
+                if history is not None:
+                    self._push_history(child_hash, move, undo)
+                if index == 0 or not null_windows:
+                    eval, _ = self._alphabeta(position, True, depth - 1, alpha, beta, show_minimax_boards, child_hash)
+                else:
+                    eval, _ = self._alphabeta(position, True, depth - 1, beta - NULL_WINDOW, beta, show_minimax_boards, child_hash)
+                    if alpha < eval <= beta - NULL_WINDOW:
+                        self.stats.pvs_researches += 1
+                        eval, _ = self._alphabeta(position, True, depth - 1, alpha, eval, show_minimax_boards, child_hash)
+                if history is not None:
+                    history.pop()
+                position.unmake_move(move, undo)
+                self._follow_pv = False  # only the first line searched follows the previous principal variation
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
+                    self._update_pv(ply, move)
+                beta = min(beta, best_eval)
+                if alpha >= beta:
+                    self._record_cutoff(move, color, depth)
+                    break
+
+        if table is not None:
+            table.store(zobrist_hash, depth, self._score_to_table(best_eval, ply),
+                        UPPER_BOUND if best_eval <= alpha_original else LOWER_BOUND if best_eval >= beta_original else EXACT,
+                        best_move.key if best_move is not None else NO_MOVE)
+        return best_eval, best_move
+
+    def _quiescence(self, position, is_maximizing, ply, alpha, beta):
+        """
+        Searches the capture sequences of a leaf of the search until positions without captures, which are evaluated.
+        Since captures are mandatory, the side to move can't stop on a static evaluation while it has one,
+        so every capture is searched (with alpha-beta pruning) rather than only those that look good.
+        Positions reached by captures have fewer pieces than any earlier position, so they can't be repetitions.
+        Returns the value of the position within alpha and beta (a bound outside of them), like _alphabeta.
+        """
+        stats = self.stats
+        color = 'white' if is_maximizing else 'black'
+        if self.quiescence_node_limit is not None and stats.quiescence_nodes >= self.quiescence_node_limit:
+            stats.quiescence_limit_hits += 1
+            return self._evaluate_leaf(position, ply)
+        if stats.timing:
+            start = time.perf_counter()
+            captures = position.generate_captures(color)
+            stats.move_generation_time += time.perf_counter() - start
+        else:
+            captures = position.generate_captures(color)
+        stats.move_generations += 1
+        if not captures:
+            return self._evaluate_leaf(position, ply)
+
+        captures.sort(key=lambda move: -len(move.captured))
+        best_eval = -np.inf if is_maximizing else np.inf
+        for move in captures:
+            undo = position.make_move(move)
+            self._count_node(position, ply + 1, 0)
+            stats.quiescence_nodes += 1
+            eval = self._quiescence(position, not is_maximizing, ply + 1, alpha, beta)
+            position.unmake_move(move, undo)
+            if is_maximizing:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, best_eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, best_eval)
+            if alpha >= beta:
+                break
+        return best_eval
+
+    def _start_search(self, board_state, depth):
+        """Resets the statistics and the per-search state before a search from board_state"""
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.stats = SearchStats(self.collect_timings)
+        self._search_start_time = time.perf_counter()
+        if self.hooks is not None:
+            self.hooks.on_search_start(self, board_state, depth)
+        self._search_depth = depth
+        self._deadline = None
+        self._follow_pv = False
+        self.pv_table = {}
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+
+    def _finish_search(self, depth):
+        """Completes the statistics of the search that just finished and returns them"""
+        stats = self.stats
+        stats.nodes = self.nodes_searched
+        stats.cutoffs = self.cutoffs
+        stats.depth = depth
+        stats.searches = 1
+        stats.time = time.perf_counter() - self._search_start_time
+        if self.hooks is not None:
+            self.hooks.on_search_end(self, stats)
+        return stats
+
+    def search(self, board_state, depth, is_maximizing, search_algorithm='minimax', show_minimax_boards=False, return_stats=False, return_pv=False):
+        """
+        Runs the chosen search algorithm and returns (value, best move), with the principal variation (the board states
+        along the best line found, see principal_variation_boards) after them with return_pv, and the SearchStats last
+        with return_stats: (value, best move, principal variation, SearchStats).
+        The statistics of the search are also kept in self.stats.
+
+        search_algorithm: str, one of SEARCH_ALGORITHMS ('minimax', 'alphabeta' or 'pvs')
+        """
+        if search_algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f'Unknown search algorithm {search_algorithm!r}, expected one of {SEARCH_ALGORITHMS}')
+        self._start_search(board_state, depth)
+        if search_algorithm == 'minimax':
+            value, best_move = self.minimax_try2(board_state, depth=depth, is_maximizing=is_maximizing, show_minimax_boards=show_minimax_boards)
+        elif search_algorithm == 'pvs':
+            value, best_move = self.pvs(board_state, is_maximizing, depth=depth, show_minimax_boards=show_minimax_boards)
+        else:
+            value, best_move = self.alphabeta(board_state, is_maximizing, depth=depth, show_minimax_boards=show_minimax_boards)
+        stats = self._finish_search(depth)
+        result = (value, best_move)
+        if return_pv:
+            result += (self.principal_variation_boards(board_state, 'white' if is_maximizing else 'black'),)
+        return result + (stats,) if return_stats else result
+
+    def iterative_deepening(self, board_state, is_maximizing, time_budget_ms, max_depth=MAX_SEARCH_DEPTH, show_minimax_boards=False, return_stats=False,
+                            search_algorithm='alphabeta', aspiration_window=None, return_pv=False):
+        """
+        Runs alpha-beta searches of increasing depth until the time budget runs out and returns (value, best move)
+        of the deepest search that finished. Each iteration searches the principal variation of the previous one first.
+        Depth 1 is always finished so that a move is returned even with a very small budget.
+        self.stats adds up the statistics of all the iterations, with the depth of the deepest one that finished.
+        Like search, the principal variation of the deepest search that finished (as board states) follows (value, best move)
+        with return_pv, and the SearchStats come last with return_stats.
+
+        time_budget_ms: float, the time allowed for the whole search in milliseconds
+        max_depth: int, the deepest iteration to run if time allows
+        search_algorithm: str, 'alphabeta' or 'pvs' (see pvs)
+        aspiration_window: float, if set, each iteration after the first searches the window of this half-width around
+        the value of the previous iteration first, and searches again with the full window if the value falls outside of it
+        """
+        if search_algorithm not in ('alphabeta', 'pvs'):
+            raise ValueError(f"Iterative deepening searches with 'alphabeta' or 'pvs', not {search_algorithm!r}")
+        search = self.pvs if search_algorithm == 'pvs' else self.alphabeta
+        start = time.perf_counter()
+        legal_moves = Move(board_state, 'white' if is_maximizing else 'black').get_legal_moves()
+        if len(legal_moves) <= 1:  # nothing to think about
+            self.depth_reached = 0
+            self.stats = SearchStats(self.collect_timings)
+            result = self.ia_game_evaluation(self.color, board_state), legal_moves[0] if legal_moves else None
+            self.principal_variation = [record.key for record in Move(board_state, 'white' if is_maximizing else 'black').generate_moves()[:1]]
+            self.pv_table = {0: self.principal_variation}
+            if return_pv:
+                result += (legal_moves[:1],)
+            return result + (self.stats,) if return_stats else result
+
+        self.principal_variation = []
+        result = None
+        nodes_searched = 0
+        total_stats = SearchStats(self.collect_timings)
+        history = self.position_history
+        history_length = len(history) if history is not None else 0
+        for depth in range(1, max_depth + 1):
+            self._start_search(board_state, depth)
+            self._follow_pv = True
+            self._deadline = start + time_budget_ms / 1000 if depth > 1 else None
+            try:
+                if aspiration_window is not None and result is not None and abs(result[0]) < WIN_THRESHOLD:
+                    alpha, beta = result[0] - aspiration_window, result[0] + aspiration_window
+                    result = search(board_state, is_maximizing, depth=depth, alpha=alpha, beta=beta, show_minimax_boards=show_minimax_boards)
+                    if not alpha < result[0] < beta:  # only a bound: the value is outside of the window
+                        self.stats.aspiration_failures += 1
+                        self._follow_pv = True
+                        result = search(board_state, is_maximizing, depth=depth, show_minimax_boards=show_minimax_boards)
+                else:
+                    result = search(board_state, is_maximizing, depth=depth, show_minimax_boards=show_minimax_boards)
+            except SearchTimeout:
+                nodes_searched += self.nodes_searched
+                total_stats.merge(self._finish_search(0))
+                while history is not None and len(history) > history_length:
+                    history.pop()  # the positions of the line that was being searched
+                self.pv_table[0] = self.principal_variation  # instead of the line of the unfinished iteration
+                break
+            finally:
+                self._deadline = None
+            nodes_searched += self.nodes_searched
+            total_stats.merge(self._finish_search(depth))
+            self.depth_reached = depth
+            self.principal_variation = self.pv_table.get(0, [])
+            if abs(result[0]) > WIN_THRESHOLD or time.perf_counter() - start >= time_budget_ms / 1000:
+                break  # the game is decided or there is no time left for another iteration
+        self.nodes_searched = nodes_searched
+        total_stats.depth = self.depth_reached
+        total_stats.searches = 1
+        self.stats = total_stats
+        if return_pv:
+            result += (self.principal_variation_boards(board_state, 'white' if is_maximizing else 'black', self.principal_variation),)
+        return result + (total_stats,) if return_stats else result
+
+    def make_intelligent_move(self, board_state, depth, is_maximizing, show_minimax_boards=True, search_algorithm='minimax', time_budget_ms=None, parallel_search=None):
         """
         Takes the best move from the minimax algorithm and returns the new board state.
         
@@ -148,13 +806,39 @@ class IntelligentAgent():
         depth: int, the depth of the minimax tree
         is_maximizing: bool, True if the current player is maximizing (white), False if the current player is minimizing (black)
         show_minimax_boards: bool, if True, print the minimax board states and some testing print statements at each depth of the minimax tree
+        search_algorithm: str, 'minimax' to search the full tree, 'alphabeta' to use alpha-beta pruning or 'pvs' for principal variation search
+        time_budget_ms: float, if set, search with iterative deepening alpha-beta until the budget runs out instead of at a fixed depth,
+        with principal variation search and aspiration windows (ASPIRATION_WINDOW) if search_algorithm is 'pvs'
+        parallel_search: ParallelSearch, if set, search at a fixed depth on several processes instead
+        If the agent has an opening book and the position is in it, the book move is played without searching.
         """
-        new_board_state = self.minimax_try2(board_state, depth=depth, is_maximizing=is_maximizing, show_minimax_boards=show_minimax_boards)[1]
+        book_board_state = self.opening_book.choose(board_state, self.color) if self.opening_book is not None else None
+        if book_board_state is not None:
+            self.stats = SearchStats(self.collect_timings)  # no search
+            self.value = None
+            new_board_state = book_board_state
+        elif parallel_search is not None:
+            result = parallel_search.search(board_state, depth, is_maximizing)
+            self.value, new_board_state = result['value'], result['best_move']
+            self.stats = SearchStats(self.collect_timings)  # only the totals of the workers are known
+            self.stats.nodes, self.stats.time, self.stats.depth, self.stats.searches = result['nodes'], result['wall_time'], depth, 1
+        elif time_budget_ms is not None:
+            iterative_algorithm = 'pvs' if search_algorithm == 'pvs' else 'alphabeta'
+            self.value, new_board_state = self.iterative_deepening(board_state, is_maximizing, time_budget_ms, search_algorithm=iterative_algorithm,
+                                                                   aspiration_window=ASPIRATION_WINDOW if search_algorithm == 'pvs' else None)
+        else:
+            self.value, new_board_state = self.search(board_state, depth, is_maximizing, search_algorithm=search_algorithm, show_minimax_boards=show_minimax_boards)
         # print what that move was
         if show_minimax_boards:
-            for k,v in self.board_state.items():
-                if k not in new_board_state.keys(): # this means a capture happened
+            before, after = self.board_state, new_board_state
+            if isinstance(before, Position):  # the pieces of a Position are named from the same move on a dictionary
+                before = before.to_dict()
+                after = Move(before, self.color).get_legal_moves()[Move(self.board_state, self.color).get_legal_moves().index(new_board_state)]
+            for k,v in before.items():
+                if f'king_{k}' in after: # a man that was promoted is renamed king_...
+                    print(f"{k} moved from {v} to {after[f'king_{k}']} and became a king")
+                elif k not in after.keys(): # this means a capture happened
                     print(f'{k} was captured by')
-                if k in new_board_state.keys() and new_board_state[k] != self.board_state[k]:
-                    print(f'{k} moved from {self.board_state[k]} to {new_board_state[k]}')
+                if k in after.keys() and after[k] != before[k]:
+                    print(f'{k} moved from {before[k]} to {after[k]}')
         return new_board_state
\ No newline at end of file
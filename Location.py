@@ -1,13 +1,28 @@
 class Location:
     """
     The Location class is used to represent a location on the board. It is used to represent the location of a piece on the board.
+    Locations are immutable and hashable, so the same Location object can be shared by every board state that has a piece
+    on that square (see Squares.LOCATIONS) and used in sets and as dictionary keys.
     """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'y', y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Location objects are immutable')
 
     def __eq__(self, other):
+        if not isinstance(other, Location):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return Location, (self.x, self.y)
+
     def __repr__(self):
-        return f"Location(x={self.x}, y={self.y})"
\ No newline at end of file
+        return f"Location(x={self.x}, y={self.y})"
@@ -0,0 +1,439 @@
+from Game import Game
+from Move import Move
+from NaiveAgent import NaiveAgent
+from IntelligentAgent import IntelligentAgent, MAX_SEARCH_DEPTH
+from Position import Position
+from PositionHistory import PositionHistory, DEFAULT_NO_PROGRESS_LIMIT
+from Tournament import distribution
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+
+SEARCH_GRACE_SECONDS = 1.0  # depth 1 is always finished, even past the time budget
+
+
+def move_texts(records):
+    """
+    Names the moves of a position like PDN, with squares numbered from 1: '9-13' for a simple move, '9x18' for a capture.
+    When two captures go from and to the same squares, the captured squares are added to tell them apart: '1x1(6,14,15,7)'.
+    """
+    texts = []
+    for record in records:
+        text = f"{record.from_square + 1}{'x' if record.captured else '-'}{record.to_square + 1}"
+        if text in texts:
+            text += '(' + ','.join(str(square + 1) for square in record.captured) + ')'
+        texts.append(text)
+    return texts
+
+
+def _search_move(position, color, history, max_depth, deadline):
+    """
+    Searches a move in a worker process with iterative deepening until deadline (a time.time() value).
+    Returns (new position, value, nodes searched, depth reached), or None if the deadline passed while the request was queued.
+    """
+    time_budget_ms = (deadline - time.time()) * 1000
+    if time_budget_ms <= 0:
+        return None
+    agent = IntelligentAgent(color, position, position_history=history, cache=True)  # the cache of the worker process lasts across requests
+    value, new_position = agent.iterative_deepening(position, color == 'white', time_budget_ms, max_depth=max_depth)
+    return new_position, float(value), agent.nodes_searched, agent.depth_reached
+
+
+class ServerGame:
+    """A game hosted by the MatchServer: the position, the side to move, the position history and the legal moves of the turn"""
+
+    def __init__(self, game_id, position, color, draw_ply_limit):
+        self.game_id = game_id
+        self.position = position
+        self.color = color
+        self.history = PositionHistory(draw_ply_limit)
+        self.history.push_board(position, color)
+        self.winner = None
+        self.busy = False  # an agent move is being searched
+        self._new_turn()
+
+    def _new_turn(self):
+        self.records = Move(self.position, self.color).generate_moves()
+        self.texts = move_texts(self.records)
+        if not self.records:
+            self.winner = 'White' if self.color == 'black' else 'Black'
+        elif self.history.is_draw():
+            self.winner = 'Draw'
+
+    def find_move(self, message):
+        """Returns the index of the move of a request, given as its text ('move') or as the board it leads to ('board')"""
+        if 'move' in message:
+            if message['move'] not in self.texts:
+                raise ValueError(f"Illegal move {message['move']!r}")
+            return self.texts.index(message['move'])
+        new_position = Position.from_string(message['board'])
+        for index, record in enumerate(self.records):
+            if self.position.after(record) == new_position:
+                return index
+        raise ValueError('No legal move leads to this board')
+
+    def play(self, index):
+        new_position = self.position.after(self.records[index])
+        self.color = 'white' if self.color == 'black' else 'black'
+        self.history.push_board(new_position, self.color, PositionHistory.is_progress(self.position, new_position))
+        self.position = new_position
+        self._new_turn()
+
+    def state(self):
+        return {'game': self.game_id, 'board': str(self.position), 'to_move': self.color, 'legal_moves': self.texts,
+                'winner': self.winner, 'turns': len(self.history) - 1}
+
+
+class MatchServer:
+    """
+    The MatchServer class hosts many games at once and answers requests over newline-delimited JSON,
+    on TCP or on a Unix socket. Each request is a JSON object on one line with an op, and optionally an id
+    that is copied into the response (also one line); responses have ok set to true, or to false with an error:
+    - {"op": "new_game"}, optionally with "board" (32 characters, see Position.from_string) and "to_move": returns the game state
+      (game id, board, side to move, legal moves, winner and turns)
+    - {"op": "move", "game": id, "move": "11-15"} or with "board" set to the board after the move: plays a move
+    - {"op": "agent_move", "game": id, "depth": 6, "time_budget_ms": 100}: an IntelligentAgent plays the side to move
+    - {"op": "state", "game": id}, {"op": "close_game", "game": id}, {"op": "stats"}
+    - {"op": "cancel", "request": id}: cancels a request of the same connection that is still running
+
+    The searches run on a pool of num_workers processes, with iterative deepening until the time budget of the request,
+    which counts from the arrival of the request: a search still queued when its budget has run out is dropped.
+    Cancelling an agent move removes its search from the queue; a search already running ends at its deadline in the worker.
+    Backpressure: at most max_pending_searches searches are queued or running in the pool; the other agent moves wait for
+    their turn, and are refused with the error 'busy' if their time budget runs out before. Each connection has at most max_requests_per_connection requests running, after which the server stops
+    reading from it until one of them is answered.
+    """
+
+    def __init__(self, num_workers=None, max_pending_searches=None, max_requests_per_connection=32, default_time_budget_ms=100,
+                 max_time_budget_ms=10000, max_games=100000, draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT):
+        self.num_workers = num_workers or os.cpu_count()
+        self.max_pending_searches = max_pending_searches or self.num_workers
+        self.max_requests_per_connection = max_requests_per_connection
+        self.default_time_budget_ms = default_time_budget_ms
+        self.max_time_budget_ms = max_time_budget_ms
+        self.max_games = max_games
+        self.draw_ply_limit = draw_ply_limit
+        self.games = {}
+        self._game_ids = itertools.count(1)
+        self.pool = None
+        self.server = None
+        self._writers = set()
+        self._search_slots = asyncio.Semaphore(self.max_pending_searches)
+        self.pending_searches = 0
+        self.counters = {'requests': 0, 'searches': 0, 'rejected': 0, 'timeouts': 0, 'cancelled': 0, 'errors': 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Starts listening on host and port (a free port if 0), or on the Unix socket path, and returns the address"""
+        self.pool = ProcessPoolExecutor(self.num_workers)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    ############################## Connections ########################################
+
+    async def _handle_connection(self, reader, writer):
+        self._writers.add(writer)
+        slots = asyncio.Semaphore(self.max_requests_per_connection)
+        write_lock = asyncio.Lock()
+        tasks = {}  # request id -> task answering it
+        try:
+            while True:
+                await slots.acquire()  # not reading is what makes a client that sends too much wait
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer, write_lock, slots, tasks))
+                tasks[id(task)] = task
+        except (ConnectionError, ValueError):  # ValueError: a line longer than the stream limit
+            pass
+        except asyncio.CancelledError:  # the server is closing
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, line, writer, write_lock, slots, tasks):
+        task = asyncio.current_task()
+        request_id = None
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError('A request must be a JSON object')
+            request_id = message.get('id')
+            if request_id is not None:
+                tasks[('request', request_id)] = task
+            response = await self.handle_request(message, tasks)
+        except asyncio.CancelledError:
+            self.counters['cancelled'] += 1
+            response = {'ok': False, 'error': 'cancelled'}
+        except (ValueError, KeyError, TypeError) as e:
+            self.counters['errors'] += 1
+            response = {'ok': False, 'error': str(e)}
+        finally:
+            slots.release()
+            tasks.pop(id(task), None)
+            if request_id is not None and tasks.get(('request', request_id)) is task:
+                del tasks[('request', request_id)]
+        response['id'] = request_id
+        try:
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    ############################## Requests ########################################
+
+    async def handle_request(self, message, tasks=None):
+        """Answers a request (a dictionary) and returns the response, raises ValueError, KeyError or TypeError for a bad request"""
+        self.counters['requests'] += 1
+        op = message.get('op')
+        if op == 'new_game':
+            return self._new_game(message)
+        if op == 'stats':
+            return {'ok': True, 'games': len(self.games), 'pending_searches': self.pending_searches, **self.counters}
+        if op == 'cancel':
+            task = (tasks or {}).get(('request', message['request']))
+            if task is not None:
+                task.cancel()
+            return {'ok': True, 'cancelled': task is not None}
+        game = self.games.get(message.get('game'))
+        if game is None:
+            raise ValueError(f"Unknown game {message.get('game')!r}")
+        if op == 'state':
+            return {'ok': True, **game.state()}
+        if op == 'close_game':
+            del self.games[game.game_id]
+            return {'ok': True, 'game': game.game_id}
+        if op not in ('move', 'agent_move'):
+            raise ValueError(f'Unknown op {op!r}')
+        if game.winner is not None:
+            raise ValueError('The game is over')
+        if game.busy:
+            raise ValueError('An agent move is being searched for this game')
+        if op == 'move':
+            index = game.find_move(message)
+            move_text = game.texts[index]
+            game.play(index)
+            return {'ok': True, 'move': move_text, **game.state()}
+        return await self._agent_move(game, message)
+
+    def _new_game(self, message):
+        if len(self.games) >= self.max_games:
+            raise ValueError('Too many games')
+        if 'board' in message:
+            position = Position.from_string(message['board'])
+        else:
+            position = Position.from_dict(Game().initialize_board())
+        color = message.get('to_move', 'black')
+        if color not in ('black', 'white'):
+            raise ValueError(f'Unknown color {color!r}')
+        game = ServerGame(next(self._game_ids), position, color, self.draw_ply_limit)
+        self.games[game.game_id] = game
+        return {'ok': True, **game.state()}
+
+    async def _agent_move(self, game, message):
+        time_budget_ms = min(float(message.get('time_budget_ms', self.default_time_budget_ms)), self.max_time_budget_ms)
+        max_depth = max(1, min(int(message.get('depth', MAX_SEARCH_DEPTH)), MAX_SEARCH_DEPTH))
+        value, nodes, depth_reached = None, 0, 0
+        if len(game.records) == 1:
+            index = 0  # nothing to search
+        else:
+            deadline = time.time() + time_budget_ms / 1000
+            game.busy = True
+            try:
+                try:
+                    await asyncio.wait_for(self._search_slots.acquire(), time_budget_ms / 1000)
+                except asyncio.TimeoutError:
+                    self.counters['rejected'] += 1
+                    return {'ok': False, 'error': 'busy'}
+                if deadline <= time.time():
+                    self._search_slots.release()
+                    self.counters['rejected'] += 1
+                    return {'ok': False, 'error': 'busy'}
+                self.pending_searches += 1
+                try:
+                    future = asyncio.get_running_loop().run_in_executor(self.pool, _search_move, game.position, game.color, game.history, max_depth, deadline)
+                    result = await asyncio.wait_for(future, max(0.0, deadline - time.time()) + SEARCH_GRACE_SECONDS)
+                except asyncio.TimeoutError:
+                    result = None
+                finally:
+                    self.pending_searches -= 1
+                    self._search_slots.release()
+            finally:
+                game.busy = False
+            if result is None:
+                self.counters['timeouts'] += 1
+                return {'ok': False, 'error': 'timeout'}
+            self.counters['searches'] += 1
+            new_position, value, nodes, depth_reached = result
+            index = [game.position.after(record) for record in game.records].index(new_position)
+        move_text = game.texts[index]
+        game.play(index)
+        return {'ok': True, 'move': move_text, 'value': value, 'nodes': nodes, 'depth': depth_reached, **game.state()}
+
+
+class MatchClient:
+    """A client of the MatchServer on one connection, which can have many requests in flight at once"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> future of the response
+        self._read_task = asyncio.create_task(self._read_responses())
+
+    @staticmethod
+    async def connect(host='127.0.0.1', port=None, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return MatchClient(reader, writer)
+
+    async def _read_responses(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._pending.pop(response.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._pending.values():
+            future.set_exception(ConnectionError('The server closed the connection'))
+
+    def send(self, op, **fields):
+        """Sends a request and returns (its id, a future of the response)"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.writer.write(json.dumps({'id': request_id, 'op': op, **fields}).encode() + b'\n')
+        return request_id, future
+
+    async def request(self, op, **fields):
+        """Sends a request and waits for its response"""
+        _, future = self.send(op, **fields)
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self._read_task.cancel()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def _naive_session(client, color, depth, time_budget_ms, max_moves, latencies, errors):
+    """Plays a game against the server's agent with a NaiveAgent playing color, recording the latency of the requests that succeed"""
+    start = time.perf_counter()
+    state = await client.request('new_game')
+    latencies['new_game'].append(time.perf_counter() - start)
+    game_id = state['game']
+    moves = 0
+    while state['winner'] is None and moves < max_moves:
+        start = time.perf_counter()
+        if state['to_move'] == color:
+            new_position = NaiveAgent(color, Position.from_string(state['board'])).make_next_random_move(show_board=False)
+            op, response = 'move', await client.request('move', game=game_id, board=str(new_position))
+        else:
+            op, response = 'agent_move', await client.request('agent_move', game=game_id, depth=depth, time_budget_ms=time_budget_ms)
+        if response['ok']:
+            latencies[op].append(time.perf_counter() - start)
+        else:
+            errors[response['error']] = errors.get(response['error'], 0) + 1
+            if response['error'] in ('busy', 'timeout'):
+                await asyncio.sleep(time_budget_ms / 1000)  # back off and try again
+                continue
+            break
+        state = response
+        moves += 1
+    await client.request('close_game', game=game_id)
+    return state['winner'], moves
+
+
+async def load_test(host='127.0.0.1', port=None, path=None, sessions=1000, connections=10, depth=2, time_budget_ms=50, max_moves=20, seed=0):
+    """
+    Drives sessions simultaneous games against a MatchServer, each a NaiveAgent (black) against the server's agent (white),
+    over a few connections, and returns the throughput (requests and moves per second), the errors and
+    the latency distribution (see Tournament.distribution, in seconds) of each kind of request that succeeded.
+    A game stops after max_moves moves.
+    """
+    random.seed(seed)
+    clients = [await MatchClient.connect(host, port, path) for _ in range(connections)]
+    latencies = {'new_game': [], 'move': [], 'agent_move': []}
+    errors = {}
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_naive_session(clients[i % connections], 'black', depth, time_budget_ms, max_moves, latencies, errors)
+                                     for i in range(sessions)))
+    duration = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    num_requests = sum(len(values) for values in latencies.values()) + sum(errors.values()) + sessions  # and the close_game requests
+    return {'sessions': sessions,
+            'duration': duration,
+            'requests': num_requests,
+            'requests_per_second': num_requests / duration,
+            'moves_per_second': sum(moves for _, moves in results) / duration,
+            'games_finished': sum(1 for winner, _ in results if winner is not None),
+            'errors': errors,
+            'latency': {op: distribution(values) for op, values in latencies.items()}}
+
+
+async def _serve(port):
+    async with MatchServer() as server:
+        print('Listening on', await server.start(port=port))
+        await server.server.serve_forever()
+
+
+async def _load(sessions, port):
+    if port is not None:
+        summary = await load_test(port=port, sessions=sessions)
+    else:  # no server given, start one
+        async with MatchServer() as server:
+            _, port = await server.start()
+            summary = await load_test(port=port, sessions=sessions)
+    print(f"{summary['sessions']} sessions, {summary['requests']} requests in {summary['duration']:.1f} seconds: "
+          f"{summary['requests_per_second']:.0f} requests/s, {summary['moves_per_second']:.0f} moves/s, errors: {summary['errors']}")
+    for op, latency in summary['latency'].items():
+        if latency:
+            print(f"{op}: p50 {1000 * latency['p50']:.1f} ms, p99 {1000 * latency['p99']:.1f} ms, max {1000 * latency['max']:.1f} ms")
+
+
+if __name__ == '__main__':
+    # python MatchServer.py serve [port]
+    # python MatchServer.py load [sessions] [port], starts a server if no port is given
+    command = sys.argv[1] if len(sys.argv) > 1 else 'serve'
+    if command == 'serve':
+        asyncio.run(_serve(int(sys.argv[2]) if len(sys.argv) > 2 else 8765))
+    else:
+        asyncio.run(_load(int(sys.argv[2]) if len(sys.argv) > 2 else 1000, int(sys.argv[3]) if len(sys.argv) > 3 else None))
@@ -1,21 +1,69 @@
-from Location import Location
-from copy import deepcopy
+import Squares
+from Position import Position
+import functools
+
+
+class MoveRecord:
+    """
+    A move as a small record instead of a full board state: the square the piece moves from, the square it lands on,
+    the squares of the pieces it captures (in capture order) and whether the piece is promoted to a king.
+    Squares are indexes from 0 to 31, see the Squares module.
+    """
+
+    __slots__ = ('from_square', 'to_square', 'captured', 'promotion')
+
+    def __init__(self, from_square, to_square, captured=(), promotion=False):
+        self.from_square = from_square
+        self.to_square = to_square
+        self.captured = captured
+        self.promotion = promotion
+
+    @property
+    def key(self):
+        """A number identifying the move by its from and to squares, used for move ordering and transposition tables"""
+        return self.from_square * Squares.NUM_SQUARES + self.to_square
+
+    def __eq__(self, other):
+        return (isinstance(other, MoveRecord) and self.from_square == other.from_square and self.to_square == other.to_square
+                and self.captured == other.captured and self.promotion == other.promotion)
+
+    def __hash__(self):
+        return hash((self.from_square, self.to_square, self.captured, self.promotion))
+
+    def __repr__(self):
+        return f"MoveRecord(from_square={self.from_square}, to_square={self.to_square}, captured={self.captured}, promotion={self.promotion})"
+
 
 class Move:
     """Represents a move on the checkerboard, specifying the piece being moved and the target position"""
 
     def __init__(self, dict_piece_locations, color) -> None:
+        # a Position is read into a dictionary, and the boards returned by board_after and get_legal_moves are Positions too
+        self.position = None
+        if isinstance(dict_piece_locations, Position):
+            self.position = dict_piece_locations
+            dict_piece_locations = dict_piece_locations.to_dict()
         self.dict_piece_locations = dict_piece_locations
         self.color = color
+
+        # square -> piece name, number of pieces of each type (see Squares.BLACK_MAN...) and sum of the piece-square values
+        # (white minus black), all kept in sync with dict_piece_locations by make_move and unmake_move
+        self.square_index = {}
+        self.piece_counts = [0, 0, 0, 0]
+        self.psq_score = 0
+        for piece_name, location in dict_piece_locations.items():
+            square = Squares.square_of(location.x, location.y)
+            piece_type = self.piece_type(piece_name)
+            self.square_index[square] = piece_name
+            self.piece_counts[piece_type] += 1
+            self.psq_score += Squares.PIECE_SIGNS[piece_type] * Squares.PIECE_SQUARE_TABLES[piece_type][square]
         
         # check which pieces have moves available
         self.available_moves = {} #self.list_available_moves()
         
         # check which pieces have captures available
         self.is_capture_available = None
-        self.captures_available = {} # maybe to be deleted
         self.valid_moves = {}
-        self.list_of_board_states = []  
 
    
 
@@ -24,195 +72,252 @@ class Move:
     def list_available_jumps(self):    
         """
         Which pieces can move and where can they move to?
+        Returns a dictionary of piece name -> list of (x, y) squares it can move to, for the pieces that can move,
+        men first and then kings. The moves come from generate_simple_moves, so the neighbors are read from the
+        precomputed Squares.NEIGHBORS table and occupancy from the square index.
         """
-
-        # Helper function to check if a move is valid
-        def is_valid_move(x, y):
-            if move[0] >= 0 and move[0] <= 7 and move[1] >= 0 and move[1] <= 7 and move not in [(piece_location.x, piece_location.y) for piece_location in self.dict_piece_locations.values()]:
-                # Check if the location is not occupied
-                return (x,y)
-            return False
-        
-        if self.color == 'black':
-            black_dict_piece_locations = {key: value for key, value in self.dict_piece_locations.items() if key.startswith('black_')}
-            king_black_dict_piece_locations = {key: value for key, value in self.dict_piece_locations.items() if key.startswith('king_black_')}
-            
-            for piece_name, location in black_dict_piece_locations.items():
-                moves = []
-                potential_moves = [(location.x + 1, location.y - 1), (location.x + 1, location.y + 1)]
-                for move in potential_moves:
-                    if is_valid_move(*move):
-                        moves.append(move)
-                self.available_moves[piece_name] = moves
-
-
-            for piece_name, location in king_black_dict_piece_locations.items():
-                moves = []
-                potential_moves = [(location.x + 1, location.y - 1), (location.x + 1, location.y + 1), (location.x - 1, location.y - 1),(location.x - 1, location.y + 1)]       
-                for move in potential_moves:
-                    if is_valid_move(*move):
-                        moves.append(move)
-                self.available_moves[piece_name] = moves
-        
-
-        else: # color == 'white'
-            white_dict_piece_locations = {key: value for key, value in self.dict_piece_locations.items() if key.startswith('white_')}
-            king_white_dict_piece_locations = {key: value for key, value in self.dict_piece_locations.items() if key.startswith('king_white_')}
-
-            for piece_name, location in white_dict_piece_locations.items():
-                moves = []
-                potential_moves = [(location.x - 1, location.y - 1), (location.x - 1, location.y + 1)]
-                for move in potential_moves:
-                    if is_valid_move(*move):
-                        moves.append(move)
-                self.available_moves[piece_name] = moves
-
-            for piece_name, location in king_white_dict_piece_locations.items():
-                moves = []
-                potential_moves = [(location.x + 1, location.y - 1), (location.x + 1, location.y + 1), (location.x - 1, location.y - 1),(location.x - 1, location.y + 1)]       
-                for move in potential_moves:
-                    if is_valid_move(*move):
-                        moves.append(move)
-                self.available_moves[piece_name] = moves
-        
-        self.available_moves = {key: val for key, val in self.available_moves.items() if len(val) > 0}
+        self.available_moves = {}
+        for record in self.generate_simple_moves():
+            piece_name = self.square_index[record.from_square]
+            self.available_moves.setdefault(piece_name, []).append(Squares.xy_of(record.to_square))
         return self.available_moves
     
-    def make_jump(self, piece_name, landing_position):
-        """
-        Returns a new board state after a piece has moved to a new location
-        """
-        dict_piece_locations_new = deepcopy(self.dict_piece_locations)
-        original_position = self.dict_piece_locations[piece_name]
-        dict_piece_locations_new[piece_name] = Location(landing_position[0], landing_position[1])
-        # print(f'{piece_name} can move from {original_position} to {dict_piece_locations_new[piece_name]}')
-        return dict_piece_locations_new
-    
 
 ############################## Functions for Captures ########################################
 
 
     def is_opponent_piece(self, x, y, current_color):
-        # Helper function to check if a cell is occupied by an opponent
+        # Helper function to check if a cell is occupied by an opponent, with the O(1) square index
         opponent_color = 'white' if current_color == 'black' else 'black'
-        return any(piece.x == x and piece.y == y and opponent_color in name for name, piece in self.dict_piece_locations.items())
+        piece_name = self.square_index.get(Squares.XY_TO_SQUARE.get((x, y)))
+        return piece_name is not None and opponent_color in piece_name
 
     def is_unoccupied(self, x, y):
-        # Helper function to check if a cell is unoccupied
+        # Helper function to check if a cell is unoccupied, with the O(1) square index
         if x < 0 or x > 7 or y < 0 or y > 7:
             return False
-        return not any(piece.x == x and piece.y == y for piece in self.dict_piece_locations.values())
+        return Squares.XY_TO_SQUARE.get((x, y)) not in self.square_index
     
 
     def _find_valid_captures_per_piece(self, piece_name, dict_piece_locations):
         """
         Which pieces have the possibility to capture an opponent's piece(s)?
         In this version of the game, a piece must capture if it can.
+        Returns the single jumps of a piece as a list of (captured piece name, (x, y) landing square),
+        using the precomputed Squares.JUMPS table and the square index.
         """
+        position = self if dict_piece_locations is self.dict_piece_locations else Move(dict_piece_locations, self.color)
+        opponent_color = 'white' if self.color == 'black' else 'black'
+        index = position.square_index
         location = dict_piece_locations[piece_name]
-        if self.color == 'black':
-            if piece_name.startswith('black'): # Check for potential captures for a black piece
-                potential_captures = [
-                    ((location.x + 1, location.y - 1), (location.x + 2, location.y - 2)),
-                    ((location.x + 1, location.y + 1), (location.x + 2, location.y + 2))
-                ]
-            elif piece_name.startswith('king_black'): # Check if it's a king piece
-                potential_captures = [
-                    ((location.x + 1, location.y - 1), (location.x + 2, location.y - 2)),
-                    ((location.x + 1, location.y + 1), (location.x + 2, location.y + 2)),
-                    ((location.x - 1, location.y - 1), (location.x - 2, location.y - 2)),
-                    ((location.x - 1, location.y + 1), (location.x - 2, location.y + 2))
-                ]
-        else: # color == 'white'
-            if piece_name.startswith('white'): # Check for potential captures for a white piece
-                potential_captures = [
-                    ((location.x - 1, location.y - 1), (location.x - 2, location.y - 2)),
-                    ((location.x - 1, location.y + 1), (location.x - 2, location.y + 2))
-                ]
-
-            elif piece_name.startswith('king_white'): # Check if it's a king piece
-                potential_captures = [
-                    ((location.x + 1, location.y - 1), (location.x + 2, location.y - 2)),
-                    ((location.x + 1, location.y + 1), (location.x + 2, location.y + 2)),
-                    ((location.x - 1, location.y - 1), (location.x - 2, location.y - 2)),
-                    ((location.x - 1, location.y + 1), (location.x - 2, location.y + 2))
-                ]
-
+        jumps = Squares.JUMPS[Squares.square_of(location.x, location.y)]
         temp_list_possible_captures = []
-        for opponent_pos, landing_pos in potential_captures:
-            if self.is_opponent_piece(opponent_pos[0], opponent_pos[1], self.color) and self.is_unoccupied(landing_pos[0], landing_pos[1]):
-                # build list of pieces with potential captures:
-                captured_piece = [key for key, value in dict_piece_locations.items() if value.x == opponent_pos[0] and value.y == opponent_pos[1]][0]
-                temp_list_possible_captures.append((captured_piece, landing_pos))
-        # if len(temp_list_possible_captures) > 0: # only add to dictionary if there are captures available
-        #     self.captures_available[piece_name] = temp_list_possible_captures
-        #     print(self.captures_available)
+        for direction in self.piece_directions(piece_name):
+            if jumps[direction] is None:
+                continue
+            jumped, landing = jumps[direction]
+            if jumped in index and opponent_color in index[jumped] and landing not in index:
+                temp_list_possible_captures.append((index[jumped], Squares.xy_of(landing)))
         return temp_list_possible_captures
 
 
-    def _recursive_capture(self, piece_name, dict_piece_locations, color):
+############################## Move Records and Make/Unmake ########################################
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)  # there are only a few dozen piece names, read at every node of a search
+    def piece_type(piece_name):
+        """Returns the piece type of a piece name: Squares.BLACK_MAN, BLACK_KING, WHITE_MAN or WHITE_KING"""
+        if piece_name.startswith('king_'):
+            return Squares.BLACK_KING if piece_name.startswith('king_black') else Squares.WHITE_KING
+        return Squares.BLACK_MAN if piece_name.startswith('black') else Squares.WHITE_MAN
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def piece_directions(piece_name):
+        """Returns the directions (see Squares.DIRECTIONS) a piece can move and capture in"""
+        if piece_name.startswith('king_'):
+            return Squares.KING_DIRECTIONS
+        if piece_name.startswith('black'):
+            return Squares.BLACK_MAN_DIRECTIONS
+        return Squares.WHITE_MAN_DIRECTIONS
+
+    def generate_simple_moves(self, color=None):
         """
-        Recursively find all possible captures for a piece. Used to find all possible captures for one piece at a time.
+        Returns the move records of all non-capturing moves, men first and then kings, like list_available_jumps.
+        A man that reaches the other end of the board is promoted by the move.
         """
-        possible_captures = Move(dict_piece_locations, color)._find_valid_captures_per_piece(piece_name, dict_piece_locations)
+        color = color or self.color
+        index = self.square_index
+        promotion_mask = Squares.BLACK_PROMOTION_MASK if color == 'black' else Squares.WHITE_PROMOTION_MASK
+        moves = []
+        for prefix in (f'{color}_', f'king_{color}_'):
+            is_man = prefix == f'{color}_'
+            for piece_name, location in self.dict_piece_locations.items():
+                if not piece_name.startswith(prefix):
+                    continue
+                from_square = Squares.square_of(location.x, location.y)
+                neighbors = Squares.NEIGHBORS[from_square]
+                for direction in self.piece_directions(piece_name):
+                    to_square = neighbors[direction]
+                    if to_square is not None and to_square not in index:
+                        moves.append(MoveRecord(from_square, to_square, (), is_man and bool(promotion_mask & Squares.SQUARE_MASKS[to_square])))
+        return moves
 
-        if len(possible_captures) == 0: # no more captures possible 
-            self.list_of_board_states.append(dict_piece_locations)
-            #### return what the difference is between the initial board state and the final board state
-            # for key in dict_piece_locations:
-                # if key in self.dict_piece_locations:
-                    # if dict_piece_locations[key] != self.dict_piece_locations[key]:
-                        # print(f'{key} can move from {self.dict_piece_locations[key]} to {dict_piece_locations[key]}')
-            # for key in self.dict_piece_locations:
-                # if key not in dict_piece_locations:
-                    # print(f'and can capture {key}')
-            return dict_piece_locations # end recursive capturing
-        
-        for possible_capture in possible_captures: 
-            board_state_new = deepcopy(dict_piece_locations) # make a copy of the board state for each possible capture
+    def _capture_sequences(self, origin, square, directions, opponent_color, captured, moves, promotion_mask=0):
+        """
+        Follows every capture sequence of the piece that started on origin and is now on square.
+        Captured pieces and the origin square count as empty, since the pieces were removed and the piece has moved.
+        promotion_mask holds the squares where the piece is promoted (0 for a king): landing there promotes it and ends the sequence.
+        """
+        index = self.square_index
+        found = False
+        for direction in directions:
+            jump = Squares.JUMPS[square][direction]
+            if jump is None:
+                continue
+            jumped, landing = jump
+            if (jumped in index and opponent_color in index[jumped] and jumped not in captured
+                    and (landing not in index or landing == origin or landing in captured)):
+                found = True
+                if promotion_mask & Squares.SQUARE_MASKS[landing]:
+                    moves.append(MoveRecord(origin, landing, captured + (jumped,), True))
+                else:
+                    self._capture_sequences(origin, landing, directions, opponent_color, captured + (jumped,), moves, promotion_mask)
+        if not found and captured:
+            moves.append(MoveRecord(origin, square, captured))
 
-            deleted_piece = possible_capture[0]
-            new_location = possible_capture[1]
-            board_state_new[piece_name] = Location(new_location[0], new_location[1])
-            del board_state_new[deleted_piece]
+    def generate_captures(self, color=None):
+        """
+        Returns the move records of all complete capture sequences of a color.
+        A man that reaches the other end of the board is promoted and its sequence ends there.
+        Sequences that capture the same pieces and end on the same square (a king going around a loop both ways)
+        give the same board, so only the first of them is kept.
+        """
+        color = color or self.color
+        opponent_color = 'white' if color == 'black' else 'black'
+        promotion_mask = Squares.BLACK_PROMOTION_MASK if color == 'black' else Squares.WHITE_PROMOTION_MASK
+        moves = []
+        for piece_name, location in self.dict_piece_locations.items():
+            if color in piece_name:
+                from_square = Squares.square_of(location.x, location.y)
+                self._capture_sequences(from_square, from_square, self.piece_directions(piece_name), opponent_color, (), moves,
+                                        0 if piece_name.startswith('king_') else promotion_mask)
+        if len(moves) > 1:
+            seen = set()
+            unique_moves = []
+            for move in moves:
+                board_key = (move.from_square, move.to_square, frozenset(move.captured))
+                if board_key not in seen:
+                    seen.add(board_key)
+                    unique_moves.append(move)
+            moves = unique_moves
+        return moves
+
+    def generate_moves(self, color=None):
+        """
+        Returns the move records of all legal moves. If captures are possible, only captures are returned.
+        """
+        return self.generate_captures(color) or self.generate_simple_moves(color)
 
-            self._recursive_capture(piece_name, board_state_new, color)
+    def make_move(self, record):
+        """
+        Makes a move on this board in place, without copying it. The square index, piece counts and piece-square score are updated too.
+        Returns the information unmake_move needs to undo it: (piece name, original location, [(captured piece name, location), ...]).
+        """
+        board = self.dict_piece_locations
+        index = self.square_index
+        counts = self.piece_counts
+        tables = Squares.PIECE_SQUARE_TABLES
+        signs = Squares.PIECE_SIGNS
+        piece_name = index.pop(record.from_square)
+        piece_type = self.piece_type(piece_name)
+        original_location = board[piece_name]
+        captured_pieces = []
+        for square in record.captured:
+            captured_name = index.pop(square)
+            captured_type = self.piece_type(captured_name)
+            counts[captured_type] -= 1
+            self.psq_score -= signs[captured_type] * tables[captured_type][square]
+            captured_pieces.append((captured_name, board.pop(captured_name)))
+        new_piece_name = piece_name
+        new_piece_type = piece_type
+        if record.promotion:
+            del board[piece_name]
+            new_piece_name = f'king_{piece_name}'
+            new_piece_type = piece_type + 1  # man -> king of the same color
+            counts[piece_type] -= 1
+            counts[new_piece_type] += 1
+        self.psq_score += signs[piece_type] * (tables[new_piece_type][record.to_square] - tables[piece_type][record.from_square])
+        board[new_piece_name] = Squares.LOCATIONS[record.to_square]
+        index[record.to_square] = new_piece_name
+        return piece_name, original_location, captured_pieces
 
+    def unmake_move(self, record, undo):
+        """
+        Undoes a move made with make_move, restoring the same pieces at the same locations.
+        """
+        board = self.dict_piece_locations
+        index = self.square_index
+        counts = self.piece_counts
+        tables = Squares.PIECE_SQUARE_TABLES
+        signs = Squares.PIECE_SIGNS
+        piece_name, original_location, captured_pieces = undo
+        piece_type = self.piece_type(piece_name)
+        new_piece_type = piece_type
+        del index[record.to_square]
+        if record.promotion:
+            del board[f'king_{piece_name}']
+            new_piece_type = piece_type + 1
+            counts[new_piece_type] -= 1
+            counts[piece_type] += 1
+        self.psq_score -= signs[piece_type] * (tables[new_piece_type][record.to_square] - tables[piece_type][record.from_square])
+        board[piece_name] = original_location
+        index[record.from_square] = piece_name
+        for square, (captured_name, location) in zip(record.captured, captured_pieces):
+            captured_type = self.piece_type(captured_name)
+            counts[captured_type] += 1
+            self.psq_score += signs[captured_type] * tables[captured_type][square]
+            board[captured_name] = location
+            index[square] = captured_name
 
-    def get_all_valid_captures(self):
+    def board_after(self, record):
         """
-        Returns the list of all possible board states after all possible captures have been made.
-        Can be used if more than one piece can make captures.
+        Returns a new board state after a move record has been made, leaving this board unchanged.
+        Location objects are never modified, so the new board shares them with this one instead of deep copying them.
+        If the Move was made from a Position, the new board is a Position.
         """
-        # self.captures_available = {}
-        for piece_name in self.dict_piece_locations.keys():
-            if self.color in piece_name:
-                self._recursive_capture(piece_name, self.dict_piece_locations, self.color)
-         
-        self.list_of_board_states = [x for x in self.list_of_board_states if x != self.dict_piece_locations]
-        return self.list_of_board_states
-        
+        if self.position is not None:
+            return self.position.after(record)
+        new_board_state = dict(self.dict_piece_locations)
+        piece_name = self.square_index[record.from_square]
+        location = Squares.LOCATIONS[record.to_square]
+        if record.promotion:
+            del new_board_state[piece_name]
+            new_board_state[f'king_{piece_name}'] = location
+        else:
+            new_board_state[piece_name] = location
+        for square in record.captured:
+            del new_board_state[self.square_index[square]]
+        return new_board_state
+
 
 ############################## Functions for Both Simple Jumps and Captures
-    def get_legal_moves(self):
+    def get_legal_moves(self, as_records=False):
         """
         Returns a list of board states after all possible moves have been made.
         If captures are possible, only a list of board states with captures are returned.
         Otherwise, a list of board states with simple jumps are returned.
-        """
-        self.valid_moves = []
 
-        if self.get_all_valid_captures():
-            self.valid_moves = self.list_of_board_states
+        as_records: bool, if True, return MoveRecord objects instead of board states (see make_move and unmake_move)
+        """
+        records = self.generate_moves()
+        if records and records[0].captured:
             self.is_capture_available = True
 
-        else: # no captures possible, only simple jumps
-            # print('no captures available')  
-            self.list_available_jumps()
-            for piece_name, moves in self.available_moves.items():
-                for move in moves:
-                    self.valid_moves.append(self.make_jump(piece_name, move))
-
+        if as_records:
+            self.valid_moves = records
+        else:
+            self.valid_moves = [self.board_after(record) for record in records]
         return self.valid_moves
 
 
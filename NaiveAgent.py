@@ -1,4 +1,5 @@
 from Move import Move
+from Position import Position
 import random
 
 
@@ -8,6 +9,7 @@ class NaiveAgent():
     If a capture is possible, the NaiveAgent must make a capture. If multiple captures are possible, 
     the NaiveAgent will choose one of the captures at random.
     If no capture is possible, the NaiveAgent must make a random move.
+    The board state can be a dictionary or a Position, the new board state is then of the same kind.
     """
     def __init__(self, color, board_state):
         self.color = color
@@ -27,17 +29,19 @@ class NaiveAgent():
         # pick a random board state from all valid moves
         new_board_state = random.choice(valid_moves)
         if show_board:  # print what that move was
+            before, after = self.board_state, new_board_state
+            if isinstance(before, Position):  # the pieces of a Position are named from the same move on a dictionary
+                before = before.to_dict()
+                after = Move(before, self.color).get_legal_moves()[valid_moves.index(new_board_state)]
+            for k,v in after.items():
+                if k not in before:  # a man that was promoted is renamed king_...
+                    print(f"{k[len('king_'):]} moved from {before[k[len('king_'):]]} to {v} and became a king")
+                elif before[k] != after[k]:
+                    print(f'{k} moved from {before[k]} to {v}')
             if self.nextMove.is_capture_available == True:
-                for k,v in new_board_state.items():
-                    if self.board_state[k] != new_board_state[k]:
-                        print(f'{k} moved from {self.board_state[k]} to {v}')
-                for k in self.board_state.keys():    
-                    if k not in new_board_state:
+                for k in before.keys():    
+                    if k not in after and f'king_{k}' not in after:
                         print(f'and {k} was captured')
-            else:
-                for k,v in new_board_state.items():
-                    if self.board_state[k] != new_board_state[k]:
-                        print(f'{k} moved from {self.board_state[k]} to {v}')
         return new_board_state
             
 
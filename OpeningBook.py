@@ -0,0 +1,153 @@
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from Move import Move
+from TranspositionTable import ZOBRIST, TranspositionTable
+from array import array
+from bisect import bisect_left
+from collections import deque
+import random
+import struct
+import sys
+import time
+
+
+MAGIC = b'CKOB'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')  # magic, version, number of entries
+
+
+class OpeningBookBuilder:
+    """
+    The OpeningBookBuilder class builds an opening book by searching every position of the first plies of the game deeply.
+
+    Starting from Game.initialize_board, each position is searched with alpha-beta to search_depth, and every move whose score
+    is within margin of the best score is added to the book. The best moves get a weight of 100 and the others less,
+    so that the book can choose between them at random. The positions reached by these moves are then added
+    in the same way, breadth first, until max_plies or max_positions is reached.
+    Positions are identified by their Zobrist hash and moves by their move key (from square * 32 + to square).
+    """
+
+    def __init__(self, max_plies=4, search_depth=6, margin=0, max_positions=500):
+        self.max_plies = max_plies
+        self.search_depth = search_depth
+        self.margin = margin
+        self.max_positions = max_positions
+        self.entries = {}  # position hash -> {move key: weight}
+
+    def score_moves(self, board_state, color, table):
+        """Returns (move record, score for the side to move) for every legal move of a position"""
+        is_maximizing = color == 'white'
+        opponent_color = 'black' if is_maximizing else 'white'
+        position = Move(board_state, color)
+        scores = []
+        for record in position.generate_moves():
+            new_board_state = position.board_after(record)
+            agent = IntelligentAgent(opponent_color, new_board_state, table)
+            value, _ = agent.search(new_board_state, self.search_depth - 1, not is_maximizing, search_algorithm='alphabeta')
+            scores.append((record, value if is_maximizing else -value))
+        return scores
+
+    def build(self, show_progress=True):
+        """Searches the opening positions and fills the book entries"""
+        start_time = time.time()
+        table = TranspositionTable(64)
+        queue = deque([(Game().initialize_board(), 'black', 0)])
+        seen = set()
+        while queue and len(seen) < self.max_positions:
+            board_state, color, ply = queue.popleft()
+            position_hash = ZOBRIST.hash_board(board_state, color)
+            if position_hash in seen:
+                continue
+            seen.add(position_hash)
+            scores = self.score_moves(board_state, color, table)
+            if not scores:
+                continue
+            best_score = max(score for _, score in scores)
+            book_moves = self.entries.setdefault(position_hash, {})
+            opponent_color = 'white' if color == 'black' else 'black'
+            for record, score in scores:
+                if score >= best_score - self.margin:
+                    book_moves[record.key] = max(1, int(100 / (1 + best_score - score)))
+                    if ply + 1 < self.max_plies:
+                        game = Game()
+                        game.board_state = Move(board_state, color).board_after(record)
+                        queue.append((game.check_for_promotion(), opponent_color, ply + 1))
+            if show_progress and len(seen) % 50 == 0:
+                print(f'{len(seen)} positions searched ({time.time() - start_time:.1f} seconds)')
+        if show_progress:
+            print(f'{len(self.entries)} positions and {sum(len(moves) for moves in self.entries.values())} moves in the book '
+                  f'({time.time() - start_time:.1f} seconds)')
+
+    def write(self, path):
+        """Writes the book: a header, then the position hashes (uint64, sorted), the move keys (uint16) and the weights (uint16)"""
+        rows = sorted((position_hash, move_key, weight) for position_hash, moves in self.entries.items() for move_key, weight in moves.items())
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(rows)))
+            f.write(array('Q', [row[0] for row in rows]).tobytes())
+            f.write(array('H', [row[1] for row in rows]).tobytes())
+            f.write(array('H', [row[2] for row in rows]).tobytes())
+
+
+class OpeningBook:
+    """
+    The OpeningBook class looks up the moves of a book written by OpeningBookBuilder.
+    The whole file is small, so it is read at once into typed arrays and searched with a binary search.
+    Unlike a memory-mapped Tablebase, an OpeningBook can be pickled and sent to the worker processes of a Tournament.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.nb_entries = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a checkers opening book')
+        offset = HEADER.size
+        self.hashes = array('Q', data[offset:offset + 8 * self.nb_entries])
+        offset += 8 * self.nb_entries
+        self.move_keys = array('H', data[offset:offset + 2 * self.nb_entries])
+        offset += 2 * self.nb_entries
+        self.weights = array('H', data[offset:offset + 2 * self.nb_entries])
+        self.hits = 0
+        self.misses = 0
+
+    def book_moves(self, board_state, color):
+        """
+        Returns the book moves of a position as a list of (MoveRecord, weight), empty if the position is not in the book.
+        Only moves that are legal in the position are returned, in case two positions have the same hash.
+        """
+        position_hash = ZOBRIST.hash_board(board_state, color)
+        i = bisect_left(self.hashes, position_hash)
+        weights = {}
+        while i < self.nb_entries and self.hashes[i] == position_hash:
+            weights[self.move_keys[i]] = self.weights[i]
+            i += 1
+        if not weights:
+            self.misses += 1
+            return []
+        self.hits += 1
+        moves = []
+        for record in Move(board_state, color).generate_moves():
+            if record.key in weights:
+                moves.append((record, weights.pop(record.key)))  # pop: one record per key if capture paths share it
+        return moves
+
+    def choose(self, board_state, color, rng=random):
+        """
+        Picks a book move at random, in proportion to the weights, and returns the new board state, or None if the position is not in the book.
+        """
+        moves = self.book_moves(board_state, color)
+        if not moves:
+            return None
+        records, weights = zip(*moves)
+        return Move(board_state, color).board_after(rng.choices(records, weights=weights)[0])
+
+
+if __name__ == '__main__':
+    # python OpeningBook.py [max plies] [search depth] [output file]
+    max_plies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    search_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    path = sys.argv[3] if len(sys.argv) > 3 else 'opening_book.ckob'
+    builder = OpeningBookBuilder(max_plies, search_depth)
+    builder.build()
+    builder.write(path)
+    print(f'Opening book written to {path}')
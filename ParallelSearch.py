@@ -0,0 +1,200 @@
+from IntelligentAgent import IntelligentAgent, SearchTimeout
+from Move import Move
+from TranspositionTable import SharedTranspositionTable
+import multiprocessing
+import numpy as np
+import os
+import random
+import time
+
+
+PARALLEL_MODES = ('root', 'lazy_smp')
+
+# set in each worker process by _init_worker
+_shared_bound = None
+_stop_event = None
+
+
+def _init_worker(shared_bound, stop_event):
+    global _shared_bound, _stop_event
+    _shared_bound = shared_bound
+    _stop_event = stop_event
+
+
+def _search_root_move(task):
+    """
+    Searches the position after one root move in a worker process (root splitting).
+    If share_bound is True, the window starts at the best value found so far by any worker, which prunes more
+    but only gives an upper (or lower) bound for the moves that are worse than that.
+    Returns (root move number, value, whether the value is exact, nodes searched, time spent, process id).
+    """
+    move_number, board_state, color, record, depth, share_bound = task
+    start_time = time.perf_counter()
+    is_maximizing = color == 'white'
+    new_board_state = Move(board_state, color).board_after(record)
+    opponent_color = 'black' if is_maximizing else 'white'
+    agent = IntelligentAgent(opponent_color, new_board_state)
+    alpha, beta = -np.inf, np.inf
+    if share_bound:
+        if is_maximizing:
+            alpha = _shared_bound.value
+        else:
+            beta = _shared_bound.value
+    agent._start_search(new_board_state, depth)
+    value, _ = agent.alphabeta(new_board_state, not is_maximizing, depth=depth - 1, alpha=alpha, beta=beta, show_minimax_boards=False, root_ply=1)
+    is_exact = alpha < value < beta
+    if share_bound and is_exact:
+        with _shared_bound.get_lock():
+            if (is_maximizing and value > _shared_bound.value) or (not is_maximizing and value < _shared_bound.value):
+                _shared_bound.value = value
+    return move_number, value, is_exact, agent.nodes_searched, time.perf_counter() - start_time, os.getpid()
+
+
+def _lazy_smp_helper(task):
+    """
+    Searches the whole position in a worker process (lazy SMP), sharing the transposition table with the other workers.
+    Helpers other than the first one search in a different move order, and every other helper one ply deeper,
+    so that they fill the shared table with results the others can use.
+    Returns (worker number, depth, value, best move, nodes searched, time spent), with value and best move None if the search was stopped.
+    """
+    worker_number, board_state, color, depth, table_name, nb_buckets, age = task
+    start_time = time.perf_counter()
+    table = SharedTranspositionTable.attach(table_name, nb_buckets)
+    table.age = age
+    agent = IntelligentAgent(color, board_state, table)
+    agent.stop_event = _stop_event
+    helper_depth = depth + worker_number % 2
+    if worker_number > 0:
+        rng = random.Random(worker_number)
+        agent.history = {(side, key): rng.random() for side in ('black', 'white') for key in range(32 * 32)}
+    try:
+        value, best_move = agent.search(board_state, helper_depth, color == 'white', search_algorithm='alphabeta')
+    except SearchTimeout:
+        value, best_move = None, None
+    nodes_searched = agent.nodes_searched
+    del agent
+    table.close()
+    return worker_number, helper_depth, value, best_move, nodes_searched, time.perf_counter() - start_time
+
+
+class ParallelSearch:
+    """
+    The ParallelSearch class searches a single position at a fixed depth with alpha-beta on several processes.
+
+    Two modes are available:
+    - 'root': the root moves are split between the workers, each worker searches the positions after its moves.
+      With deterministic=False the workers share the best value found so far to prune more; with deterministic=True
+      every root move is searched with a full window and the first best move in move generation order is chosen,
+      so the same move is always returned.
+    - 'lazy_smp': every worker searches the whole position, sharing a transposition table in shared memory.
+      The result of the first worker is used, or of a deeper helper that finished first. This mode is not deterministic,
+      so deterministic=True uses root splitting instead.
+
+    The pool of processes is kept between searches; call close() (or use the object in a with statement) when done.
+    """
+
+    def __init__(self, num_workers=None, mode='root', deterministic=False, table_size_mb=16):
+        if mode not in PARALLEL_MODES:
+            raise ValueError(f'Unknown parallel search mode {mode!r}, expected one of {PARALLEL_MODES}')
+        self.num_workers = num_workers or os.cpu_count()
+        self.mode = mode
+        self.deterministic = deterministic
+        self.table_size_mb = table_size_mb
+        self.table = None
+        self._shared_bound = multiprocessing.Value('d', 0.0)
+        self._stop_event = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(self.num_workers, initializer=_init_worker, initargs=(self._shared_bound, self._stop_event))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes and frees the shared transposition table"""
+        self.pool.close()
+        self.pool.join()
+        if self.table is not None:
+            self.table.close()
+            self.table.unlink()
+            self.table = None
+
+    def search(self, board_state, depth, is_maximizing, compare_serial=False):
+        """
+        Searches board_state to the given depth and returns a dictionary with:
+        value, best_move (the new board state), mode, depth, nodes (total), nodes_per_worker,
+        wall_time, worker_time (total time spent searching in the workers) and speedup.
+
+        The speedup is worker_time / wall_time, an estimate of how much faster than a single process the search was.
+        compare_serial: bool, if True, also run the same search on a single process and use the measured time for the speedup
+        """
+        start_time = time.perf_counter()
+        if self.mode == 'lazy_smp' and not self.deterministic:
+            result = self._search_lazy_smp(board_state, depth, is_maximizing)
+        else:
+            result = self._search_root_split(board_state, depth, is_maximizing)
+        result['wall_time'] = time.perf_counter() - start_time
+        result['nodes'] = sum(result['nodes_per_worker'].values())
+        result['speedup'] = result['worker_time'] / result['wall_time'] if result['wall_time'] else 0.0
+        if compare_serial:
+            color = 'white' if is_maximizing else 'black'
+            serial_start = time.perf_counter()
+            agent = IntelligentAgent(color, board_state)
+            agent.search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+            result['serial_time'] = time.perf_counter() - serial_start
+            result['serial_nodes'] = agent.nodes_searched
+            result['speedup'] = result['serial_time'] / result['wall_time']
+        return result
+
+    def _search_root_split(self, board_state, depth, is_maximizing):
+        color = 'white' if is_maximizing else 'black'
+        records = Move(board_state, color).generate_moves()
+        share_bound = not self.deterministic
+        self._shared_bound.value = -np.inf if is_maximizing else np.inf
+        tasks = [(move_number, board_state, color, record, depth, share_bound) for move_number, record in enumerate(records)]
+
+        results = sorted(self.pool.imap_unordered(_search_root_move, tasks))  # back in move generation order
+        best_value = -np.inf if is_maximizing else np.inf
+        best_record = records[0] if records else None
+        for move_number, value, is_exact, _, _, _ in results:
+            if not is_exact and share_bound:
+                continue  # only a bound, this move is not better than the best one
+            if (is_maximizing and value > best_value) or (not is_maximizing and value < best_value):
+                best_value = value
+                best_record = records[move_number]
+
+        worker_numbers = {}
+        nodes_per_worker = {}
+        for _, _, _, nodes, _, pid in results:
+            worker_number = worker_numbers.setdefault(pid, len(worker_numbers))
+            nodes_per_worker[worker_number] = nodes_per_worker.get(worker_number, 0) + nodes
+        return {'value': best_value,
+                'best_move': Move(board_state, color).board_after(best_record) if best_record is not None else None,
+                'mode': 'root',
+                'depth': depth,
+                'nodes_per_worker': nodes_per_worker,
+                'worker_time': sum(result[4] for result in results)}
+
+    def _search_lazy_smp(self, board_state, depth, is_maximizing):
+        color = 'white' if is_maximizing else 'black'
+        if self.table is None:
+            self.table = SharedTranspositionTable(self.table_size_mb)
+        self.table.age = (self.table.age + 1) % 65536
+        self._stop_event.clear()
+        pending = [self.pool.apply_async(_lazy_smp_helper, ((worker_number, board_state, color, depth, self.table.name, self.table.nb_buckets, self.table.age),))
+                   for worker_number in range(self.num_workers)]
+        results = [pending[0].get()]  # the main search at the requested depth
+        self._stop_event.set()  # the helpers stop as soon as the main search is done
+        results += [result.get() for result in pending[1:]]
+        self._stop_event.clear()
+
+        # use the deepest search that finished, the main search if there is a tie
+        finished = [result for result in results if result[2] is not None]
+        _, best_depth, value, best_move, _, _ = max(finished, key=lambda result: (result[1], -result[0]))
+        return {'value': value,
+                'best_move': best_move,
+                'mode': 'lazy_smp',
+                'depth': best_depth,
+                'nodes_per_worker': {result[0]: result[4] for result in results},
+                'worker_time': sum(result[5] for result in results)}
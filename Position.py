@@ -0,0 +1,145 @@
+import Squares
+from Squares import LOCATIONS, NUM_SQUARES
+
+
+EMPTY = 0
+# the code of a piece on a square is its piece type (Squares.BLACK_MAN...) + 1, 0 for an empty square
+PIECE_SYMBOLS = '.bBwW'
+
+
+def board_dict(board_state):
+    """Returns a new board state dictionary from a board state dictionary or a Position, that can be changed freely"""
+    if isinstance(board_state, Position):
+        return board_state.to_dict()
+    return dict(board_state)
+
+
+class Position:
+    """
+    The Position class is a compact, immutable and hashable board state: one byte per playable square
+    (0 for an empty square, 1 + the piece type of Squares for a piece), so a board takes a few dozen bytes
+    instead of a dictionary of piece names and Location objects, and can be put in sets or used as a dictionary key.
+    Two positions are equal when the same pieces are on the same squares. The side to move is not part of the position,
+    like it isn't part of a board state dictionary: use (position, color) as a key when it matters.
+
+    A Position can be read like a board state dictionary (items(), keys(), [piece name], len()...), so the code
+    that only looks at a board accepts it as it is. Pieces get names in square order for each color,
+    men first, then kings: a king moving doesn't rename the men, which is what PositionHistory.is_progress looks at.
+    to_dict and from_dict convert to and from board state dictionaries, and after(record) plays a MoveRecord.
+    Move, IntelligentAgent, NaiveAgent and Game accept a Position wherever they take a board state,
+    and the boards they return are then Positions too.
+    """
+    __slots__ = ('squares', '_hash')
+
+    def __init__(self, squares):
+        squares = bytes(squares)
+        if len(squares) != NUM_SQUARES:
+            raise ValueError(f'A position has {NUM_SQUARES} squares, not {len(squares)}')
+        object.__setattr__(self, 'squares', squares)
+        object.__setattr__(self, '_hash', hash(squares))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Position objects are immutable')
+
+    def __eq__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.squares == other.squares
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return Position, (self.squares,)
+
+    def __repr__(self):
+        return f"Position('{self}')"
+
+    def __str__(self):
+        return ''.join(PIECE_SYMBOLS[code] for code in self.squares)
+
+    ############################## Conversions ########################################
+
+    @staticmethod
+    def from_dict(board_state):
+        """Builds a Position from a board state dictionary (or returns it if it already is a Position)"""
+        if isinstance(board_state, Position):
+            return board_state
+        squares = bytearray(NUM_SQUARES)
+        for piece_name, location in board_state.items():
+            if piece_name.startswith('king_'):
+                code = 1 + (Squares.BLACK_KING if piece_name.startswith('king_black') else Squares.WHITE_KING)
+            else:
+                code = 1 + (Squares.BLACK_MAN if piece_name.startswith('black') else Squares.WHITE_MAN)
+            squares[Squares.square_of(location.x, location.y)] = code
+        return Position(squares)
+
+    @staticmethod
+    def from_string(text):
+        """Builds a Position from one character per square, from square 0 to 31: '.' empty, 'b'/'w' men, 'B'/'W' kings"""
+        return Position(PIECE_SYMBOLS.index(symbol) for symbol in text)
+
+    def to_dict(self):
+        """Returns the position as a new board state dictionary, see the class docstring for the piece names"""
+        return dict(self.items())
+
+    ############################## Read-only Board State Dictionary ########################################
+
+    def items(self):
+        """Yields (piece name, Location) for every piece: black men, black kings, white men, then white kings, each in square order"""
+        squares = self.squares
+        for man_code, prefixes in ((1, ('black_piece_', 'king_black_piece_')), (3, ('white_piece_', 'king_white_piece_'))):
+            number = 0
+            for code, prefix in ((man_code, prefixes[0]), (man_code + 1, prefixes[1])):
+                for square in range(NUM_SQUARES):
+                    if squares[square] == code:
+                        number += 1
+                        yield f'{prefix}{number}', LOCATIONS[square]
+
+    def keys(self):
+        return [piece_name for piece_name, _ in self.items()]
+
+    def values(self):
+        return [location for _, location in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return NUM_SQUARES - self.squares.count(EMPTY)
+
+    def __getitem__(self, piece_name):
+        for name, location in self.items():
+            if name == piece_name:
+                return location
+        raise KeyError(piece_name)
+
+    def get(self, piece_name, default=None):
+        try:
+            return self[piece_name]
+        except KeyError:
+            return default
+
+    def __contains__(self, piece_name):
+        return self.get(piece_name) is not None
+
+    ############################## Moves ########################################
+
+    def piece_at(self, square):
+        """Returns the piece type (Squares.BLACK_MAN...) on a square, or None if it is empty"""
+        code = self.squares[square]
+        return code - 1 if code else None
+
+    def men_squares(self):
+        """Returns the squares of the men of both colors, which only change when a man moves or a piece is captured"""
+        return tuple(square for square, code in enumerate(self.squares) if code in (1, 3))
+
+    def after(self, record):
+        """Returns the Position after a MoveRecord (see Move.generate_moves) has been played"""
+        squares = bytearray(self.squares)
+        code = squares[record.from_square]
+        squares[record.from_square] = EMPTY
+        for square in record.captured:
+            squares[square] = EMPTY
+        squares[record.to_square] = code + 1 if record.promotion else code
+        return Position(squares)
@@ -0,0 +1,77 @@
+from TranspositionTable import ZOBRIST
+from Position import Position
+
+
+DEFAULT_NO_PROGRESS_LIMIT = 80  # plies, 40 moves for each side
+
+
+class PositionHistory:
+    """
+    The PositionHistory class remembers the positions of a game to detect draws:
+    - threefold repetition: the same position (same pieces on the same squares, same side to move) for the third time
+    - no progress: no_progress_limit plies in a row without a capture and without a man moving, only kings shuffling around
+
+    Positions are identified by their Zobrist hash. A dictionary counts how many times each hash occurred,
+    so checking for a repetition is O(1) however long the game is, and a stack remembers the order of the positions
+    so that the last one can be removed with pop(). The search pushes and pops the positions of the line it is looking at
+    in the same way, so that it can score a position that repeats an earlier one as a draw.
+    """
+
+    def __init__(self, no_progress_limit=DEFAULT_NO_PROGRESS_LIMIT):
+        self.no_progress_limit = no_progress_limit
+        self.counts = {}  # hash -> number of times the position occurred
+        self.stack = []  # (hash, plies without progress before the position) in the order the positions occurred
+        self.plies_without_progress = 0
+
+    def __len__(self):
+        return len(self.stack)
+
+    def push(self, h, is_progress=True):
+        """
+        Adds a position after a move. is_progress is True if the move captured a piece or moved a man.
+        """
+        self.stack.append((h, self.plies_without_progress))
+        self.counts[h] = self.counts.get(h, 0) + 1
+        self.plies_without_progress = 0 if is_progress else self.plies_without_progress + 1
+
+    def pop(self):
+        """Removes the last position, as if its move was taken back"""
+        h, self.plies_without_progress = self.stack.pop()
+        count = self.counts[h] - 1
+        if count:
+            self.counts[h] = count
+        else:
+            del self.counts[h]
+
+    def push_board(self, board_state, color, is_progress=True):
+        """Adds a board state dictionary with color to move"""
+        self.push(ZOBRIST.hash_board(board_state, color), is_progress)
+
+    def occurrences(self, h):
+        """Returns the number of times a position occurred"""
+        return self.counts.get(h, 0)
+
+    def is_threefold_repetition(self):
+        """Checks whether the last position occurred for the third time"""
+        return bool(self.stack) and self.counts[self.stack[-1][0]] >= 3
+
+    def is_no_progress(self):
+        """Checks whether the no-progress ply limit has been reached"""
+        return self.no_progress_limit is not None and self.plies_without_progress >= self.no_progress_limit
+
+    def is_draw(self):
+        """Checks whether the game is drawn by repetition or by the no-progress rule"""
+        return self.is_threefold_repetition() or self.is_no_progress()
+
+    @staticmethod
+    def is_progress(board_state, new_board_state):
+        """
+        Checks whether the move from board_state to new_board_state captured a piece or moved a man
+        (a promoted man disappears under its old name, so it counts as moved).
+        """
+        if len(new_board_state) < len(board_state):
+            return True
+        if isinstance(board_state, Position) and isinstance(new_board_state, Position):
+            return board_state.men_squares() != new_board_state.men_squares()
+        return any(piece_name not in new_board_state or new_board_state[piece_name] != location
+                   for piece_name, location in board_state.items() if not piece_name.startswith('king_'))
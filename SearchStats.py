@@ -0,0 +1,103 @@
+MAX_PLIES = 96  # longer than any line the search can look at: the search depth plus one capture per piece
+
+
+class SearchStats:
+    """
+    The SearchStats class collects what a search did, so that searches can be compared without printing the boards:
+    - nodes: the number of positions visited, and nodes_per_ply how many at each ply from the root
+    - leaf_evaluations: the number of positions scored with the evaluation function
+    - move_generations: the number of times the legal moves of a position were generated
+    - cutoffs: the number of times alpha-beta stopped searching the moves of a position
+    - tt_probes and tt_hits: transposition table lookups, and how many of them found the position
+    - tablebase_hits and draws: positions scored from the tablebase or as draws by repetition without being searched
+    - quiescence_nodes: the nodes searched past the depth of the search to resolve captures (included in nodes),
+      and quiescence_limit_hits the number of leaves evaluated with a capture pending because the quiescence node limit was reached
+    - pvs_researches: the moves that principal variation search had to search again with a full window after its null window
+      search showed they might be better than the first move, and aspiration_failures the iterations of iterative deepening
+      whose value fell outside of the aspiration window and were searched again with a full window
+    - move_generation_time and evaluation_time: seconds spent generating moves and evaluating, only measured with timing=True
+      since reading the clock twice per node slows the search down
+    - time: the total duration of the search in seconds, and depth the depth searched
+
+    Stats of several searches (the moves of a game, several games) can be added together with merge().
+    """
+
+    COUNTERS = ('nodes', 'leaf_evaluations', 'move_generations', 'cutoffs', 'tt_probes', 'tt_hits', 'tablebase_hits', 'draws',
+                'quiescence_nodes', 'quiescence_limit_hits', 'pvs_researches', 'aspiration_failures', 'searches')
+    TIMERS = ('move_generation_time', 'evaluation_time', 'time')
+
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.depth = 0
+        self.nodes_per_ply = [0] * MAX_PLIES
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        for timer in self.TIMERS:
+            setattr(self, timer, 0.0)
+
+    @property
+    def effective_branching_factor(self):
+        """
+        The branching factor of a uniform tree of the same depth with the same number of nodes (nodes ** (1 / depth)),
+        averaged over the searches: the lower it is, the more the search pruned.
+        """
+        if not self.searches or not self.depth:
+            return 0.0
+        return (self.nodes / self.searches) ** (1 / (self.depth / self.searches))
+
+    def branching_factors(self):
+        """Returns the number of nodes at each ply divided by the number at the ply before"""
+        plies = self.plies()
+        return [plies[ply + 1] / plies[ply] for ply in range(len(plies) - 1) if plies[ply]]
+
+    def plies(self):
+        """Returns nodes_per_ply without the unused plies at the end"""
+        last = max((ply for ply, nodes in enumerate(self.nodes_per_ply) if nodes), default=-1)
+        return self.nodes_per_ply[:last + 1]
+
+    def merge(self, other):
+        """Adds the stats of another search to these ones and returns self"""
+        for counter in self.COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        for timer in self.TIMERS:
+            setattr(self, timer, getattr(self, timer) + getattr(other, timer))
+        self.depth += other.depth
+        self.nodes_per_ply = [a + b for a, b in zip(self.nodes_per_ply, other.nodes_per_ply)]
+        return self
+
+    def to_dict(self):
+        """Returns the stats as a plain dictionary (for printing or JSON)"""
+        stats = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        stats.update({timer: getattr(self, timer) for timer in self.TIMERS})
+        stats['depth'] = self.depth
+        stats['nodes_per_ply'] = self.plies()
+        stats['effective_branching_factor'] = self.effective_branching_factor
+        stats['tt_hit_rate'] = self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+        stats['nodes_per_second'] = self.nodes / self.time if self.time else 0.0
+        return stats
+
+    def __repr__(self):
+        return (f"SearchStats(searches={self.searches}, nodes={self.nodes}, leaf_evaluations={self.leaf_evaluations}, "
+                f"cutoffs={self.cutoffs}, tt_hits={self.tt_hits}, ebf={self.effective_branching_factor:.2f}, time={self.time:.3f})")
+
+
+class SearchHooks:
+    """
+    Callbacks called by IntelligentAgent during a search, for a profiler or a tracer. Subclass it and override the methods you need.
+    The agent only calls them when it was given hooks, so there is no cost when they are not used.
+    """
+
+    def on_search_start(self, agent, board_state, depth):
+        """Called before a search from board_state"""
+
+    def on_node(self, agent, ply, depth, position):
+        """Called when the search enters a position (a Move object), depth being the remaining depth"""
+
+    def on_leaf(self, agent, ply, value):
+        """Called when a position is scored with the evaluation function"""
+
+    def on_cutoff(self, agent, ply, move):
+        """Called when alpha-beta stops searching a position after move (a MoveRecord)"""
+
+    def on_search_end(self, agent, stats):
+        """Called after a search with its SearchStats"""
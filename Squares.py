@@ -0,0 +1,117 @@
+"""
+The Squares module holds the board topology used by the fast move generators.
+Only the 32 dark squares of the 8x8 board are playable, so each of them is given an index from 0 to 31:
+square = x * 4 + y // 2, where x is the row and y the column of the Location.
+
+All tables are computed once at import time:
+- SQUARE_TO_XY / XY_TO_SQUARE convert between square indexes and (x, y) coordinates
+- LOCATIONS[square] is the Location of the square, shared by every board state since Location objects are immutable
+- NEIGHBORS[square][direction] is the adjacent square in that direction, or None if it is off the board
+- JUMPS[square][direction] is the (jumped square, landing square) pair in that direction, or None
+- SQUARE_MASKS[square] is the bit of the square in a 32-bit mask
+- DIRECTION_SHIFTS[direction] moves a whole mask one step in that direction
+- PIECE_SQUARE_TABLES[piece type][square] is the positional value of a piece on a square
+"""
+
+from Location import Location
+
+NUM_SQUARES = 32
+FULL_MASK = (1 << NUM_SQUARES) - 1
+
+# Directions in the same order as the original move generator: (dx, dy)
+# Black men move towards higher x, white men towards lower x, kings move in all four directions.
+DIRECTIONS = ((1, -1), (1, 1), (-1, -1), (-1, 1))
+BLACK_MAN_DIRECTIONS = (0, 1)
+WHITE_MAN_DIRECTIONS = (2, 3)
+KING_DIRECTIONS = (0, 1, 2, 3)
+OPPOSITE_DIRECTION = (3, 2, 1, 0)
+
+# Rows on which men are promoted to kings
+BLACK_PROMOTION_ROW = 7
+WHITE_PROMOTION_ROW = 0
+
+
+def _on_board(x, y):
+    return 0 <= x <= 7 and 0 <= y <= 7
+
+
+SQUARE_TO_XY = tuple((sq // 4, 2 * (sq % 4) + (1 - (sq // 4) % 2)) for sq in range(NUM_SQUARES))
+XY_TO_SQUARE = {xy: sq for sq, xy in enumerate(SQUARE_TO_XY)}
+SQUARE_MASKS = tuple(1 << sq for sq in range(NUM_SQUARES))
+LOCATIONS = tuple(Location(x, y) for x, y in SQUARE_TO_XY)
+
+NEIGHBORS = tuple(
+    tuple(
+        XY_TO_SQUARE[(x + dx, y + dy)] if _on_board(x + dx, y + dy) else None
+        for dx, dy in DIRECTIONS
+    )
+    for x, y in SQUARE_TO_XY
+)
+
+JUMPS = tuple(
+    tuple(
+        (XY_TO_SQUARE[(x + dx, y + dy)], XY_TO_SQUARE[(x + 2 * dx, y + 2 * dy)]) if _on_board(x + 2 * dx, y + 2 * dy) else None
+        for dx, dy in DIRECTIONS
+    )
+    for x, y in SQUARE_TO_XY
+)
+
+# For every direction, the (offset, source mask) pairs that move each square onto its neighbor with a single shift.
+# The offset depends on the parity of the row, so each direction has two entries.
+DIRECTION_SHIFTS = tuple(
+    tuple(
+        (offset, sum(SQUARE_MASKS[sq] for sq in range(NUM_SQUARES) if NEIGHBORS[sq][d] is not None and NEIGHBORS[sq][d] - sq == offset))
+        for offset in sorted({NEIGHBORS[sq][d] - sq for sq in range(NUM_SQUARES) if NEIGHBORS[sq][d] is not None})
+    )
+    for d in range(len(DIRECTIONS))
+)
+
+# Piece types used by the piece-square tables and the Zobrist hashes
+BLACK_MAN, BLACK_KING, WHITE_MAN, WHITE_KING = 0, 1, 2, 3
+NUM_PIECE_TYPES = 4
+PIECE_SIGNS = (-1, -1, 1, 1)  # white is the maximizing player
+
+
+def _center_distance(x, y):
+    return max(abs(2 * x - 7), abs(2 * y - 7)) // 2
+
+
+# Piece-square tables: men are worth more the closer they are to promotion, kings the closer they are to the center
+PIECE_SQUARE_TABLES = (
+    tuple(x for x, y in SQUARE_TO_XY),
+    tuple(3 - _center_distance(x, y) for x, y in SQUARE_TO_XY),
+    tuple(7 - x for x, y in SQUARE_TO_XY),
+    tuple(3 - _center_distance(x, y) for x, y in SQUARE_TO_XY),
+)
+
+BLACK_PROMOTION_MASK = sum(SQUARE_MASKS[sq] for sq in range(NUM_SQUARES) if SQUARE_TO_XY[sq][0] == BLACK_PROMOTION_ROW)
+WHITE_PROMOTION_MASK = sum(SQUARE_MASKS[sq] for sq in range(NUM_SQUARES) if SQUARE_TO_XY[sq][0] == WHITE_PROMOTION_ROW)
+
+
+def square_of(x, y):
+    """Returns the square index of the playable square at row x, column y"""
+    return XY_TO_SQUARE[(x, y)]
+
+
+def xy_of(square):
+    """Returns the (x, y) coordinates of a square index"""
+    return SQUARE_TO_XY[square]
+
+
+def iter_bits(mask):
+    """Yields the square index of every bit set in a mask, lowest square first"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def shift_mask(mask, direction):
+    """Moves every square of a mask one step in a direction, dropping squares that would leave the board"""
+    shifted = 0
+    for offset, source_mask in DIRECTION_SHIFTS[direction]:
+        if offset > 0:
+            shifted |= (mask & source_mask) << offset
+        else:
+            shifted |= (mask & source_mask) >> -offset
+    return shifted
@@ -0,0 +1,269 @@
+from Bitboard import Bitboard
+from Move import Move
+import Squares
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import combinations
+import mmap
+import struct
+import sys
+import time
+
+
+# results, from the point of view of the side to move
+DRAW = 0
+WIN = 1
+LOSS = 2
+
+MAGIC = b'CKTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')  # magic, version, max pieces, number of positions
+
+
+def position_key(pieces, color):
+    """
+    Returns the key of a position: the side to move in the lowest bit, then 8 bits per piece in square order,
+    each holding 1 + (square * 4 + piece type). pieces is a list of (square, piece type) sorted by square.
+    """
+    key = 1 if color == 'white' else 0
+    shift = 1
+    for square, piece_type in pieces:
+        key |= (1 + square * Squares.NUM_PIECE_TYPES + piece_type) << shift
+        shift += 8
+    return key
+
+
+def bitboard_key(bitboard, color):
+    """Returns the position key of a Bitboard"""
+    pieces = []
+    for square in Squares.iter_bits(bitboard.black | bitboard.white):
+        mask = Squares.SQUARE_MASKS[square]
+        piece_type = Squares.BLACK_MAN if bitboard.black & mask else Squares.WHITE_MAN
+        if bitboard.kings & mask:
+            piece_type += 1
+        pieces.append((square, piece_type))
+    return position_key(pieces, color)
+
+
+def _material_signatures(max_pieces):
+    """Yields every (black men, black kings, white men, white kings) with at least one piece per side and at most max_pieces pieces"""
+    for total in range(2, max_pieces + 1):
+        for black_men in range(total + 1):
+            for black_kings in range(total + 1 - black_men):
+                for white_men in range(total + 1 - black_men - black_kings):
+                    white_kings = total - black_men - black_kings - white_men
+                    if black_men + black_kings > 0 and white_men + white_kings > 0:
+                        yield black_men, black_kings, white_men, white_kings
+
+
+def _placements(signature):
+    """
+    Yields the Bitboard of every legal placement of the pieces of a material signature.
+    Men can't stand on the row where they would have been promoted.
+    """
+    black_men, black_kings, white_men, white_kings = signature
+    black_man_squares = [sq for sq in range(Squares.NUM_SQUARES) if Squares.xy_of(sq)[0] != Squares.BLACK_PROMOTION_ROW]
+    white_man_squares = [sq for sq in range(Squares.NUM_SQUARES) if Squares.xy_of(sq)[0] != Squares.WHITE_PROMOTION_ROW]
+
+    def masks(squares):
+        return sum(Squares.SQUARE_MASKS[sq] for sq in squares)
+
+    for black_man_set in combinations(black_man_squares, black_men):
+        used = masks(black_man_set)
+        for white_man_set in combinations([sq for sq in white_man_squares if not used & Squares.SQUARE_MASKS[sq]], white_men):
+            used_men = used | masks(white_man_set)
+            free = [sq for sq in range(Squares.NUM_SQUARES) if not used_men & Squares.SQUARE_MASKS[sq]]
+            for black_king_set in combinations(free, black_kings):
+                black_king_mask = masks(black_king_set)
+                for white_king_set in combinations([sq for sq in free if not black_king_mask & Squares.SQUARE_MASKS[sq]], white_kings):
+                    white_king_mask = masks(white_king_set)
+                    yield Bitboard(used | black_king_mask, masks(white_man_set) | white_king_mask, black_king_mask | white_king_mask)
+
+
+class TablebaseGenerator:
+    """
+    The TablebaseGenerator class solves every position with up to max_pieces pieces by retrograde analysis
+    and writes the results to a file that Tablebase can read.
+
+    The rules are those of a real game: captures are mandatory, capture sequences are played to the end,
+    men that reach the other end of the board are promoted when the move ends (like Move),
+    and the side to move loses when it has no legal move (including when it has no pieces left).
+
+    Every position gets a result for the side to move (WIN, LOSS or DRAW) and the number of plies to the end of the game
+    with best play (the winner plays the fastest win, the loser the slowest loss).
+    The analysis runs in pure Python: 3 pieces take less than a minute, 4 pieces take much longer and a few GB of memory.
+    """
+
+    def __init__(self, max_pieces=3):
+        self.max_pieces = max_pieces
+        self.keys = []
+        self.results = bytearray()
+        self.distances = array('H')
+
+    def generate(self, show_progress=True):
+        """Enumerates all the positions, then solves them from the end of the game backwards"""
+        start_time = time.time()
+        positions = []
+        for signature in _material_signatures(self.max_pieces):
+            for bitboard in _placements(signature):
+                for color in ('black', 'white'):
+                    positions.append((bitboard, color))
+        key_to_id = {bitboard_key(bitboard, color): position_id for position_id, (bitboard, color) in enumerate(positions)}
+        nb_positions = len(positions)
+        if show_progress:
+            print(f'{nb_positions} positions with up to {self.max_pieces} pieces ({time.time() - start_time:.1f} seconds)')
+
+        # successors of every position, stored compactly as position ids
+        successors = array('I')
+        offsets = array('I', [0])
+        results = bytearray(nb_positions)
+        distances = array('H', bytes(2 * nb_positions))
+        resolved = bytearray(nb_positions)
+        queue = deque()
+        immediate_wins = []
+        for position_id, (bitboard, color) in enumerate(positions):
+            opponent_color = 'white' if color == 'black' else 'black'
+            wins_at_once = False
+            for move in bitboard.legal_moves(color):
+                child = bitboard.apply(move, color).promote()
+                if not (child.white if color == 'black' else child.black):
+                    wins_at_once = True  # the last opponent piece was captured
+                else:
+                    successors.append(key_to_id[bitboard_key(child, opponent_color)])
+            offsets.append(len(successors))
+            if offsets[-1] == offsets[-2] and not wins_at_once:
+                results[position_id] = LOSS  # no legal move
+                resolved[position_id] = 1
+                queue.append(position_id)
+            elif wins_at_once:
+                immediate_wins.append(position_id)
+        for position_id in immediate_wins:
+            results[position_id] = WIN
+            distances[position_id] = 1
+            resolved[position_id] = 1
+        queue.extend(immediate_wins)
+        if show_progress:
+            print(f'{len(successors)} moves generated ({time.time() - start_time:.1f} seconds)')
+
+        # predecessors, in the same compact format
+        remaining = array('I', (offsets[i + 1] - offsets[i] for i in range(nb_positions)))
+        predecessor_offsets = array('I', bytes(4 * (nb_positions + 1)))
+        for successor_id in successors:
+            predecessor_offsets[successor_id + 1] += 1
+        for i in range(nb_positions):
+            predecessor_offsets[i + 1] += predecessor_offsets[i]
+        predecessors = array('I', bytes(4 * len(successors)))
+        fill = array('I', predecessor_offsets[:-1])
+        for position_id in range(nb_positions):
+            for successor_id in successors[offsets[position_id]:offsets[position_id + 1]]:
+                predecessors[fill[successor_id]] = position_id
+                fill[successor_id] += 1
+
+        # retrograde analysis, in order of distance to the end of the game
+        while queue:
+            position_id = queue.popleft()
+            distance = distances[position_id] + 1
+            is_loss = results[position_id] == LOSS
+            for predecessor_id in predecessors[predecessor_offsets[position_id]:predecessor_offsets[position_id + 1]]:
+                if resolved[predecessor_id]:
+                    continue
+                if is_loss:  # moving here wins
+                    results[predecessor_id] = WIN
+                    distances[predecessor_id] = distance
+                    resolved[predecessor_id] = 1
+                    queue.append(predecessor_id)
+                else:
+                    remaining[predecessor_id] -= 1
+                    if remaining[predecessor_id] == 0:  # every move loses
+                        results[predecessor_id] = LOSS
+                        distances[predecessor_id] = distance
+                        resolved[predecessor_id] = 1
+                        queue.append(predecessor_id)
+
+        order = sorted(range(nb_positions), key=lambda position_id: bitboard_key(*positions[position_id]))
+        self.keys = [bitboard_key(*positions[position_id]) for position_id in order]
+        self.results = bytearray(results[position_id] for position_id in order)
+        self.distances = array('H', (distances[position_id] for position_id in order))
+        if show_progress:
+            print(f'wins: {self.results.count(WIN)}, losses: {self.results.count(LOSS)}, draws: {self.results.count(DRAW)} '
+                  f'({time.time() - start_time:.1f} seconds)')
+
+    def write(self, path):
+        """
+        Writes the tablebase: a header, then the sorted position keys (uint64), the results (uint8) and the distances (uint16).
+        """
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.max_pieces, len(self.keys)))
+            f.write(array('Q', self.keys).tobytes())
+            f.write(bytes(self.results))
+            f.write(self.distances.tobytes())
+
+
+class Tablebase:
+    """
+    The Tablebase class looks up exact results of positions with few pieces in a file written by TablebaseGenerator.
+    The file is memory-mapped and searched in place, so opening it is instant and only the pages used are read.
+    A Tablebase can be pickled (to send it to the worker processes of a Tournament): only the path is sent
+    and each process opens and maps the file again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_pieces, self.nb_positions = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a checkers tablebase')
+        keys_offset = HEADER.size
+        results_offset = keys_offset + 8 * self.nb_positions
+        distances_offset = results_offset + self.nb_positions
+        view = memoryview(self._mmap)
+        self._keys = view[keys_offset:results_offset].cast('Q')
+        self._results = view[results_offset:distances_offset]
+        self._distances = view[distances_offset:distances_offset + 2 * self.nb_positions].cast('H')
+        self.hits = 0
+
+    def __reduce__(self):
+        return Tablebase, (self.path,)
+
+    def close(self):
+        self._keys.release()
+        self._results.release()
+        self._distances.release()
+        self._mmap.close()
+        self._file.close()
+
+    def probe_key(self, key):
+        """Returns (result, distance) of a position key, or None if it is not in the tablebase"""
+        i = bisect_left(self._keys, key)
+        if i < self.nb_positions and self._keys[i] == key:
+            self.hits += 1
+            return self._results[i], self._distances[i]
+        return None
+
+    def probe_position(self, position, color):
+        """
+        Returns (result, distance) for a Move object's board with color to move, or None if it has too many pieces.
+        Uses the square index and piece counts that Move keeps up to date, so it can be called at every node of a search.
+        """
+        if sum(position.piece_counts) > self.max_pieces:
+            return None
+        pieces = sorted((square, Move.piece_type(piece_name)) for square, piece_name in position.square_index.items())
+        return self.probe_key(position_key(pieces, color))
+
+    def probe(self, board_state, color):
+        """Returns (result, distance) for a board state dictionary with color to move, or None if it has too many pieces"""
+        if len(board_state) > self.max_pieces:
+            return None
+        return self.probe_position(Move(board_state, color), color)
+
+
+if __name__ == '__main__':
+    # python Tablebase.py [max pieces] [output file]
+    max_pieces = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    path = sys.argv[2] if len(sys.argv) > 2 else f'endgames_{max_pieces}.cktb'
+    generator = TablebaseGenerator(max_pieces)
+    generator.generate()
+    generator.write(path)
+    print(f'Tablebase written to {path}')
@@ -0,0 +1,134 @@
+from Game import Game
+from multiprocessing import Pool
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import time
+
+
+def play_game(task):
+    """
+    Plays one game in a worker process and returns its result.
+    task is a (game number, seed, game spec) tuple, see Tournament.
+    The random seed is set before the game so that a game can be replayed exactly from its seed.
+    """
+    game_number, seed, game_spec = task
+    random.seed(seed)
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):  # the games print their winner
+        result = Game().run_with_ia(show_board=False, **game_spec)
+    duration = time.time() - start_time
+    winning_player, nb_turns = result if result is not None else (None, None)
+    return {'game': game_number, 'seed': seed, 'winner': winning_player, 'turns': nb_turns, 'duration': duration}
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """Returns the Wilson score confidence interval (95% by default) of a proportion"""
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    denominator = 1 + z ** 2 / trials
+    centre = (p + z ** 2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def distribution(values, z=1.96):
+    """Returns the mean (with a 95% confidence interval), standard deviation and percentiles of a list of numbers"""
+    if not values:
+        return {}
+    values = sorted(values)
+    mean = statistics.fmean(values)
+    stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+    margin = z * stdev / math.sqrt(len(values))
+
+    def percentile(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {'mean': mean,
+            'mean_ci': (mean - margin, mean + margin),
+            'stdev': stdev,
+            'min': values[0],
+            'p50': percentile(0.5),
+            'p90': percentile(0.9),
+            'p99': percentile(0.99),
+            'max': values[-1]}
+
+
+class Tournament:
+    """
+    The Tournament class plays many games of checkers in parallel on a pool of worker processes.
+
+    The games are described by a game spec, a plain dictionary of the arguments of Game.run_with_ia, for example:
+    {'black': 'intelligent', 'white': 'naive', 'board_depth': 3, 'search_algorithm': 'alphabeta'}
+    Game number i is played with the seed base_seed + i, so any game can be reproduced on its own.
+    Results are streamed back as soon as each game finishes and then summarized into win/loss/draw counts
+    (with confidence intervals) and distributions of the number of turns and of the game durations.
+    """
+
+    def __init__(self, num_workers=None, base_seed=0):
+        self.num_workers = num_workers or os.cpu_count()
+        self.base_seed = base_seed
+
+    def play_games(self, game_spec, num_games):
+        """
+        Yields the result of each game as soon as it finishes (not in game order).
+        Each result is a dictionary with the game number, seed, winner ('Black', 'White' or 'Draw'), number of turns and duration.
+        """
+        tasks = [(game_number, self.base_seed + game_number, game_spec) for game_number in range(num_games)]
+        with Pool(self.num_workers) as pool:
+            for result in pool.imap_unordered(play_game, tasks):
+                yield result
+
+    @staticmethod
+    def summarize(results):
+        """
+        Aggregates a list of game results into win/loss/draw counts, the black win rate with its 95% confidence interval,
+        and the distributions of the number of turns and of the durations.
+        """
+        num_games = len(results)
+        black_wins = sum(1 for result in results if result['winner'] == 'Black')
+        white_wins = sum(1 for result in results if result['winner'] == 'White')
+        draws = num_games - black_wins - white_wins
+        return {'games': num_games,
+                'black_wins': black_wins,
+                'white_wins': white_wins,
+                'draws': draws,
+                'black_win_rate': black_wins / num_games if num_games else 0.0,
+                'black_win_rate_ci': wilson_interval(black_wins, num_games),
+                'white_win_rate': white_wins / num_games if num_games else 0.0,
+                'white_win_rate_ci': wilson_interval(white_wins, num_games),
+                'turns': distribution([result['turns'] for result in results if result['turns'] is not None]),
+                'duration': distribution([result['duration'] for result in results])}
+
+    def run(self, game_spec, num_games=1000, show_progress=True, progress_every=100):
+        """
+        Plays num_games games in parallel and returns the summary of the results (see summarize).
+
+        show_progress: bool, if True, print the number of finished games every progress_every games and the summary at the end
+        """
+        start_time = time.time()
+        results = []
+        for result in self.play_games(game_spec, num_games):
+            results.append(result)
+            if show_progress and len(results) % progress_every == 0:
+                print(f"{len(results)}/{num_games} games played in {time.time() - start_time:.1f} seconds")
+        summary = self.summarize(results)
+        summary['wall_time'] = time.time() - start_time
+        if show_progress:
+            low, high = summary['black_win_rate_ci']
+            print(f"Black wins: {summary['black_wins']} ({summary['black_win_rate']:.1%}, 95% CI {low:.1%}-{high:.1%})")
+            print(f"White wins: {summary['white_wins']}")
+            print(f"Draws: {summary['draws']}")
+            if summary['turns']:
+                print(f"Average number of turns: {summary['turns']['mean']:.2f} (median {summary['turns']['p50']})")
+            print(f"Average game duration: {summary['duration']['mean']:.2f} seconds on {self.num_workers} workers, "
+                  f"{summary['wall_time']:.2f} seconds in total")
+        return summary
+
+
+if __name__ == '__main__':
+    Tournament().run({'black': 'intelligent', 'white': 'naive', 'board_depth': 3, 'search_algorithm': 'alphabeta'}, num_games=100)
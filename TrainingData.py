@@ -0,0 +1,161 @@
+from Game import Game
+from GameLoop import GameLoop, GameObserver, NaivePlayer, IntelligentPlayer
+from BatchEvaluator import BatchEvaluator
+from PositionHistory import DEFAULT_NO_PROGRESS_LIMIT
+import Squares
+import numpy as np
+import glob
+import os
+import random
+import sys
+
+
+# one row per position: the board encoded like BatchEvaluator.encode_board, the side to move, the result of the game
+# (1 white won, -1 black won, 0 draw or unfinished), the search score of the move played (NaN if it was not searched),
+# the ply of the position in its game and the number of the game
+RECORD_DTYPE = np.dtype([('board', np.int8, (Squares.NUM_SQUARES,)), ('white_to_move', np.bool_), ('result', np.int8),
+                         ('score', np.float32), ('ply', np.uint16), ('game', np.uint32)])
+RESULT_LABELS = {'White': 1, 'Black': -1, 'Draw': 0, None: 0}
+SHARD_NAME = 'shard-{:05d}.npy'
+
+
+class ShardWriter:
+    """
+    The ShardWriter class writes rows of RECORD_DTYPE to a directory of .npy shards of shard_size rows each.
+    Rows are copied into a preallocated buffer of one shard, which is written when it is full, so the memory used
+    doesn't grow with the number of positions. Each shard is written to a temporary file and renamed, so a reader
+    never sees half a shard. Writing to a directory that already has shards adds new ones after them.
+    """
+
+    def __init__(self, directory, shard_size=65536):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        self.shards_written = len(glob.glob(os.path.join(directory, SHARD_NAME.replace('{:05d}', '*'))))
+        self.rows_written = 0
+        self._buffer = np.zeros(shard_size, dtype=RECORD_DTYPE)
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, rows):
+        """Adds an array of RECORD_DTYPE rows"""
+        start = 0
+        while start < len(rows):
+            count = min(len(rows) - start, self.shard_size - self._count)
+            self._buffer[self._count:self._count + count] = rows[start:start + count]
+            self._count += count
+            start += count
+            if self._count == self.shard_size:
+                self.flush()
+        self.rows_written += len(rows)
+
+    def flush(self):
+        """Writes the rows added since the last shard as a (possibly shorter) shard"""
+        if self._count == 0:
+            return
+        path = os.path.join(self.directory, SHARD_NAME.format(self.shards_written))
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, self._buffer[:self._count])
+        os.replace(path + '.tmp', path)
+        self.shards_written += 1
+        self._count = 0
+
+    def close(self):
+        self.flush()
+
+
+class SelfPlayRecorder(GameObserver):
+    """
+    A GameObserver that labels every position where a move was played with the result of the game
+    and the search score of the move (GameLoop players' value) and adds them to a ShardWriter when the game ends.
+    Only the positions of the current game are kept until then.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.games_recorded = 0
+        self._rows = []
+
+    def on_game_start(self, loop, board_state, color):
+        self._rows = []
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        score = loop.players[color].value
+        self._rows.append((BatchEvaluator.encode_board(previous_board_state), color == 'white', 0,
+                           np.nan if score is None else float(score), turn - 1, self.games_recorded))
+
+    def on_game_end(self, loop, winner, turns):
+        rows = np.array(self._rows, dtype=RECORD_DTYPE)
+        rows['result'] = RESULT_LABELS[winner]
+        self.writer.add(rows)
+        self._rows = []
+        self.games_recorded += 1
+
+
+def generate_self_play(directory, num_games, depths=(1, 2, 3), search_algorithm='alphabeta', shard_size=65536,
+                       draw_ply_limit=DEFAULT_NO_PROGRESS_LIMIT, max_turns=None, seed=0):
+    """
+    Plays num_games games of a NaiveAgent against an IntelligentAgent and writes their positions as training shards
+    to directory (see ShardWriter and SelfPlayRecorder). The intelligent agent searches to each depth of depths in turn,
+    and plays black and white in turn. Returns the number of positions written.
+    """
+    rng = random.Random(seed)
+    with ShardWriter(directory, shard_size) as writer:
+        recorder = SelfPlayRecorder(writer)
+        for game_number in range(num_games):
+            naive = NaivePlayer(rng)
+            intelligent = IntelligentPlayer(depth=depths[game_number % len(depths)], search_algorithm=search_algorithm)
+            black, white = (intelligent, naive) if game_number % 2 == 0 else (naive, intelligent)
+            loop = GameLoop(black, white, observers=[recorder], draw_ply_limit=draw_ply_limit, max_turns=max_turns)
+            loop.play(Game().initialize_board())
+        return writer.rows_written
+
+
+class ShardLoader:
+    """
+    The ShardLoader class iterates over the shards of a directory in batches of batch_size rows of RECORD_DTYPE.
+    Shards are memory-mapped, so only the batches being read are loaded, and each batch is a copy that can be kept.
+    With shuffle=True the shards and the batches of each shard are read in a random order (the rows of a batch stay together).
+    """
+
+    def __init__(self, directory, batch_size=1024, shuffle=False, seed=0):
+        self.paths = sorted(glob.glob(os.path.join(directory, SHARD_NAME.replace('{:05d}', '*'))))
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        """The number of rows of all the shards, read from their headers"""
+        return sum(len(np.load(path, mmap_mode='r')) for path in self.paths)
+
+    def __iter__(self):
+        paths = list(self.paths)
+        if self.shuffle:
+            self.rng.shuffle(paths)
+        for path in paths:
+            shard = np.load(path, mmap_mode='r')
+            starts = np.arange(0, len(shard), self.batch_size)
+            if self.shuffle:
+                self.rng.shuffle(starts)
+            for start in starts:
+                yield np.array(shard[start:start + self.batch_size])
+            del shard
+
+    def arrays(self, fields=('board', 'white_to_move', 'result', 'score')):
+        """Yields each batch as a tuple of arrays, one per field"""
+        for batch in self:
+            yield tuple(batch[field] for field in fields)
+
+
+if __name__ == '__main__':
+    # python TrainingData.py <directory> [number of games] [depths, e.g. 1,2,3]
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'training_data'
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    depths = tuple(int(depth) for depth in sys.argv[3].split(',')) if len(sys.argv) > 3 else (1, 2, 3)
+    positions = generate_self_play(directory, num_games, depths)
+    print(f'{positions} positions of {num_games} games written to {directory} ({len(ShardLoader(directory).paths)} shards)')
@@ -0,0 +1,267 @@
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+import random
+import Squares
+from Move import Move
+
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+NO_MOVE = -1
+
+
+class Zobrist:
+    """
+    The Zobrist class computes 64-bit hashes of board states: one random number per (piece type, square),
+    XORed together for every piece on the board, plus one random number when white is the side to move.
+    Because XOR is its own inverse, the hash of a child board state can be updated from the hash of its parent
+    by only XORing the pieces that changed, instead of hashing the whole board again.
+    """
+
+    def __init__(self, seed=2024):
+        rng = random.Random(seed)
+        self.piece_keys = [[rng.getrandbits(64) for _ in range(Squares.NUM_SQUARES)] for _ in range(Squares.NUM_PIECE_TYPES)]
+        self.white_to_move_key = rng.getrandbits(64)
+
+    piece_type = staticmethod(Move.piece_type)
+
+    def piece_key(self, piece_name, location):
+        return self.piece_keys[self.piece_type(piece_name)][Squares.square_of(location.x, location.y)]
+
+    def hash_board(self, board_state, color):
+        """
+        Returns the hash of a board state with color as the side to move.
+        """
+        h = self.white_to_move_key if color == 'white' else 0
+        for piece_name, location in board_state.items():
+            h ^= self.piece_key(piece_name, location)
+        return h
+
+    def update_move(self, h, record, undo):
+        """
+        Returns the hash after a MoveRecord was made with Move.make_move, from the hash h before it and the undo information make_move returned.
+        """
+        piece_name, _, captured_pieces = undo
+        piece_type = self.piece_type(piece_name)
+        new_piece_type = piece_type + 1 if record.promotion else piece_type  # man -> king of the same color
+        h ^= self.white_to_move_key ^ self.piece_keys[piece_type][record.from_square] ^ self.piece_keys[new_piece_type][record.to_square]
+        for square, (captured_name, _) in zip(record.captured, captured_pieces):
+            h ^= self.piece_keys[self.piece_type(captured_name)][square]
+        return h
+
+
+ZOBRIST = Zobrist()
+
+
+class TranspositionTable:
+    """
+    The TranspositionTable class remembers the results of positions that were already searched,
+    so that positions reached again through a different move order don't have to be searched again.
+
+    Entries are stored in fixed-size typed arrays so the table never grows past its memory budget.
+    The table is made of buckets of two entries (two-tier replacement):
+    - the first entry keeps the deepest search of the bucket (depth-preferred), unless it is from an older search
+    - the second entry is always replaced
+    Each entry holds the full hash, the depth searched, the score, the bound type (EXACT, LOWER_BOUND or UPPER_BOUND)
+    and the best move as a move key (from square * 32 + to square).
+
+    The same table can be kept across moves of a game (see Game.run_with_ia), new_search() must be called before each search.
+    """
+
+    # bytes per entry: key (8) + score (8) + move (8) + depth (1) + flag (1) + age (2)
+    ENTRY_SIZE = 28
+
+    def __init__(self, size_mb=16):
+        nb_buckets = 1
+        while 2 * (nb_buckets * 2) * self.ENTRY_SIZE <= size_mb * 1024 * 1024:
+            nb_buckets *= 2
+        self.nb_buckets = nb_buckets
+        self.mask = nb_buckets - 1
+        self.age = 0
+        self.clear()
+
+    def clear(self):
+        """Empties the table and resets the statistics"""
+        nb_entries = 2 * self.nb_buckets
+        self.keys = array('Q', bytes(8 * nb_entries))
+        self.scores = array('d', bytes(8 * nb_entries))
+        self.moves = array('q', [NO_MOVE]) * nb_entries
+        self.depths = array('b', [-1]) * nb_entries
+        self.flags = array('b', bytes(nb_entries))
+        self.ages = array('H', bytes(2 * nb_entries))
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Starts a new search: entries from earlier searches become replaceable"""
+        self.age = (self.age + 1) % 65536
+
+    def probe(self, h):
+        """
+        Looks up a position hash. Returns (depth, score, flag, move) or None if the position is not in the table.
+        """
+        index = (h & self.mask) * 2
+        for slot in (index, index + 1):
+            if self.depths[slot] >= 0 and self.keys[slot] == h:
+                self.hits += 1
+                return self.depths[slot], self.scores[slot], self.flags[slot], self.moves[slot]
+        self.misses += 1
+        if self.depths[index] >= 0 or self.depths[index + 1] >= 0:
+            self.collisions += 1  # the bucket is used by other positions
+        return None
+
+    def _key(self, slot):
+        """Returns the full hash of the position stored in an entry"""
+        return self.keys[slot]
+
+    def _write(self, slot, h, depth, score, flag, move):
+        self.keys[slot] = h
+        self.depths[slot] = depth
+        self.scores[slot] = score
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.ages[slot] = self.age
+
+    def store(self, h, depth, score, flag, move=NO_MOVE):
+        """
+        Stores a search result. The depth-preferred entry is replaced if the new search is at least as deep,
+        if it holds the same position or if it is from an older search; otherwise the always-replace entry is used.
+        """
+        self.stores += 1
+        index = (h & self.mask) * 2
+        if (self.depths[index] < 0 or self._key(index) == h or depth >= self.depths[index]
+                or self.ages[index] != self.age):
+            if self.depths[index] >= 0 and self._key(index) != h:
+                # demote the previous deep entry to the always-replace slot
+                self._write(index + 1, self._key(index), self.depths[index], self.scores[index],
+                            self.flags[index], self.moves[index])
+                self.ages[index + 1] = self.ages[index]
+            self._write(index, h, depth, score, flag, move)
+        else:
+            self._write(index + 1, h, depth, score, flag, move)
+
+    def stats(self):
+        """Returns the hit, miss and collision counts and how full the table is"""
+        used = sum(1 for depth in self.depths if depth >= 0)
+        probes = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'collisions': self.collisions,
+                'stores': self.stores,
+                'hit_rate': self.hits / probes if probes else 0.0,
+                'entries': 2 * self.nb_buckets,
+                'used': used}
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    A TranspositionTable stored in a block of shared memory, so that several processes searching the same position
+    (see ParallelSearch) can read and write the same entries.
+    The entries are read and written without locks, so a process can read an entry while another one is writing it
+    and get the hash of one position with the score of another. To detect this, the stored key is the hash XORed
+    with a checksum of the depth, score, flag and move (the lockless hashing scheme): the key is written last,
+    and a reader recomputes the checksum from the fields it read, so an entry whose fields don't all belong
+    to the same write doesn't match the hash and is treated as a miss.
+
+    The process that creates the table owns the shared memory and must call close() and unlink() when done.
+    Other processes attach to it with SharedTranspositionTable.attach(name, nb_buckets).
+    """
+
+    # (field name, typecode, item size) in memory order, largest items first so that each field is aligned
+    FIELDS = (('keys', 'Q', 8), ('scores', 'd', 8), ('moves', 'q', 8), ('ages', 'H', 2), ('depths', 'b', 1), ('flags', 'b', 1))
+
+    def __init__(self, size_mb=16, name=None, nb_buckets=None):
+        if nb_buckets is None:
+            nb_buckets = 1
+            while 2 * (nb_buckets * 2) * self.ENTRY_SIZE <= size_mb * 1024 * 1024:
+                nb_buckets *= 2
+        self.nb_buckets = nb_buckets
+        self.mask = nb_buckets - 1
+        self.age = 0
+        nb_entries = 2 * nb_buckets
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=nb_entries * self.ENTRY_SIZE)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            # only the owner frees the memory, otherwise the workers' resource tracker would free it when they exit
+            resource_tracker.unregister(self.shared_memory._name, 'shared_memory')
+        offset = 0
+        for field, typecode, item_size in self.FIELDS:
+            setattr(self, field, self.shared_memory.buf[offset:offset + nb_entries * item_size].cast(typecode))
+            offset += nb_entries * item_size
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        if name is None:
+            self.clear()
+
+    @staticmethod
+    def _checksum(depth, score, flag, move):
+        """Returns a 64-bit checksum of the data of an entry, the same in every process"""
+        return hash((depth, score, flag, move)) & 0xFFFFFFFFFFFFFFFF
+
+    def _key(self, slot):
+        return self.keys[slot] ^ self._checksum(self.depths[slot], self.scores[slot], self.flags[slot], self.moves[slot])
+
+    def _write(self, slot, h, depth, score, flag, move):
+        self.depths[slot] = depth
+        self.scores[slot] = score
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.ages[slot] = self.age
+        self.keys[slot] = h ^ self._checksum(depth, score, flag, move)  # last, so that a complete entry is never mismatched
+
+    def probe(self, h):
+        """
+        Looks up a position hash like TranspositionTable.probe. The fields of an entry are read before its key is checked,
+        so an entry that another process was writing at the same time is not returned.
+        """
+        index = (h & self.mask) * 2
+        for slot in (index, index + 1):
+            depth, score, flag, move = self.depths[slot], self.scores[slot], self.flags[slot], self.moves[slot]
+            if depth >= 0 and self.keys[slot] ^ self._checksum(depth, score, flag, move) == h:
+                self.hits += 1
+                return depth, score, flag, move
+        self.misses += 1
+        if self.depths[index] >= 0 or self.depths[index + 1] >= 0:
+            self.collisions += 1
+        return None
+
+    @staticmethod
+    def attach(name, nb_buckets):
+        """Attaches to a table created by another process"""
+        return SharedTranspositionTable(name=name, nb_buckets=nb_buckets)
+
+    @property
+    def name(self):
+        return self.shared_memory.name
+
+    def clear(self):
+        """Empties the table and resets the statistics of this process"""
+        for field, _, _ in self.FIELDS:
+            view = getattr(self, field)
+            view.cast('B')[:] = bytes(view.nbytes)
+        self.moves.cast('B')[:] = array('q', [NO_MOVE] * len(self.moves)).tobytes()
+        self.depths.cast('B')[:] = array('b', [-1] * len(self.depths)).tobytes()
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        """The age is set by the process that owns the table, so that all processes agree on it"""
+
+    def close(self):
+        """Releases this process's view of the shared memory"""
+        for field, _, _ in self.FIELDS:
+            getattr(self, field).release()
+        self.shared_memory.close()
+
+    def unlink(self):
+        """Frees the shared memory, only to be called by the process that created the table"""
+        self.shared_memory.unlink()
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Location import Location  # noqa: E402
+
+
+def load_board(pieces):
+    """Builds a board state dictionary from a list of [piece name, x, y], keeping the order of the pieces"""
+    return {piece_name: Location(x, y) for piece_name, x, y in pieces}
+
+
+@pytest.fixture(scope='session')
+def legal_move_cases():
+    """
+    Positions from random games with the legal moves the original move generator returned for them, in order.
+    Each move is a board encoded by encode_board.
+    """
+    with open(os.path.join(ROOT, 'tests', 'data', 'legal_moves.json')) as f:
+        cases = json.load(f)
+    return [(load_board(case['board']), case['color'], case['moves']) for case in cases]
+
+
+def encode_board(board_state):
+    """
+    Encodes a board state as one character per square ('.' empty, 'b'/'w' men, 'B'/'W' kings).
+    Men on the row where they are promoted are encoded as kings, so that boards compare equal
+    whether the promotion was done by the move or between turns.
+    """
+    row = ['.'] * 32
+    for piece_name, location in board_state.items():
+        if piece_name.startswith('king_'):
+            symbol = 'B' if 'black' in piece_name else 'W'
+        elif piece_name.startswith('black'):
+            symbol = 'B' if location.x == 7 else 'b'
+        else:
+            symbol = 'W' if location.x == 0 else 'w'
+        row[location.x * 4 + location.y // 2] = symbol
+    return ''.join(row)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from BatchEvaluator import BatchEvaluator
+from IntelligentAgent import IntelligentAgent
+from Move import Move
+
+WEIGHTS = [{}, {'psq_weight': 0.5}, {'mobility_weight': 1}, {'psq_weight': 0.25, 'mobility_weight': 0.5}]
+
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+def test_evaluate_matches_evaluate_position(legal_move_cases, weights):
+    board_states = [board_state for board_state, _, _ in legal_move_cases]
+    batch_evaluator = BatchEvaluator(**weights)
+    expected = [IntelligentAgent(color, board_state, **weights).evaluate_position(Move(board_state, color))
+                for board_state, color, _ in legal_move_cases]
+    assert batch_evaluator.evaluate(BatchEvaluator.encode_boards(board_states)) == pytest.approx(expected)
+    assert batch_evaluator.evaluate_boards(board_states) == pytest.approx(expected)
+
+
+def test_encode_children_matches_the_boards_after_each_move(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        position = Move(board_state, color)
+        moves = position.generate_moves()
+        if moves:
+            children = [Move(board_state, color).board_after(move) for move in moves]
+            assert np.array_equal(BatchEvaluator.encode_children(position, moves), BatchEvaluator.encode_boards(children))
+
+
+def test_lost_positions():
+    batch_evaluator = BatchEvaluator(psq_weight=0.5, mobility_weight=1)
+    encoded = np.zeros((2, 32), dtype=np.int8)
+    encoded[0, 3] = -1  # only a black man
+    encoded[1, 30] = 2  # only a white king
+    assert list(batch_evaluator.evaluate(encoded)) == [-1000, 1000]
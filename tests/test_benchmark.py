@@ -0,0 +1,37 @@
+import pytest
+
+from Benchmark import Benchmark, INITIAL_PERFT, STANDARD_POSITIONS, board_from_string, perft, perft_make_unmake
+from Game import Game
+from Move import Move
+
+
+@pytest.mark.parametrize('depth', range(6))
+def test_initial_perft(depth):
+    assert perft(Game().initialize_board(), 'black', depth) == INITIAL_PERFT[depth]
+
+
+@pytest.mark.parametrize('name', STANDARD_POSITIONS)
+def test_make_unmake_perft_matches_legal_moves(name):
+    squares, color = STANDARD_POSITIONS[name]
+    board_state = board_from_string(squares)
+    assert perft_make_unmake(Move(dict(board_state), color), color, 3) == perft(board_state, color, 3)
+
+
+def test_board_from_string():
+    assert board_from_string(STANDARD_POSITIONS['initial'][0]) == Game().initialize_board()
+
+
+def test_compare_flags_regressions():
+    baseline = {'perft': {'initial': {'leaves': 1469, 'seconds': 1.0}}, 'search': {'initial_alphabeta_4': {'nodes': 100, 'seconds': 1.0}}}
+    results = {'perft': {'initial': {'leaves': 1470, 'seconds': 1.1}}, 'search': {'initial_alphabeta_4': {'nodes': 90, 'seconds': 1.5}}}
+    regressions, changes = Benchmark.compare(results, baseline, tolerance=0.15)
+    assert len(regressions) == 2  # the perft count and the slower search
+    assert len(changes) == 1
+
+
+def test_compare_reports_new_benchmarks():
+    baseline = {'search': {'initial_alphabeta_6': {'nodes': 100, 'seconds': 1.0}}}
+    results = {'search': {'initial_alphabeta_6': {'nodes': 100, 'seconds': 1.0}, 'initial_pvs_6': {'nodes': 90, 'seconds': 1.0}}}
+    regressions, changes = Benchmark.compare(results, baseline)
+    assert not regressions and changes == ['search initial_pvs_6: not in the baseline']
+    assert Benchmark.pvs_savings(results) == {'initial_pvs_6': pytest.approx(0.1)}
@@ -0,0 +1,42 @@
+from conftest import encode_board
+from Bitboard import Bitboard
+from Location import Location
+from Move import Move
+import Squares
+
+
+def bitboard_boards(board_state, color):
+    """The encoded boards reached by every legal move of the Bitboard, promoted like Move records"""
+    bitboard = Bitboard.from_dict(board_state)
+    return {encode_board(child.promote().to_dict()) for child in bitboard.get_legal_boards(color)}
+
+
+def test_legal_boards_match_move(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        assert bitboard_boards(board_state, color) == {encode_board(board) for board in Move(board_state, color).get_legal_moves()}
+
+
+def test_legal_boards_match_move_after_each_move(legal_move_cases):
+    for board_state, color, _ in legal_move_cases[::10]:
+        opponent = 'white' if color == 'black' else 'black'
+        for board in Move(board_state, color).get_legal_moves():
+            assert bitboard_boards(board, opponent) == {encode_board(child) for child in Move(board, opponent).get_legal_moves()}
+
+
+def test_king_capture_loop_keeps_the_king():
+    # the white king captures the four men around it and lands back on its own square
+    board_state = {'king_white_piece_1': Location(4, 3), 'black_piece_1': Location(3, 2), 'black_piece_2': Location(1, 2),
+                   'black_piece_3': Location(1, 4), 'black_piece_4': Location(3, 4), 'black_piece_5': Location(0, 7)}
+    bitboard = Bitboard.from_dict(board_state)
+    square = Squares.square_of(4, 3)
+    loops = [move for move in bitboard.legal_moves('white') if move[0] == move[1] == square]
+    assert loops
+    child = bitboard.apply(loops[0], 'white')
+    assert child.white == child.kings == Squares.SQUARE_MASKS[square]
+    assert child.black == Squares.SQUARE_MASKS[Squares.square_of(0, 7)]
+    assert bitboard_boards(board_state, 'white') == {encode_board(board) for board in Move(board_state, 'white').get_legal_moves()}
+
+
+def test_dict_round_trip(legal_move_cases):
+    for board_state, _, _ in legal_move_cases:
+        assert encode_board(Bitboard.from_dict(board_state).to_dict()) == encode_board(board_state)
@@ -0,0 +1,62 @@
+from EvaluationCache import EvaluationCache, LRUCache, shared_cache
+from FeatureEvaluator import FeatureEvaluator
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from test_feature_evaluator import random_boards
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('c') == 3
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (2, 1, 1, 2)
+    cache.clear()
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (0, 0, 0, 0)
+
+
+def test_cached_search_gives_the_same_values():
+    evaluator = FeatureEvaluator({'mobility': 0.1, 'tempo': 0.02})
+    cache = EvaluationCache()
+    for board_state in random_boards(2)[::7]:
+        plain = IntelligentAgent('white', board_state, evaluator=evaluator).search(board_state, 3, True, search_algorithm='alphabeta')
+        cached = IntelligentAgent('white', board_state, evaluator=evaluator, cache=cache).search(board_state, 3, True, search_algorithm='alphabeta')
+        assert plain[0] == cached[0]
+    assert cache.scores.hits > 0  # transpositions inside the searches
+
+
+def test_repeated_search_is_answered_from_the_cache():
+    board_state = Game().initialize_board()
+    cache = EvaluationCache()
+    evaluator = FeatureEvaluator({'mobility': 0.1})
+    first = IntelligentAgent('black', board_state, evaluator=evaluator, cache=cache).search(board_state, 4, False, return_stats=True)
+    second = IntelligentAgent('black', board_state, evaluator=evaluator, cache=cache).search(board_state, 4, False, return_stats=True)
+    assert first[0] == second[0]
+    assert first[2].leaf_evaluations > 0 and second[2].leaf_evaluations == 0 and second[2].move_generations == 0
+
+
+def test_material_scores_are_not_cached():
+    board_state = Game().initialize_board()
+    cache = EvaluationCache()
+    IntelligentAgent('black', board_state, cache=cache).search(board_state, 3, False)
+    assert len(cache.scores) == 0 and len(cache.moves) > 0
+
+
+def test_shared_caches_per_evaluation():
+    board_state = Game().initialize_board()
+    plain = IntelligentAgent('black', board_state, cache=True)
+    assert IntelligentAgent('white', board_state, cache=True).cache is plain.cache is shared_cache(plain.evaluation_key())
+    assert IntelligentAgent('black', board_state, cache=True, evaluator=FeatureEvaluator({'tempo': 0.1})).cache is not plain.cache
+
+
+def test_multiple_games_share_the_cache():
+    board_state = Game().initialize_board()
+    cache = shared_cache(IntelligentAgent('black', board_state).evaluation_key())
+    cache.clear()
+    Game().run_ia_multiple_games(board_depth=2, num_games=2, search_algorithm='alphabeta', draw_ply_limit=20)
+    assert len(cache.moves) == 0
+    Game().run_ia_multiple_games(board_depth=2, num_games=2, search_algorithm='alphabeta', draw_ply_limit=20, cache=True)
+    assert cache.moves.hits > 0
+    cache.clear()
@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from BatchEvaluator import BatchEvaluator
+from Bitboard import Bitboard
+from FeatureEvaluator import FEATURES, FeatureEvaluator, WeightFitter
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from Move import Move
+from TrainingData import ShardLoader, generate_self_play
+
+
+def random_boards(num_games=6, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(num_games):
+        board_state, color = Game().initialize_board(), 'black'
+        for _ in range(60):
+            moves = Move(board_state, color).get_legal_moves()
+            if not moves:
+                break
+            board_state = rng.choice(moves)
+            color = 'white' if color == 'black' else 'black'
+            boards.append(board_state)
+    return boards
+
+
+def test_default_weights_match_material_heuristic():
+    evaluator = FeatureEvaluator()
+    for board_state in random_boards():
+        bitboard = Bitboard.from_dict(board_state)
+        if bitboard.black and bitboard.white:  # Bitboard.evaluate doesn't score won games
+            assert evaluator.evaluate_board(board_state) == bitboard.evaluate()
+
+
+def test_vectorized_features_match_single_board():
+    boards = random_boards()
+    evaluator = FeatureEvaluator(dict(zip(FEATURES, (1, 2.5, 0.3, 0.2, 0.1, 0.7, 0.05))))
+    encoded = BatchEvaluator.encode_boards(boards)
+    features = FeatureEvaluator.features(encoded)
+    for row, board_state, batch_score in zip(features, boards, evaluator.evaluate(encoded)):
+        assert row.tolist() == FeatureEvaluator.feature_row(BatchEvaluator.encode_board(board_state))
+        assert batch_score == pytest.approx(evaluator.evaluate_board(board_state))
+    assert features[:, FEATURES.index('mobility')].tolist() == BatchEvaluator.mobility(encoded).tolist()
+
+
+def test_default_evaluator_searches_like_the_agent():
+    board_state = random_boards(1)[10]
+    for algorithm in ('minimax', 'alphabeta'):
+        plain = IntelligentAgent('white', board_state).search(board_state, 3, True, search_algorithm=algorithm)
+        pluggable = IntelligentAgent('white', board_state, evaluator=FeatureEvaluator()).search(board_state, 3, True, search_algorithm=algorithm)
+        assert plain == pluggable
+
+
+def test_least_squares_recovers_weights():
+    encoded = BatchEvaluator.encode_boards(random_boards())
+    true_weights = np.array([1, 2.5, 0.3, 0.2, 0.1, 0.7, 0.05])
+    results = FeatureEvaluator.features(encoded) @ true_weights
+    fitted = WeightFitter('least_squares', l2=1e-9).fit((encoded, results))
+    assert [fitted.weights[feature] for feature in FEATURES] == pytest.approx(true_weights.tolist(), rel=1e-4)
+
+
+def test_logistic_fit_on_self_play(tmp_path):
+    generate_self_play(str(tmp_path), num_games=6, depths=(2,), shard_size=100)
+    fitted = WeightFitter(iterations=5).fit(ShardLoader(str(tmp_path), batch_size=64))
+    assert fitted.weights['material'] == 1.0
+    assert all(np.isfinite(list(fitted.weights.values())))
@@ -0,0 +1,73 @@
+import random
+
+from Game import Game
+from GameLoop import GameLoop, GameObserver, IntelligentPlayer, NaivePlayer
+from IntelligentAgent import IntelligentAgent
+from Location import Location
+from Move import Move
+
+
+class MoveCounter(GameObserver):
+    def __init__(self):
+        self.moves = []
+        self.result = None
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        self.moves.append((turn, color, stats))
+
+    def on_game_end(self, loop, winner, turns):
+        self.result = (winner, turns)
+
+
+def test_headless_game_prints_nothing(capsys):
+    random.seed(0)
+    winner, turns = Game().run_with_ia(black='naive', white='naive', show_board=False)
+    assert winner in ('Black', 'White', 'Draw') and turns > 0
+    assert capsys.readouterr().out == ''
+
+
+def test_legal_moves_generated_once_per_turn(monkeypatch):
+    calls = []
+    get_legal_moves = Move.get_legal_moves
+
+    def counting_get_legal_moves(self):
+        calls.append(1)
+        return get_legal_moves(self)
+
+    monkeypatch.setattr(Move, 'get_legal_moves', counting_get_legal_moves)
+    _, turns = GameLoop(NaivePlayer(random.Random(1)), NaivePlayer(random.Random(2))).play(Game().initialize_board())
+    assert len(calls) == turns + 1  # one per turn, plus the one that finds the game over
+
+
+def test_game_from_a_position():
+    # white to move can capture the last black piece
+    board_state = {'black_piece_1': Location(3, 2), 'king_white_piece_1': Location(4, 3)}
+    observer = MoveCounter()
+    player = IntelligentPlayer(depth=2, search_algorithm='alphabeta')
+    result = GameLoop(NaivePlayer(), player, [observer]).play(board_state, 'white')
+    assert result == ('White', 1) == observer.result
+    assert observer.moves[0][:2] == (1, 'white')
+
+
+def test_observers_receive_search_stats():
+    observer = MoveCounter()
+    game = Game()
+    winner, turns = game.play(IntelligentPlayer(depth=2, search_algorithm='alphabeta'), NaivePlayer(random.Random(3)), observers=[observer], max_turns=10)
+    assert turns == len(observer.moves) == 10 and winner is None
+    assert all((stats is not None) == (color == 'black') for _, color, stats in observer.moves)
+    assert len(game.history) == 11
+
+
+def test_winner_uses_the_rule_of_the_game_loop(capsys):
+    # the white man is blocked by the two black men in front of it, black can still move
+    board_state = {'white_piece_1': Location(1, 2), 'black_piece_1': Location(0, 1), 'black_piece_2': Location(0, 3)}
+    game = Game()
+    game.board_state = board_state
+    assert game.winner('black') is None
+    assert game.winner('white') == 'Black'
+    assert GameLoop(NaivePlayer(), NaivePlayer()).play(board_state, 'white') == ('Black', 0)
+    assert Game().play(NaivePlayer(), NaivePlayer(), board_state, 'white')[0] == 'Black'
+    agent = IntelligentAgent('black', board_state)
+    assert agent.ia_winner_check() is None
+    assert agent.ia_winner_check(board_state, 'white') == 'Black'
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,72 @@
+import random
+
+from Bitboard import Bitboard
+from Game import Game
+from GameLoop import GameLoop, GameObserver, IntelligentPlayer, NaivePlayer
+from GameRecord import GameRecordReader, GameRecordWriter, MAGIC
+from Location import Location
+
+
+class BoardCollector(GameObserver):
+    def __init__(self):
+        self.games = []
+
+    def on_game_start(self, loop, board_state, color):
+        self.games.append([Bitboard.from_dict(board_state)])
+
+    def on_move(self, loop, turn, color, previous_board_state, board_state, stats):
+        self.games[-1].append(Bitboard.from_dict(board_state))
+
+
+def test_games_replay_exactly(tmp_path):
+    path = str(tmp_path / 'games.ckgr')
+    collector = BoardCollector()
+    results = []
+    with GameRecordWriter(path) as writer:
+        loop = GameLoop(IntelligentPlayer(depth=2, search_algorithm='alphabeta'), NaivePlayer(random.Random(0)), [collector, writer])
+        for _ in range(3):
+            results.append(loop.play(Game().initialize_board()))
+    records = list(GameRecordReader(path))
+    assert [(record.winner, record.turns) for record in records] == results
+    for record, boards in zip(records, collector.games):
+        assert [bitboard for bitboard, _ in record.replay()] == boards
+        assert all(stats[0] > 0 for stats in record.stats[::2] if stats[3])  # black searched its moves
+
+
+def test_append_and_cut_file(tmp_path):
+    path = str(tmp_path / 'games.ckgr')
+    board_state = {'king_black_piece_1': Location(0, 1), 'king_white_piece_1': Location(7, 6)}
+    for seed in range(2):
+        with GameRecordWriter(path) as writer:
+            GameLoop(NaivePlayer(random.Random(seed)), NaivePlayer(random.Random(seed)), [writer], max_turns=6).play(board_state)
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(MAGIC) and data.count(MAGIC) == 1
+    records = list(GameRecordReader(path))
+    assert len(records) == 2 and records[1].turns == 6 and records[1].winner is None
+    with open(path, 'wb') as f:
+        f.write(data[:-10])  # a game cut short is read without a result
+    records = list(GameRecordReader(path))
+    assert len(records) == 2 and records[1].winner is None and records[1].turns < 6
+
+
+def test_pdn(tmp_path):
+    path = str(tmp_path / 'games.ckgr')
+    board_state = {'black_piece_1': Location(2, 1), 'white_piece_1': Location(3, 2)}
+    with GameRecordWriter(path) as writer:
+        assert Game().play(NaivePlayer(), NaivePlayer(), board_state, observers=[writer]) == ('Black', 1)
+    record = next(iter(GameRecordReader(path)))
+    assert record.to_pdn() == '[Event "Checkers game"]\n[Result "1-0"]\n[FEN "B:W14:B9"]\n\n1. 9x18 1-0\n'
+
+
+def test_king_capture_loop_replays(tmp_path):
+    # the white king captures the four men around it and ends back on its own square, see find_move
+    path = str(tmp_path / 'games.ckgr')
+    board_state = {'king_white_piece_1': Location(4, 3), 'black_piece_1': Location(3, 2), 'black_piece_2': Location(1, 2),
+                   'black_piece_3': Location(1, 4), 'black_piece_4': Location(3, 4), 'black_piece_5': Location(0, 7)}
+    collector = BoardCollector()
+    with GameRecordWriter(path) as writer:
+        GameLoop(NaivePlayer(random.Random(0)), NaivePlayer(random.Random(0)), [collector, writer], max_turns=4).play(board_state, 'white')
+    record = next(iter(GameRecordReader(path)))
+    assert record.moves[0][0] == record.moves[0][1] and bin(record.moves[0][2]).count('1') == 4
+    assert [bitboard for bitboard, _ in record.replay()] == collector.games[0]
@@ -0,0 +1,51 @@
+import asyncio
+
+from MatchServer import MatchClient, MatchServer, load_test
+
+
+def run_with_server(scenario, **server_options):
+    async def main():
+        async with MatchServer(num_workers=1, **server_options) as server:
+            _, port = await server.start()
+            return await scenario(server, port)
+    return asyncio.run(main())
+
+
+def test_protocol():
+    async def scenario(server, port):
+        client = await MatchClient.connect(port=port)
+        state = await client.request('new_game')
+        assert state['ok'] and state['to_move'] == 'black' and len(state['legal_moves']) == 7
+        bad = await client.request('move', game=state['game'], move='1-2')
+        assert not bad['ok'] and 'Illegal' in bad['error']
+        state = await client.request('move', game=state['game'], move='11-15')
+        assert state['ok'] and state['to_move'] == 'white' and state['turns'] == 1
+        reply = await client.request('agent_move', game=state['game'], depth=3, time_budget_ms=2000)
+        assert reply['ok'] and reply['to_move'] == 'black' and reply['move'] in state['legal_moves'] and reply['depth'] == 3
+        unknown = await client.request('state', game=12345)
+        assert not unknown['ok']
+        await client.close()
+    run_with_server(scenario)
+
+
+def test_cancel_search():
+    async def scenario(server, port):
+        client = await MatchClient.connect(port=port)
+        state = await client.request('new_game', board='bbbbbbbbbbbb........wwwwwwwwwwww', to_move='black')
+        request_id, reply = client.send('agent_move', game=state['game'], depth=20, time_budget_ms=5000)
+        await asyncio.sleep(0.1)
+        cancel = await client.request('cancel', request=request_id)
+        assert cancel['cancelled']
+        assert (await reply)['error'] == 'cancelled'
+        state = await client.request('state', game=state['game'])
+        assert state['turns'] == 0 and state['to_move'] == 'black'
+        await client.close()
+    run_with_server(scenario)
+
+
+def test_load_test_plays_games():
+    async def scenario(server, port):
+        return await load_test(port=port, sessions=20, connections=3, depth=2, time_budget_ms=20, max_moves=6)
+    summary = run_with_server(scenario)
+    assert summary['requests'] >= 20 * 2
+    assert summary['latency']['new_game']['p99'] > 0 and summary['latency']['move']
@@ -0,0 +1,79 @@
+from conftest import encode_board
+from Location import Location
+from Move import Move
+
+
+def test_legal_moves_match_original_generator(legal_move_cases):
+    # the original generator could return the same board twice, now each board is returned once
+    for board_state, color, expected in legal_move_cases:
+        assert [encode_board(board) for board in Move(board_state, color).get_legal_moves()] == list(dict.fromkeys(expected))
+
+
+def test_man_reaching_the_last_row_is_promoted():
+    board_state = {'black_piece_1': Location(6, 1), 'white_piece_1': Location(2, 1)}
+    boards = Move(board_state, 'black').get_legal_moves()
+    assert {'king_black_piece_1': Location(7, 0), 'white_piece_1': Location(2, 1)} in boards
+    assert {'king_black_piece_1': Location(7, 2), 'white_piece_1': Location(2, 1)} in boards
+
+
+def test_capture_sequence_ends_on_promotion():
+    # the white man captures onto the last row and becomes a king, it can't go on capturing backwards as a king
+    board_state = {'white_piece_1': Location(2, 1), 'black_piece_1': Location(1, 2), 'black_piece_2': Location(1, 4)}
+    records = Move(board_state, 'white').generate_moves()
+    assert len(records) == 1 and records[0].promotion and len(records[0].captured) == 1
+    assert Move(board_state, 'white').get_legal_moves() == [{'black_piece_2': Location(1, 4), 'king_white_piece_1': Location(0, 3)}]
+
+
+def test_capture_loop_is_returned_once():
+    # the king can capture the four pieces around it clockwise or counterclockwise and ends where it started both ways
+    board_state = {'king_black_piece_1': Location(2, 1), 'white_piece_1': Location(3, 2), 'white_piece_2': Location(3, 4),
+                   'white_piece_3': Location(1, 4), 'white_piece_4': Location(1, 2)}
+    boards = Move(board_state, 'black').get_legal_moves()
+    assert boards == [{'king_black_piece_1': Location(2, 1)}]
+
+
+def test_legal_moves_leave_board_unchanged(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        before = dict(board_state)
+        Move(board_state, color).get_legal_moves()
+        assert board_state == before and list(board_state) == list(before)
+
+
+def test_make_unmake_restores_board(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        position = Move(dict(board_state), color)
+        index, counts, psq_score = dict(position.square_index), list(position.piece_counts), position.psq_score
+        for record in position.generate_moves():
+            undo = position.make_move(record)
+            position.unmake_move(record, undo)
+            assert position.dict_piece_locations == board_state
+            assert position.square_index == index
+            assert position.piece_counts == counts
+            assert position.psq_score == psq_score
+
+
+def test_board_after_matches_make_move(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        position = Move(dict(board_state), color)
+        for record in position.generate_moves():
+            expected = encode_board(Move(board_state, color).board_after(record))
+            undo = position.make_move(record)
+            assert encode_board(position.dict_piece_locations) == expected
+            position.unmake_move(record, undo)
+
+
+def test_legacy_helpers_agree_with_move_generation(legal_move_cases):
+    for board_state, color, expected in legal_move_cases:
+        position = Move(board_state, color)
+        if not position.generate_captures():
+            assert sum(len(squares) for squares in position.list_available_jumps().values()) == len(expected)
+        occupied = {(location.x, location.y) for location in board_state.values()}
+        for x in range(-1, 9):
+            for y in range(-1, 9):
+                assert position.is_unoccupied(x, y) == (0 <= x <= 7 and 0 <= y <= 7 and (x, y) not in occupied)
+        for piece_name in board_state:
+            if color in piece_name:
+                for captured_name, landing in position._find_valid_captures_per_piece(piece_name, board_state):
+                    location = board_state[captured_name]
+                    assert position.is_opponent_piece(location.x, location.y, color)
+                    assert position.is_unoccupied(*landing)
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from Game import Game
+from Location import Location
+from Move import Move
+from OpeningBook import OpeningBook, OpeningBookBuilder
+from TranspositionTable import ZOBRIST
+
+
+@pytest.fixture(scope='module')
+def book_builder():
+    builder = OpeningBookBuilder(max_plies=2, search_depth=3, margin=1)
+    builder.build(show_progress=False)
+    return builder
+
+
+def test_book_round_trip(tmp_path, book_builder):
+    path = str(tmp_path / 'book.ckob')
+    book_builder.write(path)
+    book = OpeningBook(path)
+    assert book.nb_entries == sum(len(moves) for moves in book_builder.entries.values())
+    board_state = Game().initialize_board()
+    moves = book.book_moves(board_state, 'black')
+    assert {record.key: weight for record, weight in moves} == book_builder.entries[ZOBRIST.hash_board(board_state, 'black')]
+    assert max(weight for _, weight in moves) == 100  # the best moves
+
+    legal_moves = Move(board_state, 'black').get_legal_moves()
+    book_boards = [Move(board_state, 'black').board_after(record) for record, _ in moves]
+    rng = random.Random(0)
+    for _ in range(10):
+        new_board_state = book.choose(board_state, 'black', rng)
+        assert new_board_state in legal_moves and new_board_state in book_boards
+        assert book.choose(new_board_state, 'white', rng) in Move(new_board_state, 'white').get_legal_moves()  # the second ply is in the book too
+
+
+def test_positions_missing_from_the_book(tmp_path, book_builder):
+    path = str(tmp_path / 'book.ckob')
+    book_builder.write(path)
+    book = OpeningBook(path)
+    board_state = Game().initialize_board()
+    assert book.choose(board_state, 'white') is None  # the initial board with the wrong side to move
+    assert book.book_moves({'black_piece_1': Location(0, 1), 'white_piece_1': Location(7, 6)}, 'black') == []
+    assert (book.hits, book.misses) == (0, 2)
+
+
+def test_bad_file(tmp_path):
+    path = tmp_path / 'book.ckob'
+    path.write_bytes(b'CKGR' + bytes(16))
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
@@ -0,0 +1,49 @@
+import pytest
+
+from IntelligentAgent import IntelligentAgent
+from ParallelSearch import ParallelSearch
+from TranspositionTable import SharedTranspositionTable, EXACT, LOWER_BOUND
+
+
+@pytest.fixture(scope='module')
+def parallel_positions(legal_move_cases):
+    return [(board_state, color) for board_state, color, moves in legal_move_cases if len(moves) >= 4][:4]
+
+
+def serial_value(board_state, color, depth):
+    return IntelligentAgent(color, board_state).search(board_state, depth, color == 'white', search_algorithm='alphabeta')[0]
+
+
+@pytest.mark.parametrize('deterministic', [True, False])
+def test_root_split_matches_serial_search(parallel_positions, deterministic):
+    with ParallelSearch(num_workers=2, mode='root', deterministic=deterministic) as parallel_search:
+        for board_state, color in parallel_positions:
+            result = parallel_search.search(board_state, 4, color == 'white')
+            assert result['value'] == serial_value(board_state, color, 4)
+            assert result['nodes'] > 0 and set(result['nodes_per_worker']) <= {0, 1}
+
+
+def test_lazy_smp_matches_serial_search(parallel_positions):
+    with ParallelSearch(num_workers=2, mode='lazy_smp') as parallel_search:
+        for board_state, color in parallel_positions:
+            result = parallel_search.search(board_state, 4, color == 'white')
+            # the result of a helper searching one ply deeper is used if it finished first
+            assert result['depth'] in (4, 5)
+            assert result['value'] == serial_value(board_state, color, result['depth'])
+
+
+def test_shared_table_rejects_torn_entries():
+    table = SharedTranspositionTable(1)
+    try:
+        h = 0x123456789ABCDEF
+        table.store(h, 3, 1.5, EXACT, 42)
+        assert table.probe(h) == (3, 1.5, EXACT, 42)
+        # another process was writing the entry: the score belongs to a different write than the key
+        table.scores[(h & table.mask) * 2] = 2.5
+        assert table.probe(h) is None
+        table.flags[(h & table.mask) * 2] = LOWER_BOUND
+        table.scores[(h & table.mask) * 2] = 1.5
+        assert table.probe(h) is None
+    finally:
+        table.close()
+        table.unlink()
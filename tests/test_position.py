@@ -0,0 +1,71 @@
+import pickle
+import random
+
+import pytest
+
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from Location import Location
+from Move import Move
+from NaiveAgent import NaiveAgent
+from Position import Position
+from PositionHistory import PositionHistory
+from conftest import encode_board
+
+
+def test_dict_round_trip(legal_move_cases):
+    for board_state, _, _ in legal_move_cases:
+        position = Position.from_dict(board_state)
+        assert str(position) == encode_board(board_state)
+        assert Position.from_dict(position.to_dict()) == position
+        assert dict(position.items()) == position.to_dict() and len(position) == len(board_state)
+
+
+def test_hash_and_equality():
+    renamed = {'black_piece_7': Location(2, 1), 'king_white_piece_3': Location(5, 2)}
+    board_state = {'king_white_piece_1': Location(5, 2), 'black_piece_1': Location(2, 1)}
+    assert Position.from_dict(renamed) == Position.from_dict(board_state)
+    assert len({Position.from_dict(renamed), Position.from_dict(board_state)}) == 1
+    assert Position.from_dict(board_state) != board_state
+    assert hash(Location(2, 1)) == hash(Location(2, 1)) and Location(2, 1) != (2, 1)
+
+
+def test_immutable_and_picklable():
+    position = Position.from_dict(Game().initialize_board())
+    with pytest.raises(AttributeError):
+        position.squares = b''
+    with pytest.raises(AttributeError):
+        Location(0, 1).x = 2
+    assert pickle.loads(pickle.dumps(position)) == position
+    assert pickle.loads(pickle.dumps(Location(0, 1))) == Location(0, 1)
+
+
+def test_legal_moves_of_a_position(legal_move_cases):
+    for board_state, color, _ in legal_move_cases:
+        position = Position.from_dict(board_state)
+        legal_moves = Move(position, color).get_legal_moves()
+        assert all(isinstance(new_position, Position) for new_position in legal_moves)
+        # the moves are generated in the order of the pieces of the board, which is square order for a Position
+        assert sorted(legal_moves, key=str) == sorted((Position.from_dict(new_board_state) for new_board_state in Move(board_state, color).get_legal_moves()), key=str)
+
+
+def test_agents_and_game_accept_positions(legal_move_cases):
+    board_state, color, _ = legal_move_cases[10]
+    position = Position.from_dict(board_state)
+    value, new_position = IntelligentAgent(color, position).search(position, 3, color == 'white', search_algorithm='alphabeta')
+    dict_value, new_board_state = IntelligentAgent(color, board_state).search(board_state, 3, color == 'white', search_algorithm='alphabeta')
+    assert value == dict_value and new_position in Move(position, color).get_legal_moves()
+    random.seed(0)
+    assert isinstance(NaiveAgent(color, position).make_next_random_move(show_board=False), Position)
+    game = Game()
+    winner, turns = game.run_with_ia(show_board=False, board_depth=2, search_algorithm='alphabeta', board_state=position, first_player=color)
+    assert winner is not None and isinstance(game.board_state, Position)
+
+
+def test_progress_of_positions():
+    board_state = Position.from_dict({'black_piece_1': Location(2, 1), 'king_black_piece_1': Location(0, 1), 'king_white_piece_1': Location(5, 2)})
+    king_move = Position.from_dict({'black_piece_1': Location(2, 1), 'king_black_piece_1': Location(3, 4), 'king_white_piece_1': Location(5, 2)})
+    man_move = Position.from_dict({'black_piece_1': Location(3, 2), 'king_black_piece_1': Location(0, 1), 'king_white_piece_1': Location(5, 2)})
+    assert not PositionHistory.is_progress(board_state, king_move)
+    assert PositionHistory.is_progress(board_state, man_move)
+    assert not PositionHistory.is_progress(board_state.to_dict(), king_move.to_dict())  # the names of the men don't change either
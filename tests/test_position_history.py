@@ -0,0 +1,63 @@
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from Location import Location
+from PositionHistory import PositionHistory
+
+
+def test_threefold_repetition():
+    history = PositionHistory()
+    for h in (1, 2, 1, 2, 1):
+        history.push(h, is_progress=False)
+    assert history.is_threefold_repetition()
+    history.pop()
+    assert not history.is_threefold_repetition()
+    assert history.occurrences(1) == 2
+
+
+def test_no_progress_limit():
+    history = PositionHistory(no_progress_limit=4)
+    for h in range(4):
+        history.push(h, is_progress=False)
+    assert history.is_no_progress()
+    history.pop()
+    assert not history.is_no_progress()
+    history.push(10, is_progress=True)
+    assert history.plies_without_progress == 0
+
+
+def test_is_progress():
+    board_state = {'black_piece_1': Location(2, 1), 'king_white_piece_1': Location(5, 2)}
+    assert not PositionHistory.is_progress(board_state, {'black_piece_1': Location(2, 1), 'king_white_piece_1': Location(4, 1)})
+    assert PositionHistory.is_progress(board_state, {'black_piece_1': Location(3, 2), 'king_white_piece_1': Location(5, 2)})
+    assert PositionHistory.is_progress(board_state, {'king_white_piece_1': Location(5, 2)})
+
+
+def test_shuffling_kings_end_in_a_draw():
+    game = Game()
+    game.board_state = {'king_black_piece_1': Location(0, 1), 'king_white_piece_1': Location(7, 6)}
+    history = game.start_history(draw_ply_limit=None)
+    moves = [('king_black_piece_1', Location(1, 2)), ('king_white_piece_1', Location(6, 5)),
+             ('king_black_piece_1', Location(0, 1)), ('king_white_piece_1', Location(7, 6))] * 2
+    for ply, (piece_name, location) in enumerate(moves):
+        previous_board_state = game.board_state
+        game.board_state = dict(previous_board_state)
+        game.board_state[piece_name] = location
+        game.record_move(previous_board_state, 'white' if ply % 2 == 0 else 'black')
+    assert history.is_threefold_repetition()
+    assert game.winner() == 'Draw'
+
+
+def test_search_scores_repetition_as_draw():
+    # white is a king down, but one of its moves goes back to a position of the game, which is a draw
+    board_state = {'king_black_piece_1': Location(0, 1), 'king_black_piece_2': Location(0, 5), 'king_white_piece_1': Location(7, 6)}
+    history = PositionHistory()
+    history.push_board(board_state, 'white')
+    history.push_board(dict(board_state, king_white_piece_1=Location(6, 7)), 'black')
+    history.push_board(board_state, 'white')
+    for search_algorithm in ('minimax', 'alphabeta'):
+        value, _ = IntelligentAgent('white', board_state).search(board_state, 1, True, search_algorithm=search_algorithm)
+        assert value == -2
+        value, best_move = IntelligentAgent('white', board_state, position_history=history).search(board_state, 1, True, search_algorithm=search_algorithm)
+        assert value == 0
+        assert best_move['king_white_piece_1'] == Location(6, 7)
+        assert len(history) == 3
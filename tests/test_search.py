@@ -0,0 +1,172 @@
+import pytest
+
+from Game import Game
+from IntelligentAgent import IntelligentAgent
+from Location import Location
+from TranspositionTable import TranspositionTable
+
+
+@pytest.fixture(scope='module')
+def search_positions(legal_move_cases):
+    return [(board_state, color) for board_state, color, moves in legal_move_cases[::12] if moves]
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_alphabeta_matches_minimax(search_positions, depth):
+    for board_state, color in search_positions:
+        is_maximizing = color == 'white'
+        minimax_value, _ = IntelligentAgent(color, board_state).search(board_state, depth, is_maximizing, search_algorithm='minimax')
+        alphabeta_value, _ = IntelligentAgent(color, board_state).search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+        table_agent = IntelligentAgent(color, board_state, TranspositionTable(1))
+        table_value, _ = table_agent.search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+        assert alphabeta_value == minimax_value
+        assert table_value == minimax_value
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_batch_evaluation_matches_incremental(search_positions, depth):
+    for board_state, color in search_positions:
+        is_maximizing = color == 'white'
+        for weights in ({}, {'psq_weight': 0.5, 'mobility_weight': 1}):
+            value, _ = IntelligentAgent(color, board_state, **weights).search(board_state, depth, is_maximizing, search_algorithm='minimax')
+            batch_agent = IntelligentAgent(color, board_state, batch_evaluation=True, **weights)
+            batch_value, _ = batch_agent.search(board_state, depth, is_maximizing, search_algorithm='minimax')
+            assert batch_value == pytest.approx(value)
+
+
+def test_alphabeta_searches_fewer_nodes(search_positions):
+    minimax_nodes = alphabeta_nodes = 0
+    for board_state, color in search_positions:
+        agent = IntelligentAgent(color, board_state)
+        agent.search(board_state, 4, color == 'white', search_algorithm='minimax')
+        minimax_nodes += agent.nodes_searched
+        agent = IntelligentAgent(color, board_state)
+        agent.search(board_state, 4, color == 'white', search_algorithm='alphabeta')
+        alphabeta_nodes += agent.nodes_searched
+    assert alphabeta_nodes < minimax_nodes
+
+
+def test_iterative_deepening_returns_a_legal_move(search_positions):
+    for board_state, color in search_positions[:5]:
+        agent = IntelligentAgent(color, board_state)
+        _, new_board_state = agent.iterative_deepening(board_state, color == 'white', time_budget_ms=20)
+        assert agent.depth_reached >= 1 or len(agent.nextMove.get_legal_moves()) == 1
+        assert new_board_state in agent.nextMove.get_legal_moves()
+
+
+
+def test_iterative_deepening_stops_at_max_depth(search_positions):
+    for board_state, color in search_positions:
+        agent = IntelligentAgent(color, board_state)
+        value, _, stats = agent.iterative_deepening(board_state, color == 'white', time_budget_ms=60000, max_depth=3, return_stats=True)
+        if len(agent.nextMove.get_legal_moves()) > 1 and abs(value) < 500:
+            assert agent.depth_reached == stats.depth == 3
+            assert value == IntelligentAgent(color, board_state).search(board_state, 3, color == 'white', search_algorithm='alphabeta')[0]
+
+
+def test_iterative_deepening_finishes_depth_1_without_time(search_positions):
+    for board_state, color in search_positions:
+        agent = IntelligentAgent(color, board_state)
+        value, _ = agent.iterative_deepening(board_state, color == 'white', time_budget_ms=0, max_depth=10)
+        if len(agent.nextMove.get_legal_moves()) > 1:
+            assert agent.depth_reached == 1
+            assert value == IntelligentAgent(color, board_state).search(board_state, 1, color == 'white', search_algorithm='alphabeta')[0]
+
+
+def test_iterative_deepening_returns_the_last_finished_iteration_on_timeout():
+    board_state = Game().initialize_board()
+    agent = IntelligentAgent('black', board_state)
+    value, best_move, stats = agent.iterative_deepening(board_state, False, time_budget_ms=10, max_depth=30, return_stats=True)
+    assert 1 <= agent.depth_reached == stats.depth < 30  # the next iteration was stopped
+    assert value == IntelligentAgent('black', board_state).search(board_state, agent.depth_reached, False, search_algorithm='alphabeta')[0]
+    assert best_move == agent.principal_variation_boards(board_state, 'black', agent.principal_variation)[0]
+    assert best_move in agent.nextMove.get_legal_moves()
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_quiescence_alphabeta_matches_minimax(search_positions, depth):
+    for board_state, color in search_positions:
+        is_maximizing = color == 'white'
+        minimax_value, _ = IntelligentAgent(color, board_state, quiescence=True).search(board_state, depth, is_maximizing, search_algorithm='minimax')
+        alphabeta_value, _ = IntelligentAgent(color, board_state, quiescence=True).search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+        table_agent = IntelligentAgent(color, board_state, TranspositionTable(1), quiescence=True)
+        table_value, _ = table_agent.search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+        assert alphabeta_value == minimax_value == table_value
+
+
+def test_quiescence_resolves_pending_captures():
+    # white moves a man next to a black man which then has to capture it: at depth 1 only quiescence sees the capture
+    board_state = {'black_piece_1': Location(2, 1), 'white_piece_1': Location(4, 3), 'white_piece_2': Location(7, 6)}
+    assert IntelligentAgent('white', board_state).search(board_state, 1, True, search_algorithm='alphabeta')[0] == 1
+    agent = IntelligentAgent('white', board_state, quiescence=True)
+    value, new_board_state, stats = agent.search(board_state, 1, True, search_algorithm='alphabeta', return_stats=True)
+    assert value == 1 and new_board_state['white_piece_1'] != Location(3, 2)
+    assert stats.quiescence_nodes > 0 and stats.nodes == sum(stats.nodes_per_ply)
+    limited = IntelligentAgent('white', board_state, quiescence=True, quiescence_node_limit=0)
+    limited.search(board_state, 1, True, search_algorithm='alphabeta')
+    assert limited.stats.quiescence_nodes == 0 and limited.stats.quiescence_limit_hits > 0
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3, 4])
+def test_pvs_matches_alphabeta(search_positions, depth):
+    for board_state, color in search_positions:
+        is_maximizing = color == 'white'
+        for weights in ({}, {'psq_weight': 0.5}):
+            alphabeta_value, _ = IntelligentAgent(color, board_state, **weights).search(board_state, depth, is_maximizing, search_algorithm='alphabeta')
+            pvs_value, _ = IntelligentAgent(color, board_state, **weights).search(board_state, depth, is_maximizing, search_algorithm='pvs')
+            table_agent = IntelligentAgent(color, board_state, TranspositionTable(1), **weights)
+            table_value, _ = table_agent.search(board_state, depth, is_maximizing, search_algorithm='pvs')
+            assert pvs_value == pytest.approx(alphabeta_value)
+            assert table_value == pytest.approx(alphabeta_value)
+
+
+def test_search_returns_the_principal_variation(search_positions):
+    depth = 3
+    for board_state, color in search_positions:
+        agent = IntelligentAgent(color, board_state)
+        value, best_move, principal_variation, stats = agent.search(board_state, depth, color == 'white', search_algorithm='pvs',
+                                                                    return_stats=True, return_pv=True)
+        assert principal_variation[0] == best_move
+        if len(principal_variation) == depth and abs(value) < 500:
+            leaf_color = color if depth % 2 == 0 else 'white' if color == 'black' else 'black'
+            assert agent.ia_game_evaluation(leaf_color, principal_variation[-1]) == value
+
+
+def test_pvs_iterative_deepening_with_aspiration_windows(search_positions):
+    alphabeta_nodes = pvs_nodes = 0
+    for board_state, color in search_positions:
+        is_maximizing = color == 'white'
+        agent = IntelligentAgent(color, board_state, TranspositionTable(1), psq_weight=0.5)
+        alphabeta_value, _, alphabeta_stats = agent.iterative_deepening(board_state, is_maximizing, time_budget_ms=60000, max_depth=5, return_stats=True)
+        agent = IntelligentAgent(color, board_state, TranspositionTable(1), psq_weight=0.5)
+        pvs_value, _, pvs_stats = agent.iterative_deepening(board_state, is_maximizing, time_budget_ms=60000, max_depth=5, return_stats=True,
+                                                            search_algorithm='pvs', aspiration_window=1.5)
+        assert pvs_value == pytest.approx(alphabeta_value)
+        assert pvs_stats.depth == alphabeta_stats.depth
+        alphabeta_nodes += alphabeta_stats.nodes
+        pvs_nodes += pvs_stats.nodes
+    assert pvs_nodes < alphabeta_nodes
+
+
+def test_iterative_deepening_returns_the_principal_variation(search_positions):
+    for board_state, color in search_positions:
+        agent = IntelligentAgent(color, board_state, TranspositionTable(1))
+        value, best_move, principal_variation = agent.iterative_deepening(board_state, color == 'white', time_budget_ms=60000, max_depth=4,
+                                                                          search_algorithm='pvs', aspiration_window=1.5, return_pv=True)
+        assert principal_variation[0] == best_move
+        assert principal_variation == agent.principal_variation_boards(board_state, color)
+
+
+def test_principal_variation_after_a_timeout():
+    board_state = Game().initialize_board()
+    agent = IntelligentAgent('black', board_state)
+    value, best_move, principal_variation = agent.iterative_deepening(board_state, False, time_budget_ms=5, max_depth=30,
+                                                                      search_algorithm='pvs', return_pv=True)
+    assert agent.depth_reached < 30  # the last iteration was stopped
+    assert principal_variation[0] == best_move
+    assert agent.principal_variation_boards(board_state, 'black') == principal_variation
+
+
+def test_iterative_deepening_rejects_minimax(search_positions):
+    board_state, color = search_positions[0]
+    with pytest.raises(ValueError):
+        IntelligentAgent(color, board_state).iterative_deepening(board_state, color == 'white', time_budget_ms=20, search_algorithm='minimax')
@@ -0,0 +1,66 @@
+from IntelligentAgent import IntelligentAgent
+from SearchStats import SearchHooks, SearchStats
+from TranspositionTable import TranspositionTable
+
+
+class CountingHooks(SearchHooks):
+    def __init__(self):
+        self.calls = {'start': 0, 'node': 0, 'leaf': 0, 'cutoff': 0, 'end': 0}
+
+    def on_search_start(self, agent, board_state, depth):
+        self.calls['start'] += 1
+
+    def on_node(self, agent, ply, depth, position):
+        self.calls['node'] += 1
+
+    def on_leaf(self, agent, ply, value):
+        self.calls['leaf'] += 1
+
+    def on_cutoff(self, agent, ply, move):
+        self.calls['cutoff'] += 1
+
+    def on_search_end(self, agent, stats):
+        self.calls['end'] += 1
+
+
+def test_stats_are_returned_with_the_search(legal_move_cases):
+    board_state, color, _ = legal_move_cases[0]
+    agent = IntelligentAgent(color, board_state, TranspositionTable(1), collect_timings=True)
+    value, new_board_state, stats = agent.search(board_state, 4, color == 'white', search_algorithm='alphabeta', return_stats=True)
+    assert stats is agent.stats
+    assert stats.nodes == agent.nodes_searched == sum(stats.nodes_per_ply)
+    assert stats.nodes_per_ply[0] == 1
+    assert stats.depth == 4 and stats.searches == 1
+    assert 0 < stats.leaf_evaluations < stats.nodes
+    assert stats.move_generations > 0 and stats.tt_probes > 0
+    assert stats.cutoffs == agent.cutoffs
+    assert stats.move_generation_time > 0 and stats.evaluation_time > 0
+    assert stats.effective_branching_factor > 1
+
+
+def test_minimax_stats_count_every_node(legal_move_cases):
+    board_state, color, moves = legal_move_cases[0]
+    stats = IntelligentAgent(color, board_state).search(board_state, 1, color == 'white', return_stats=True)[2]
+    assert stats.plies() == [1, len(moves)]
+    assert stats.leaf_evaluations == len(moves)
+    assert stats.move_generations == 1
+
+
+def test_hooks_are_called(legal_move_cases):
+    board_state, color, _ = legal_move_cases[0]
+    hooks = CountingHooks()
+    agent = IntelligentAgent(color, board_state, hooks=hooks)
+    agent.search(board_state, 3, color == 'white', search_algorithm='alphabeta')
+    assert hooks.calls['start'] == hooks.calls['end'] == 1
+    assert hooks.calls['node'] == agent.stats.nodes
+    assert hooks.calls['leaf'] == agent.stats.leaf_evaluations
+    assert hooks.calls['cutoff'] == agent.stats.cutoffs
+
+
+def test_merge_adds_up():
+    a, b = SearchStats(), SearchStats()
+    a.nodes, a.searches, a.depth, a.nodes_per_ply[1] = 10, 1, 2, 9
+    b.nodes, b.searches, b.depth, b.nodes_per_ply[1] = 30, 1, 2, 29
+    total = SearchStats().merge(a).merge(b)
+    assert total.nodes == 40 and total.searches == 2 and total.plies() == [0, 38]
+    assert total.effective_branching_factor == 20 ** 0.5
@@ -0,0 +1,94 @@
+import pickle
+
+import pytest
+
+from Bitboard import Bitboard
+from Tablebase import DRAW, LOSS, WIN, Tablebase, TablebaseGenerator
+import Squares
+
+
+@pytest.fixture(scope='module')
+def tablebase(tmp_path_factory):
+    generator = TablebaseGenerator(max_pieces=2)
+    generator.generate(show_progress=False)
+    path = str(tmp_path_factory.mktemp('tablebase') / 'endgames_2.cktb')
+    generator.write(path)
+    tablebase = Tablebase(path)
+    yield tablebase
+    tablebase.close()
+
+
+def board(*pieces):
+    """Builds a Bitboard from (x, y, piece type) tuples"""
+    black = white = kings = 0
+    for x, y, piece_type in pieces:
+        mask = Squares.SQUARE_MASKS[Squares.square_of(x, y)]
+        if piece_type in (Squares.BLACK_MAN, Squares.BLACK_KING):
+            black |= mask
+        else:
+            white |= mask
+        if piece_type in (Squares.BLACK_KING, Squares.WHITE_KING):
+            kings |= mask
+    return Bitboard(black, white, kings)
+
+
+def solve(bitboard, color, depth):
+    """Brute force: 1 if the side to move wins within depth plies, -1 if it loses, 0 if undecided"""
+    moves = bitboard.legal_moves(color)
+    if not moves:
+        return -1
+    if depth == 0:
+        return 0
+    opponent_color = 'white' if color == 'black' else 'black'
+    best = -1
+    for move in moves:
+        child = bitboard.apply(move, color).promote()
+        if not (child.white if color == 'black' else child.black):
+            return 1
+        best = max(best, -solve(child, opponent_color, depth - 1))
+        if best == 1:
+            break
+    return best
+
+
+def test_king_against_king_is_a_draw(tablebase):
+    position = board((3, 2, Squares.BLACK_KING), (4, 5, Squares.WHITE_KING))
+    assert tablebase.probe(position.to_dict(), 'black')[0] == DRAW
+    assert tablebase.probe(position.to_dict(), 'white')[0] == DRAW
+
+
+def test_capture_of_the_last_piece_wins_at_once(tablebase):
+    position = board((2, 1, Squares.BLACK_MAN), (3, 2, Squares.WHITE_MAN))
+    assert tablebase.probe(position.to_dict(), 'black') == (WIN, 1)
+
+
+def test_blocked_side_loses(tablebase):
+    # the white man can't move: its only forward square is taken and the jump lands off the board
+    position = board((0, 1, Squares.BLACK_KING), (1, 0, Squares.WHITE_MAN))
+    assert tablebase.probe(position.to_dict(), 'white') == (LOSS, 0)
+
+
+def test_results_match_brute_force(tablebase):
+    checked = 0
+    for i in range(0, tablebase.nb_positions, 7):
+        result, distance = tablebase._results[i], tablebase._distances[i]
+        if result == DRAW or distance > 6:
+            continue
+        key = tablebase._keys[i]
+        color = 'white' if key & 1 else 'black'
+        pieces = []
+        key >>= 1
+        while key:
+            square, piece_type = divmod((key & 255) - 1, Squares.NUM_PIECE_TYPES)
+            pieces.append((*Squares.xy_of(square), piece_type))
+            key >>= 8
+        assert solve(board(*pieces), color, distance) == (1 if result == WIN else -1)
+        checked += 1
+    assert checked > 100
+
+
+def test_tablebase_can_be_pickled(tablebase):
+    copy = pickle.loads(pickle.dumps(tablebase))
+    assert copy.nb_positions == tablebase.nb_positions
+    assert copy.probe_key(tablebase._keys[0]) == tablebase.probe_key(tablebase._keys[0])
+    copy.close()
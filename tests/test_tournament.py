@@ -0,0 +1,38 @@
+import pytest
+
+from Tournament import Tournament, distribution, play_game, wilson_interval
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(8, 10)
+    assert low == pytest.approx(0.4902, abs=1e-4) and high == pytest.approx(0.9433, abs=1e-4)
+    assert wilson_interval(0, 0) == (0.0, 0.0)
+    assert wilson_interval(0, 20)[0] == 0.0 and wilson_interval(20, 20)[1] == 1.0
+    assert wilson_interval(50, 100)[1] - wilson_interval(50, 100)[0] > wilson_interval(500, 1000)[1] - wilson_interval(500, 1000)[0]
+
+
+def test_distribution():
+    summary = distribution(list(range(1, 101)))
+    assert summary['mean'] == 50.5 and summary['min'] == 1 and summary['max'] == 100
+    assert (summary['p50'], summary['p90'], summary['p99']) == (51, 91, 100)
+    assert summary['mean_ci'][0] < 50.5 < summary['mean_ci'][1]
+    assert distribution([]) == {}
+
+
+def test_summarize_counts_results():
+    results = [{'winner': winner, 'turns': turns, 'duration': 0.5}
+               for winner, turns in (('Black', 30), ('Black', 40), ('White', 50), ('Draw', 60), (None, None))]
+    summary = Tournament.summarize(results)
+    assert (summary['games'], summary['black_wins'], summary['white_wins'], summary['draws']) == (5, 2, 1, 2)
+    assert summary['black_win_rate'] == 0.4 and summary['black_win_rate_ci'] == wilson_interval(2, 5)
+    assert summary['white_win_rate'] == 0.2
+    assert summary['turns']['mean'] == 45 and summary['duration']['mean'] == 0.5
+    assert Tournament.summarize([])['black_win_rate'] == 0.0
+
+
+def test_games_are_reproducible_from_their_seed():
+    game_spec = {'black': 'naive', 'white': 'naive', 'draw_ply_limit': 40}
+    results = sorted(Tournament(num_workers=2, base_seed=10).play_games(game_spec, 4), key=lambda result: result['game'])
+    assert [result['seed'] for result in results] == [10, 11, 12, 13]
+    replayed = play_game((2, 12, game_spec))
+    assert (replayed['winner'], replayed['turns']) == (results[2]['winner'], results[2]['turns'])
@@ -0,0 +1,38 @@
+import numpy as np
+
+from BatchEvaluator import BatchEvaluator
+from Game import Game
+from TrainingData import RECORD_DTYPE, ShardLoader, ShardWriter, generate_self_play
+
+
+def test_self_play_shards(tmp_path):
+    positions = generate_self_play(str(tmp_path), num_games=4, depths=(1, 2), shard_size=40)
+    loader = ShardLoader(str(tmp_path), batch_size=16)
+    assert len(loader) == positions and len(loader.paths) == -(-positions // 40)
+    rows = np.concatenate(list(loader))
+    assert len(rows) == positions
+    assert rows[0]['board'].tolist() == BatchEvaluator.encode_board(Game().initialize_board())
+    for game in range(4):
+        game_rows = rows[rows['game'] == game]
+        assert len(set(game_rows['result'].tolist())) == 1
+        assert game_rows['ply'].tolist() == list(range(len(game_rows)))
+        # the intelligent agent plays black in even games: its positions have scores, the naive agent's don't
+        searched = ~np.isnan(game_rows['score'])
+        intelligent_to_move = game_rows['white_to_move'] == (game % 2 == 1)
+        assert not searched[~intelligent_to_move].any() and searched[intelligent_to_move].any()
+
+
+def test_writer_buffers_one_shard(tmp_path):
+    rows = np.zeros(25, dtype=RECORD_DTYPE)
+    rows['ply'] = np.arange(25)
+    with ShardWriter(str(tmp_path), shard_size=10) as writer:
+        writer.add(rows[:7])
+        writer.add(rows[7:])
+        assert writer.shards_written == 2
+    assert writer.shards_written == 3
+    assert np.load(ShardLoader(str(tmp_path)).paths[0], mmap_mode='r').shape == (10,)
+    shuffled = np.concatenate(list(ShardLoader(str(tmp_path), batch_size=4, shuffle=True)))
+    assert sorted(shuffled['ply'].tolist()) == list(range(25))
+    with ShardWriter(str(tmp_path), shard_size=10) as writer:  # appends new shards
+        writer.add(rows[:3])
+    assert len(ShardLoader(str(tmp_path))) == 28
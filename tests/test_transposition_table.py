@@ -0,0 +1,48 @@
+from IntelligentAgent import IntelligentAgent
+from TranspositionTable import TranspositionTable, ZOBRIST, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE
+
+
+def same_bucket_hashes(table, count):
+    """Hashes that all fall in the bucket of hash 5"""
+    return [5 + n * table.nb_buckets for n in range(count)]
+
+
+def test_store_and_probe():
+    table = TranspositionTable(1)
+    assert table.probe(12345) is None
+    table.store(12345, 4, -2.5, LOWER_BOUND, 42)
+    table.store(67890, 2, 1.0, UPPER_BOUND)
+    assert table.probe(12345) == (4, -2.5, LOWER_BOUND, 42)
+    assert table.probe(67890) == (2, 1.0, UPPER_BOUND, NO_MOVE)
+    table.store(12345, 5, 3.0, EXACT, 7)  # the same position searched again replaces its entry
+    assert table.probe(12345) == (5, 3.0, EXACT, 7)
+    assert table.stats()['used'] == 2 and table.hits == 3 and table.misses == 1
+
+
+def test_two_tier_replacement():
+    table = TranspositionTable(1)
+    deep, shallow, shallower, deeper = same_bucket_hashes(table, 4)
+    table.store(deep, 5, 1.0, EXACT)
+    table.store(shallow, 2, 2.0, EXACT)  # not as deep: goes to the always-replace entry
+    assert table.probe(deep)[0] == 5 and table.probe(shallow)[0] == 2
+    table.store(shallower, 1, 3.0, EXACT)  # replaces the always-replace entry only
+    assert table.probe(shallow) is None and table.probe(deep)[0] == 5 and table.probe(shallower)[0] == 1
+    table.store(deeper, 6, 4.0, EXACT)  # takes the depth-preferred entry and demotes the previous one
+    assert table.probe(deeper)[0] == 6 and table.probe(deep)[0] == 5 and table.probe(shallower) is None
+    table.new_search()
+    table.store(shallow, 1, 5.0, EXACT)  # the depth-preferred entry is from an older search
+    assert table.probe(shallow)[0] == 1 and table.probe(deeper)[0] == 6 and table.probe(deep) is None
+
+
+def test_searches_keep_their_values_with_a_table(legal_move_cases):
+    for board_state, color, moves in legal_move_cases[::10]:
+        if not moves:
+            continue
+        table = TranspositionTable(1)  # kept from one depth to the next, so entries of shallower searches are probed
+        for depth in range(1, 5):
+            value, _ = IntelligentAgent(color, board_state).search(board_state, depth, color == 'white', search_algorithm='alphabeta')
+            table_agent = IntelligentAgent(color, board_state, table)
+            table_value, _ = table_agent.search(board_state, depth, color == 'white', search_algorithm='alphabeta')
+            assert table_value == value
+            entry = table.probe(ZOBRIST.hash_board(board_state, color))
+            assert entry is not None and entry[0] == depth and entry[3] != NO_MOVE  # the root is stored with its best move